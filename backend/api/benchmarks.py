@@ -0,0 +1,161 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import BehaviorScore, CustomUser, Grade, SchoolClass, StudentDailyScore
+from .report_cache import report_cache
+from .urls import router
+
+# Extra query params per case, filled in from the data by benchmark_cases
+CASE_PARAMS = {
+    'reports-leaderboard': lambda ids: {'scope': 'class', 'scope_id': ids['class']},
+    'reports-distribution': lambda ids: {'scope': 'grade', 'scope_id': ids['grade'],
+                                         'start_date': ids['first_day'], 'end_date': ids['last_day']},
+}
+
+# Heavier variants worth tracking on their own: (name, url name, params)
+EXTRA_CASES = [
+    ('behavior-score-list-class', 'behavior-score-list', lambda ids: {'class_id': ids['class']}),
+    ('behavior-score-summary-dimension', 'behavior-score-score-summary', lambda ids: {'group_by': 'dimension'}),
+    ('reports-behavior-time-series-year', 'reports-behavior-time-series',
+     lambda ids: {'interval': 'week', 'start_date': ids['first_day'], 'end_date': ids['last_day']}),
+    ('reports-user-engagement-grade', 'reports-user-engagement', lambda ids: {'grade_id': ids['grade']}),
+    ('reports-cube-grade-month', 'reports-cube', lambda ids: {'dimensions': 'grade,chapter,month'}),
+    ('reports-dimension-analysis-tree', 'reports-dimension-analysis', lambda ids: {'layout': 'tree'}),
+    ('reports-leaderboard-grade', 'reports-leaderboard',
+     lambda ids: {'scope': 'grade', 'scope_id': ids['grade'], 'period': 'term'}),
+]
+
+
+def benchmark_cases():
+    """
+    (name, path, params) for every list endpoint and every non-detail GET action on
+    the API router (reports and CSV exports included), plus EXTRA_CASES
+    """
+    day_range = StudentDailyScore.objects.order_by().values_list('date', flat=True)
+    ids = {
+        'class': SchoolClass.objects.order_by('id').values_list('id', flat=True).first(),
+        'grade': Grade.objects.order_by('id').values_list('id', flat=True).first(),
+        'first_day': day_range.order_by('date').first(),
+        'last_day': day_range.order_by('-date').first(),
+    }
+
+    cases = []
+    for _, viewset, basename in router.registry:
+        if hasattr(viewset, 'list'):
+            name = f'{basename}-list'
+            cases.append((name, reverse(name), CASE_PARAMS.get(name, lambda ids: {})(ids)))
+        for extra_action in viewset.get_extra_actions():
+            if extra_action.detail or 'get' not in extra_action.mapping:
+                continue
+            name = f'{basename}-{extra_action.url_name}'
+            cases.append((name, reverse(name), CASE_PARAMS.get(name, lambda ids: {})(ids)))
+    cases += [(name, reverse(url_name), params(ids)) for name, url_name, params in EXTRA_CASES]
+    return cases
+
+
+def dataset_summary():
+    """
+    Row counts identifying the data a benchmark ran against
+    """
+    return {
+        'students': CustomUser.objects.filter(role='student').count(),
+        'classes': SchoolClass.objects.count(),
+        'behavior_scores': BehaviorScore.objects.count(),
+    }
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting statements; unlike the DEBUG query log it has
+    no size limit and adds no per-query bookkeeping to the timings
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def run_benchmarks(user, iterations=5, only=None):
+    """
+    Time each case and count its queries as user. Every iteration clears the report
+    cache first, so report timings measure the computation rather than a cache hit.
+    Returns {name: {'path', 'status', 'queries', 'median_ms', 'min_ms', 'bytes'}}.
+    """
+    client = APIClient(SERVER_NAME=_host())
+    client.force_authenticate(user)
+    results = {}
+    for name, path, params in benchmark_cases():
+        if only and not any(part in name for part in only):
+            continue
+        timings = []
+        queries = status_code = size = None
+        # One untimed warm-up so import and connection costs do not land on the first case
+        for iteration in range(iterations + 1):
+            report_cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(path, params)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+            if iteration:
+                timings.append(elapsed * 1000)
+            queries, status_code, size = counter.count, response.status_code, len(body)
+        results[name] = {
+            'path': path,
+            'params': {key: str(value) for key, value in params.items()},
+            'status': status_code,
+            'queries': queries,
+            'median_ms': round(statistics.median(timings), 2),
+            'min_ms': round(min(timings), 2),
+            'bytes': size,
+        }
+    return results
+
+
+def compare(results, baseline, time_tolerance=0.5, min_delta_ms=5.0):
+    """
+    Regressions of results against a baseline: more queries, a changed status, or a
+    median more than time_tolerance slower (and at least min_delta_ms slower).
+    Returns a list of (name, message).
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['status'] != previous['status']:
+            regressions.append((name, f"status {previous['status']} -> {result['status']}"))
+        if result['queries'] > previous['queries']:
+            regressions.append((name, f"queries {previous['queries']} -> {result['queries']}"))
+        slower = result['median_ms'] - previous['median_ms']
+        if slower > min_delta_ms and result['median_ms'] > previous['median_ms'] * (1 + time_tolerance):
+            regressions.append((name, f"median {previous['median_ms']}ms -> {result['median_ms']}ms"))
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results, dataset):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as baseline_file:
+        json.dump({'dataset': dataset, 'results': results}, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import CustomUser, Notification, NotificationType, SchoolClass, StudentDailyScore
+from .notification_utils import send_notification
+
+# related_object_type of early warning notifications; related_object_id is the student
+EARLY_WARNING_OBJECT_TYPE = 'student_early_warning'
+
+
+def negative_score_matrix(start, end):
+    """
+    (student ids, student x day matrix of negative score counts) for start..end inclusive,
+    read from the daily rollup. Students without negative scores in the range are omitted.
+    """
+    rows = list(
+        StudentDailyScore.objects
+        .filter(date__gte=start, date__lte=end, negative_count__gt=0)
+        .values('student_id', 'date')
+        .annotate(negatives=Sum('negative_count'))
+        .order_by()
+        .values_list('student_id', 'date', 'negatives')
+    )
+    days = (end - start).days + 1
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, days), dtype=np.int64)
+
+    student_column, day_column, count_column = zip(*rows)
+    student_ids, student_index = np.unique(np.array(student_column, dtype=np.int64), return_inverse=True)
+    first = start.toordinal()
+    day_index = np.fromiter((day.toordinal() - first for day in day_column), dtype=np.int64, count=len(rows))
+    matrix = np.zeros((len(student_ids), days), dtype=np.int64)
+    matrix[student_index, day_index] = count_column
+    return student_ids, matrix
+
+
+def detect_early_warnings(as_of=None, window_days=None, baseline_days=None, threshold=None, min_negatives=None):
+    """
+    Students whose negative scores in the window_days ending on as_of jump above
+    their own baseline.
+
+    The baseline is every window_days rolling window within the baseline_days before
+    the current window; a student is flagged when the current window's count is at
+    least min_negatives and more than threshold standard deviations above the mean
+    of those rolling counts (the deviation is floored at one score, so students with
+    a perfectly steady history are not flagged for a single extra score).
+
+    Returns a list of {'student_id', 'window_negatives', 'baseline_mean',
+    'baseline_std', 'z_score'} ordered by descending z-score.
+    """
+    as_of = as_of or timezone.localdate()
+    window_days = window_days or settings.EARLY_WARNING_WINDOW_DAYS
+    baseline_days = baseline_days or settings.EARLY_WARNING_BASELINE_DAYS
+    threshold = settings.EARLY_WARNING_THRESHOLD if threshold is None else threshold
+    min_negatives = settings.EARLY_WARNING_MIN_NEGATIVES if min_negatives is None else min_negatives
+
+    start = as_of - timedelta(days=baseline_days + window_days - 1)
+    student_ids, matrix = negative_score_matrix(start, as_of)
+    if not len(student_ids):
+        return []
+
+    # Rolling window sums from a cumulative sum: column j covers days j .. j + window_days - 1
+    cumulative = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.int64)
+    np.cumsum(matrix, axis=1, out=cumulative[:, 1:])
+    rolling = cumulative[:, window_days:] - cumulative[:, :-window_days]
+
+    current = rolling[:, -1]
+    # Baseline windows end before the current window starts
+    baseline = rolling[:, :baseline_days - window_days + 1]
+    baseline_mean = baseline.mean(axis=1)
+    baseline_std = baseline.std(axis=1)
+    z_scores = (current - baseline_mean) / np.maximum(baseline_std, 1.0)
+
+    flagged = np.flatnonzero((current >= min_negatives) & (z_scores > threshold))
+    flagged = flagged[np.argsort(-z_scores[flagged], kind='stable')]
+    return [
+        {
+            'student_id': int(student_ids[i]),
+            'window_negatives': int(current[i]),
+            'baseline_mean': round(float(baseline_mean[i]), 2),
+            'baseline_std': round(float(baseline_std[i]), 2),
+            'z_score': round(float(z_scores[i]), 2),
+        }
+        for i in flagged
+    ]
+
+
+def send_early_warnings(warnings, window_days=None, cooldown_days=None):
+    """
+    Notify the class teachers of each flagged student's home class, skipping students
+    already warned about within cooldown_days. Returns the number of notifications sent.
+    """
+    window_days = window_days or settings.EARLY_WARNING_WINDOW_DAYS
+    cooldown_days = settings.EARLY_WARNING_COOLDOWN_DAYS if cooldown_days is None else cooldown_days
+
+    recently_warned = set(
+        Notification.objects.filter(
+            related_object_type=EARLY_WARNING_OBJECT_TYPE,
+            related_object_id__in=[warning['student_id'] for warning in warnings],
+            created_at__gte=timezone.now() - timedelta(days=cooldown_days)
+        ).values_list('related_object_id', flat=True)
+    )
+    warnings = [warning for warning in warnings if warning['student_id'] not in recently_warned]
+
+    students = CustomUser.objects.select_related('school_class').in_bulk(
+        [warning['student_id'] for warning in warnings]
+    )
+    assignments = list(SchoolClass.class_teachers.through.objects.filter(
+        schoolclass_id__in={student.school_class_id for student in students.values()}
+    ).values_list('schoolclass_id', 'customuser_id'))
+    teacher_users = CustomUser.objects.in_bulk({teacher_id for _, teacher_id in assignments})
+    teachers = {}
+    for class_id, teacher_id in assignments:
+        teachers.setdefault(class_id, []).append(teacher_users[teacher_id])
+
+    sent = 0
+    for warning in warnings:
+        student = students.get(warning['student_id'])
+        if student is None:
+            continue
+        name = student.get_full_name() or student.username
+        for teacher in teachers.get(student.school_class_id, []):
+            send_notification(
+                teacher,
+                f"Early warning: {name}",
+                f"{name} ({student.school_class.name}) received {warning['window_negatives']} negative scores "
+                f"in the last {window_days} days, against a usual {warning['baseline_mean']:g} "
+                f"(z-score {warning['z_score']:g}).",
+                notification_type=NotificationType.WARNING,
+                related_object_type=EARLY_WARNING_OBJECT_TYPE,
+                related_object_id=student.id
+            )
+            sent += 1
+    return sent
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import compare, dataset_summary, load_baseline, run_benchmarks, save_baseline
+from api.models import CustomUser, UserRole
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every list, report and export endpoint and count its queries, then compare the "
+        "results with a stored baseline. Generate data first with generate_school_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            default=Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json',
+            help="Baseline file to compare with or write (default: benchmarks/baseline.json).",
+        )
+        parser.add_argument('--save', action='store_true', help="Write these results as the new baseline.")
+        parser.add_argument('--check', action='store_true', help="Exit with an error if anything regressed.")
+        parser.add_argument('--iterations', type=int, default=5, help="Timed runs per endpoint (default: 5).")
+        parser.add_argument('--user', help="Username to run as (default: the first system administrator).")
+        parser.add_argument('--only', nargs='*', help="Only run cases whose name contains one of these.")
+        parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help="Allowed slowdown of the median as a fraction (default: 0.5).")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('id')
+        user = (users.filter(username=options['user']) if options['user']
+                else users.filter(role=UserRole.SYSTEM_ADMINISTRATOR)).first()
+        if user is None:
+            raise CommandError("No user to run the benchmarks as.")
+
+        dataset = dataset_summary()
+        results = run_benchmarks(user, iterations=options['iterations'], only=options['only'])
+
+        baseline = load_baseline(options['baseline']) if options['baseline'].exists() else None
+        previous = baseline['results'] if baseline else {}
+        self.stdout.write(f"{'case':<45} {'status':>6} {'queries':>8} {'median ms':>10} {'baseline ms':>12}")
+        for name, result in results.items():
+            before = previous.get(name, {})
+            self.stdout.write(
+                f"{name:<45} {result['status']:>6} {result['queries']:>8} {result['median_ms']:>10} "
+                f"{before.get('median_ms', '-'):>12}"
+            )
+
+        if baseline and baseline['dataset'] != dataset:
+            self.stderr.write(f"Baseline was recorded on a different dataset: {baseline['dataset']} vs {dataset}.")
+
+        regressions = compare(results, previous, time_tolerance=options['time_tolerance'])
+        for name, message in regressions:
+            self.stderr.write(f"REGRESSION {name}: {message}")
+
+        if options['save']:
+            save_baseline(options['baseline'], results, dataset)
+            self.stdout.write(f"Saved baseline to {options['baseline']}.")
+        if regressions and options['check']:
+            raise CommandError(f"{len(regressions)} regressions against the baseline.")
+        if baseline and not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic_data import DEFAULT_END_DATE, SchoolGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic school (grades, classes, staff, students, parents, a rule tree and "
+        "score, observation, self-report, award and notification histories) for load testing. "
+        "The same seed and options always produce the same school. Run it against a scratch database, "
+        "e.g. SQLITE_PATH=/tmp/school.sqlite3 after migrate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42).")
+        parser.add_argument('--prefix', default='syn', help="Prefix for generated usernames and names (default: syn).")
+        parser.add_argument('--grades', type=int, default=6, help="Number of grades (default: 6).")
+        parser.add_argument('--students', type=int, default=5000, help="Number of students (default: 5000).")
+        parser.add_argument('--class-size', type=int, default=30, help="Students per class (default: 30).")
+        parser.add_argument('--scores', type=int, default=2_000_000,
+                            help="Number of behavior scores (default: 2000000).")
+        parser.add_argument('--observations', type=int, default=4,
+                            help="Average parent observations per student (default: 4).")
+        parser.add_argument('--self-reports', type=int, default=4,
+                            help="Average self-reports per student (default: 4).")
+        parser.add_argument('--awards', type=int, default=2, help="Average awards per student (default: 2).")
+        parser.add_argument('--notifications', type=int, default=10,
+                            help="Notifications per student and parent (default: 10).")
+        parser.add_argument('--days', type=int, default=365, help="Days of history (default: 365).")
+        parser.add_argument('--end-date', type=date.fromisoformat, default=DEFAULT_END_DATE,
+                            help=f"Last day of history, YYYY-MM-DD (default: {DEFAULT_END_DATE}).")
+        parser.add_argument('--password', default='password', help="Password for every generated user.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert (default: 5000).")
+
+    def handle(self, *args, **options):
+        generator = SchoolGenerator(
+            seed=options['seed'],
+            prefix=options['prefix'],
+            grades=options['grades'],
+            students=options['students'],
+            class_size=options['class_size'],
+            scores=options['scores'],
+            observations_per_student=options['observations'],
+            self_reports_per_student=options['self_reports'],
+            awards_per_student=options['awards'],
+            notifications_per_user=options['notifications'],
+            days=options['days'],
+            end_date=options['end_date'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        try:
+            counts = generator.generate()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Synthetic school generated."))
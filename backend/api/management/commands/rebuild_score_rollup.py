@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.score_rollups import rebuild_rollup, verify_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StudentDailyScore rollup, leaderboards and analytics cube from raw BehaviorScore rows and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help="Only compare the rollup with the raw scores; do not rebuild it.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            written = rebuild_rollup()
+            self.stdout.write(f"Rebuilt rollup with {written} rows.")
+
+        mismatches = verify_rollup()
+        if mismatches:
+            for key, expected, actual in mismatches[:20]:
+                self.stderr.write(f"{key}: expected {expected}, found {actual}")
+            raise CommandError(f"Rollup does not match raw scores: {len(mismatches)} mismatching rows.")
+
+        self.stdout.write(self.style.SUCCESS("Rollup matches raw behavior scores."))
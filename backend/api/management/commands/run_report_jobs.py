@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.report_jobs import prune_jobs, requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued report and export jobs. Polls the ReportJob table; start as many workers as needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Run the jobs currently queued, then exit.",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty (default: 2).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stderr.write(f"Requeued or failed {requeued} stale jobs.")
+            ran = run_pending_jobs()
+            if ran:
+                self.stdout.write(f"Ran {ran} jobs.")
+            pruned = prune_jobs()
+            if pruned:
+                self.stdout.write(f"Pruned {pruned} expired jobs.")
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.early_warning import detect_early_warnings, send_early_warnings
+
+
+class Command(BaseCommand):
+    help = ("Flag students whose recent negative scores jump above their own baseline and notify "
+            "their class teachers. Meant to run nightly.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help="Last day of the window, YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            default=settings.EARLY_WARNING_WINDOW_DAYS,
+            help=f"Length of the recent window (default: {settings.EARLY_WARNING_WINDOW_DAYS}).",
+        )
+        parser.add_argument(
+            '--baseline-days',
+            type=int,
+            default=settings.EARLY_WARNING_BASELINE_DAYS,
+            help=f"Days of history before the window (default: {settings.EARLY_WARNING_BASELINE_DAYS}).",
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=settings.EARLY_WARNING_THRESHOLD,
+            help=f"Standard deviations above baseline to flag (default: {settings.EARLY_WARNING_THRESHOLD}).",
+        )
+        parser.add_argument(
+            '--min-negatives',
+            type=int,
+            default=settings.EARLY_WARNING_MIN_NEGATIVES,
+            help=f"Fewest negative scores in the window to flag (default: {settings.EARLY_WARNING_MIN_NEGATIVES}).",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="List flagged students without sending notifications.",
+        )
+
+    def handle(self, *args, **options):
+        if options['window_days'] < 1 or options['baseline_days'] < options['window_days']:
+            raise CommandError("--window-days must be positive and --baseline-days at least as long.")
+
+        warnings = detect_early_warnings(
+            as_of=options['date'],
+            window_days=options['window_days'],
+            baseline_days=options['baseline_days'],
+            threshold=options['threshold'],
+            min_negatives=options['min_negatives'],
+        )
+        for warning in warnings:
+            self.stdout.write(
+                f"student {warning['student_id']}: {warning['window_negatives']} negative scores "
+                f"(baseline {warning['baseline_mean']} +/- {warning['baseline_std']}, z {warning['z_score']})"
+            )
+        if options['dry_run']:
+            self.stdout.write(f"Flagged {len(warnings)} students (dry run, nothing sent).")
+            return
+
+        sent = send_early_warnings(warnings, window_days=options['window_days'])
+        self.stdout.write(self.style.SUCCESS(f"Flagged {len(warnings)} students; sent {sent} notifications."))
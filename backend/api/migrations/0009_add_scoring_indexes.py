@@ -0,0 +1,73 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='award',
+            index=models.Index(fields=['student', 'award_date'], name='award_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='award',
+            index=models.Index(fields=['award_date', 'level'], name='award_date_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='award',
+            index=models.Index(fields=['award_type', 'award_date'], name='award_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['student', 'date_of_behavior'], name='bscore_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['school_class', 'date_of_behavior'], name='bscore_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['score_type', 'date_of_behavior'], name='bscore_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['date_of_behavior'], name='bscore_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['created_at'], name='bscore_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentobservation',
+            index=models.Index(fields=['student', 'date_of_behavior'], name='pobs_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentobservation',
+            index=models.Index(fields=['status', 'created_at'], name='pobs_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parentobservation',
+            index=models.Index(fields=['created_at'], name='pobs_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentselfreport',
+            index=models.Index(fields=['student', 'date_of_behavior'], name='sreport_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentselfreport',
+            index=models.Index(fields=['status', 'created_at'], name='sreport_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentselfreport',
+            index=models.Index(fields=['created_at'], name='sreport_created_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_daily_scores(apps, schema_editor):
+    BehaviorScore = apps.get_model('api', 'BehaviorScore')
+    StudentDailyScore = apps.get_model('api', 'StudentDailyScore')
+    rows = (
+        BehaviorScore.objects
+        .order_by()
+        .values('student_id', 'school_class_id', 'rule_sub_item__dimension_id', 'date_of_behavior')
+        .annotate(
+            positive_count=Count('id', filter=Q(score_type='positive')),
+            negative_count=Count('id', filter=Q(score_type='negative')),
+            positive_points=Coalesce(Sum('points', filter=Q(score_type='positive')), 0),
+            negative_points=Coalesce(Sum('points', filter=Q(score_type='negative')), 0),
+        )
+    )
+    StudentDailyScore.objects.bulk_create(
+        (
+            StudentDailyScore(
+                student_id=row['student_id'],
+                school_class_id=row['school_class_id'],
+                dimension_id=row['rule_sub_item__dimension_id'],
+                date=row['date_of_behavior'],
+                positive_count=row['positive_count'],
+                negative_count=row['negative_count'],
+                positive_points=row['positive_points'],
+                negative_points=row['negative_points'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_add_scoring_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentDailyScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('positive_count', models.PositiveIntegerField(default=0)),
+                ('negative_count', models.PositiveIntegerField(default=0)),
+                ('positive_points', models.IntegerField(default=0)),
+                ('negative_points', models.IntegerField(default=0)),
+                ('dimension', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_scores', to='api.ruledimension')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_scores', to='api.schoolclass')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Student Daily Score',
+                'verbose_name_plural': 'Student Daily Scores',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['school_class', 'date'], name='dailyscore_class_date_idx'), models.Index(fields=['date'], name='dailyscore_date_idx')],
+                'unique_together': {('student', 'school_class', 'dimension', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:08
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+# Frozen copy of score_rollups.period_start as of this migration; later changes to
+# the live helper must not change what this migration writes
+def period_start(period, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    start_months = sorted(getattr(settings, 'SCHOOL_TERM_START_MONTHS', [2, 9]))
+    earlier = [month for month in start_months if month <= day.month]
+    if earlier:
+        return date(day.year, earlier[-1], 1)
+    return date(day.year - 1, start_months[-1], 1)
+
+
+def backfill_leaderboards(apps, schema_editor):
+    StudentDailyScore = apps.get_model('api', 'StudentDailyScore')
+    SchoolClass = apps.get_model('api', 'SchoolClass')
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+    class_grades = dict(SchoolClass.objects.values_list('id', 'grade_id'))
+
+    totals = defaultdict(lambda: [0, 0])
+    for row in StudentDailyScore.objects.order_by().values().iterator():
+        net = row['positive_points'] - row['negative_points']
+        count = row['positive_count'] + row['negative_count']
+        for scope, scope_id in (('class', row['school_class_id']), ('grade', class_grades.get(row['school_class_id']))):
+            if scope_id is None:
+                continue
+            for period in ('week', 'month', 'term'):
+                key = (scope, scope_id, period, period_start(period, row['date']), row['student_id'])
+                totals[key][0] += net
+                totals[key][1] += count
+
+    LeaderboardEntry.objects.bulk_create(
+        (
+            LeaderboardEntry(scope=key[0], scope_id=key[1], period=key[2], period_start=key[3],
+                             student_id=key[4], net_points=net, score_count=count)
+            for key, (net, count) in totals.items()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_studentdailyscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('class', 'Class'), ('grade', 'Grade')], max_length=10)),
+                ('scope_id', models.PositiveIntegerField(help_text='SchoolClass or Grade id, depending on scope')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month'), ('term', 'Term')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('net_points', models.IntegerField(default=0)),
+                ('score_count', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard Entries',
+                'indexes': [models.Index(fields=['scope', 'scope_id', 'period', 'period_start', 'net_points'], name='leaderboard_rank_idx')],
+                'unique_together': {('scope', 'scope_id', 'period', 'period_start', 'student')},
+            },
+        ),
+        migrations.RunPython(backfill_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_score_changes(apps, schema_editor):
+    """
+    Log every existing score so the first sync without a cursor returns them all
+    """
+    BehaviorScore = apps.get_model('api', 'BehaviorScore')
+    BehaviorScoreChange = apps.get_model('api', 'BehaviorScoreChange')
+    BehaviorScoreChange.objects.bulk_create(
+        (
+            BehaviorScoreChange(score_id=score_id, student_id=student_id, school_class_id=school_class_id)
+            for score_id, student_id, school_class_id in BehaviorScore.objects.order_by('id')
+            .values_list('id', 'student_id', 'school_class_id').iterator()
+        ),
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BehaviorScoreChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_id', models.PositiveIntegerField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+                ('school_class', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.schoolclass')),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(backfill_score_changes, migrations.RunPython.noop),
+    ]
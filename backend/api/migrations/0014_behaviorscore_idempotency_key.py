@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_behaviorscorechange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='behaviorscore',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
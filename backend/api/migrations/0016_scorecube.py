@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_score_cube(apps, schema_editor):
+    """
+    Fold the existing StudentDailyScore rollup into the cube
+    """
+    StudentDailyScore = apps.get_model('api', 'StudentDailyScore')
+    ScoreCube = apps.get_model('api', 'ScoreCube')
+    rows = (
+        StudentDailyScore.objects.order_by()
+        .values('school_class__grade_id', 'school_class_id', 'dimension__chapter_id', 'dimension_id', 'date')
+        .annotate(
+            positives=Sum('positive_count'),
+            negatives=Sum('negative_count'),
+            positive_total=Sum('positive_points'),
+            negative_total=Sum('negative_points'),
+        )
+    )
+    ScoreCube.objects.bulk_create(
+        (
+            ScoreCube(
+                grade_id=row['school_class__grade_id'],
+                school_class_id=row['school_class_id'],
+                chapter_id=row['dimension__chapter_id'],
+                dimension_id=row['dimension_id'],
+                date=row['date'],
+                positive_count=row['positives'],
+                negative_count=row['negatives'],
+                positive_points=row['positive_total'],
+                negative_points=row['negative_total'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_reportcacheinvalidation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('positive_count', models.PositiveIntegerField(default=0)),
+                ('negative_count', models.PositiveIntegerField(default=0)),
+                ('positive_points', models.IntegerField(default=0)),
+                ('negative_points', models.IntegerField(default=0)),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_cube', to='api.rulechapter')),
+                ('dimension', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_cube', to='api.ruledimension')),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_cube', to='api.grade')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_cube', to='api.schoolclass')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='cube_date_idx'), models.Index(fields=['school_class', 'date'], name='cube_class_date_idx'), models.Index(fields=['chapter', 'date'], name='cube_chapter_date_idx'), models.Index(fields=['dimension', 'date'], name='cube_dimension_date_idx')],
+                'unique_together': {('grade', 'school_class', 'chapter', 'dimension', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_score_cube, migrations.RunPython.noop),
+    ]
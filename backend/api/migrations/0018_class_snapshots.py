@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_class_snapshots(apps, schema_editor):
+    """
+    Scores take the grade of the class they were recorded in. Awards predate the
+    snapshot, so they take the student's current home class as the best available guess.
+    """
+    BehaviorScore = apps.get_model('api', 'BehaviorScore')
+    Award = apps.get_model('api', 'Award')
+    SchoolClass = apps.get_model('api', 'SchoolClass')
+    CustomUser = apps.get_model('api', 'CustomUser')
+    BehaviorScore.objects.update(grade_id=Subquery(
+        SchoolClass.objects.filter(id=OuterRef('school_class_id')).values('grade_id')[:1]
+    ))
+    students = CustomUser.objects.filter(id=OuterRef('student_id'))
+    Award.objects.update(
+        school_class_id=Subquery(students.values('school_class_id')[:1]),
+        grade_id=Subquery(students.values('school_class__grade_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='award',
+            name='grade',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='awards', to='api.grade'),
+        ),
+        migrations.AddField(
+            model_name='award',
+            name='school_class',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='awards', to='api.schoolclass'),
+        ),
+        migrations.AddField(
+            model_name='behaviorscore',
+            name='grade',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='behavior_scores', to='api.grade'),
+        ),
+        migrations.AddIndex(
+            model_name='award',
+            index=models.Index(fields=['grade', 'award_date'], name='award_grade_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='award',
+            index=models.Index(fields=['school_class', 'award_date'], name='award_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behaviorscore',
+            index=models.Index(fields=['grade', 'date_of_behavior'], name='bscore_grade_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scorecube',
+            index=models.Index(fields=['grade', 'date'], name='cube_grade_date_idx'),
+        ),
+        migrations.RunPython(backfill_class_snapshots, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='behaviorscore',
+            name='grade',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='behavior_scores', to='api.grade'),
+        ),
+    ]
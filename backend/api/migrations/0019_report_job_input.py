@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:32
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_class_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='input_file',
+            field=models.FileField(blank=True, storage=api.models.report_job_storage, upload_to='input/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='progress_detail',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def rebuild_daily_scores(apps, schema_editor):
+    """
+    Regroup the rollup from raw scores by their grade snapshot. Scores of one class
+    recorded before and after the class changed grade land in separate rows.
+    """
+    BehaviorScore = apps.get_model('api', 'BehaviorScore')
+    StudentDailyScore = apps.get_model('api', 'StudentDailyScore')
+    positive, negative = Q(score_type='positive'), Q(score_type='negative')
+    rows = (
+        BehaviorScore.objects.order_by()
+        .values('student_id', 'school_class_id', 'grade_id', 'rule_sub_item__dimension_id', 'date_of_behavior')
+        .annotate(
+            positive_count=Count('id', filter=positive),
+            negative_count=Count('id', filter=negative),
+            positive_points=Coalesce(Sum('points', filter=positive), 0),
+            negative_points=Coalesce(Sum('points', filter=negative), 0),
+        )
+    )
+    StudentDailyScore.objects.all().delete()
+    StudentDailyScore.objects.bulk_create(
+        (
+            StudentDailyScore(
+                student_id=row['student_id'], school_class_id=row['school_class_id'], grade_id=row['grade_id'],
+                dimension_id=row['rule_sub_item__dimension_id'], date=row['date_of_behavior'],
+                positive_count=row['positive_count'], negative_count=row['negative_count'],
+                positive_points=row['positive_points'], negative_points=row['negative_points'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_report_job_input'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentdailyscore',
+            name='grade',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_scores', to='api.grade'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentdailyscore',
+            unique_together={('student', 'school_class', 'grade', 'dimension', 'date')},
+        ),
+        migrations.RunPython(rebuild_daily_scores, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='studentdailyscore',
+            name='grade',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_scores', to='api.grade'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 
 class UserRole(models.TextChoices):
     STUDENT = 'student', 'Student'
@@ -146,12 +149,63 @@ class RuleSubItem(models.Model):
         unique_together = ('dimension', 'name')
         ordering = ['dimension', 'order', 'name']
 
+class CacheVersion(models.Model):
+    """
+    Monotonic version counters shared by every worker process.
+    In-process caches compare their snapshot against the stored version and
+    rebuild when a write elsewhere has bumped it.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Increment the named counter, creating it on first use
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(version=models.F('version') + 1):
+                _, created = cls.objects.get_or_create(name=name, defaults={'version': 1})
+                if not created:
+                    cls.objects.filter(name=name).update(version=models.F('version') + 1)
+
+class ReportCacheInvalidation(models.Model):
+    """
+    Footprint of a write that can change cached report results (see report_cache.py).
+    Every process replays new rows against its own cache and evicts only the entries
+    whose sources, dates, grades and classes overlap. Null bounds or id lists mean
+    the write may affect everything along that axis.
+    """
+    source = models.CharField(max_length=30)
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    grade_ids = models.JSONField(null=True, blank=True)
+    class_ids = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.source} {self.date_from}..{self.date_to}"
+
 # Models for Behavior Tracking and Scoring
 
 class ScoreType(models.TextChoices):
     POSITIVE = 'positive', 'Positive'
     NEGATIVE = 'negative', 'Negative'
 
+class BehaviorScoreQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create bypasses save(), which normally takes the grade snapshot
+        objs = list(objs)
+        BehaviorScore.assign_grades([score for score in objs if score.grade_id is None])
+        return super().bulk_create(objs, *args, **kwargs)
+
 class BehaviorScore(models.Model):
     """Model to record behavior scores for students"""
     student = models.ForeignKey(
@@ -175,6 +229,14 @@ class BehaviorScore(models.Model):
         on_delete=models.CASCADE,
         related_name='behavior_scores'
     )
+    # Grade of school_class when the score was recorded, so grade filters need no joins
+    # and later class moves do not rewrite history
+    grade = models.ForeignKey(
+        Grade,
+        on_delete=models.CASCADE,
+        related_name='behavior_scores',
+        editable=False
+    )
     score_type = models.CharField(
         max_length=10,
         choices=ScoreType.choices,
@@ -184,14 +246,211 @@ class BehaviorScore(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     date_of_behavior = models.DateField()
+    # Client-generated key making retried submissions from offline devices idempotent
+    idempotency_key = models.UUIDField(null=True, blank=True, unique=True)
+
+    objects = BehaviorScoreQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.student.username} - {self.rule_sub_item.name} - {self.points} points"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_class_id = instance.__dict__.get('school_class_id')
+        return instance
+
+    @classmethod
+    def assign_grades(cls, scores):
+        """
+        Set the grade snapshot of scores from their school_class in one query
+        """
+        scores = [score for score in scores if score.school_class_id is not None]
+        if not scores:
+            return
+        class_grades = dict(
+            SchoolClass.objects.filter(id__in={score.school_class_id for score in scores})
+            .values_list('id', 'grade_id')
+        )
+        for score in scores:
+            score.grade_id = class_grades.get(score.school_class_id)
+            score._snapshot_class_id = score.school_class_id
+
+    def save(self, *args, **kwargs):
+        # Take the grade snapshot on creation and whenever the score moves to another class
+        if self.school_class_id is not None and (
+                self.grade_id is None or self.school_class_id != getattr(self, '_snapshot_class_id', None)):
+            self.grade_id = self.school_class.grade_id
+            self._snapshot_class_id = self.school_class_id
+        # The StudentDailyScore rollup is updated from the save signals; keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Behavior Score"
         verbose_name_plural = "Behavior Scores"
+        # Composite indexes matching the report, summary and list filters
+        indexes = [
+            models.Index(fields=['student', 'date_of_behavior'], name='bscore_student_date_idx'),
+            models.Index(fields=['school_class', 'date_of_behavior'], name='bscore_class_date_idx'),
+            models.Index(fields=['grade', 'date_of_behavior'], name='bscore_grade_date_idx'),
+            models.Index(fields=['score_type', 'date_of_behavior'], name='bscore_type_date_idx'),
+            models.Index(fields=['date_of_behavior'], name='bscore_date_idx'),
+            models.Index(fields=['created_at'], name='bscore_created_idx'),
+        ]
+
+class BehaviorScoreChange(models.Model):
+    """
+    Change log behind the behavior score delta-sync endpoint.
+    Each score has a single row, re-inserted on every change so the auto-increment
+    id orders changes; deleted scores leave a tombstone row (deleted=True).
+    Student and class are kept without FK constraints so tombstones outlive them.
+    """
+    score_id = models.PositiveIntegerField(unique=True)
+    student = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    school_class = models.ForeignKey(
+        SchoolClass,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Score {self.score_id} {'deleted' if self.deleted else 'changed'} (#{self.id})"
+
+    class Meta:
+        ordering = ['id']
+
+class StudentDailyScore(models.Model):
+    """
+    Rollup of BehaviorScore per student, class, grade snapshot, rule dimension and day.
+    Kept current on every BehaviorScore write (see score_rollups.py) so summaries
+    and reports scale with students x days instead of individual score events.
+    """
+    student = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='daily_scores',
+        limit_choices_to={'role': UserRole.STUDENT}
+    )
+    school_class = models.ForeignKey(
+        SchoolClass,
+        on_delete=models.CASCADE,
+        related_name='daily_scores'
+    )
+    # BehaviorScore.grade of the rolled-up scores, so the leaderboards and cube derived
+    # from this table keep scores in the grade they were recorded in
+    grade = models.ForeignKey(
+        Grade,
+        on_delete=models.CASCADE,
+        related_name='daily_scores'
+    )
+    dimension = models.ForeignKey(
+        RuleDimension,
+        on_delete=models.CASCADE,
+        related_name='daily_scores'
+    )
+    date = models.DateField()
+    positive_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    positive_points = models.IntegerField(default=0)
+    negative_points = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.student.username} - {self.dimension.name} - {self.date}"
+
+    class Meta:
+        unique_together = ('student', 'school_class', 'grade', 'dimension', 'date')
+        ordering = ['-date']
+        verbose_name = "Student Daily Score"
+        verbose_name_plural = "Student Daily Scores"
+        indexes = [
+            models.Index(fields=['school_class', 'date'], name='dailyscore_class_date_idx'),
+            models.Index(fields=['date'], name='dailyscore_date_idx'),
+        ]
+
+class ScoreCube(models.Model):
+    """
+    Analytics cube of behavior scores per grade, class, chapter, dimension and day,
+    derived from StudentDailyScore and kept current with it (see score_rollups.py).
+    Grade is the grade of the class a score was recorded in. Serves /reports/cube/,
+    which rolls days up to weeks or months at query time.
+    """
+    grade = models.ForeignKey(Grade, on_delete=models.CASCADE, related_name='score_cube')
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='score_cube')
+    chapter = models.ForeignKey(RuleChapter, on_delete=models.CASCADE, related_name='score_cube')
+    dimension = models.ForeignKey(RuleDimension, on_delete=models.CASCADE, related_name='score_cube')
+    date = models.DateField()
+    positive_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    positive_points = models.IntegerField(default=0)
+    negative_points = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.school_class_id} - {self.dimension_id} - {self.date}"
+
+    class Meta:
+        unique_together = ('grade', 'school_class', 'chapter', 'dimension', 'date')
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date'], name='cube_date_idx'),
+            models.Index(fields=['grade', 'date'], name='cube_grade_date_idx'),
+            models.Index(fields=['school_class', 'date'], name='cube_class_date_idx'),
+            models.Index(fields=['chapter', 'date'], name='cube_chapter_date_idx'),
+            models.Index(fields=['dimension', 'date'], name='cube_dimension_date_idx'),
+        ]
+
+class LeaderboardScope(models.TextChoices):
+    CLASS = 'class', 'Class'
+    GRADE = 'grade', 'Grade'
+
+class LeaderboardPeriod(models.TextChoices):
+    WEEK = 'week', 'Week'
+    MONTH = 'month', 'Month'
+    TERM = 'term', 'Term'
+
+class LeaderboardEntry(models.Model):
+    """
+    Running net points of one student within a ranking scope (class or grade) and period.
+    Updated incrementally alongside StudentDailyScore so top-N and rank lookups are
+    index seeks instead of re-aggregating the scores.
+    """
+    scope = models.CharField(max_length=10, choices=LeaderboardScope.choices)
+    scope_id = models.PositiveIntegerField(help_text="SchoolClass or Grade id, depending on scope")
+    period = models.CharField(max_length=10, choices=LeaderboardPeriod.choices)
+    period_start = models.DateField()
+    student = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        limit_choices_to={'role': UserRole.STUDENT}
+    )
+    net_points = models.IntegerField(default=0)
+    score_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.student.username} - {self.scope} {self.scope_id} {self.period} {self.period_start}: {self.net_points}"
+
+    class Meta:
+        unique_together = ('scope', 'scope_id', 'period', 'period_start', 'student')
+        verbose_name = "Leaderboard Entry"
+        verbose_name_plural = "Leaderboard Entries"
+        indexes = [
+            models.Index(fields=['scope', 'scope_id', 'period', 'period_start', 'net_points'],
+                         name='leaderboard_rank_idx'),
+        ]
 
 class ParentObservation(models.Model):
     """Model for parents to submit observations about their children"""
@@ -242,6 +501,11 @@ class ParentObservation(models.Model):
         ordering = ['-created_at']
         verbose_name = "Parent Observation"
         verbose_name_plural = "Parent Observations"
+        indexes = [
+            models.Index(fields=['student', 'date_of_behavior'], name='pobs_student_date_idx'),
+            models.Index(fields=['status', 'created_at'], name='pobs_status_created_idx'),
+            models.Index(fields=['created_at'], name='pobs_created_idx'),
+        ]
 
 class StudentSelfReport(models.Model):
     """Model for students to self-report positive behaviors"""
@@ -286,6 +550,18 @@ class StudentSelfReport(models.Model):
         ordering = ['-created_at']
         verbose_name = "Student Self Report"
         verbose_name_plural = "Student Self Reports"
+        indexes = [
+            models.Index(fields=['student', 'date_of_behavior'], name='sreport_student_date_idx'),
+            models.Index(fields=['status', 'created_at'], name='sreport_status_created_idx'),
+            models.Index(fields=['created_at'], name='sreport_created_idx'),
+        ]
+
+class AwardQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create bypasses save(), which normally takes the class snapshot
+        objs = list(objs)
+        Award.assign_classes([award for award in objs if award.school_class_id is None])
+        return super().bulk_create(objs, *args, **kwargs)
 
 class Award(models.Model):
     """Model for student awards and star ratings"""
@@ -319,14 +595,70 @@ class Award(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     award_date = models.DateField()
+    # The student's home class and its grade when the award was made, so class and
+    # grade filters need no joins and later promotions do not rewrite history
+    school_class = models.ForeignKey(
+        SchoolClass,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='awards',
+        editable=False
+    )
+    grade = models.ForeignKey(
+        Grade,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='awards',
+        editable=False
+    )
+
+    objects = AwardQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.student.username} - {self.name} ({self.get_award_type_display()}, Level: {self.level})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_student_id = instance.__dict__.get('student_id')
+        return instance
+
+    @classmethod
+    def assign_classes(cls, awards):
+        """
+        Set the class and grade snapshot of awards from their students' home classes in one query
+        """
+        if not awards:
+            return
+        student_classes = {
+            student_id: (class_id, grade_id)
+            for student_id, class_id, grade_id in CustomUser.objects
+            .filter(id__in={award.student_id for award in awards})
+            .values_list('id', 'school_class_id', 'school_class__grade_id')
+        }
+        for award in awards:
+            award.school_class_id, award.grade_id = student_classes.get(award.student_id, (None, None))
+            award._snapshot_student_id = award.student_id
+
+    def save(self, *args, **kwargs):
+        # Take the class snapshot on creation and whenever the award moves to another student
+        if self._state.adding or self.student_id != getattr(self, '_snapshot_student_id', None):
+            Award.assign_classes([self])
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-award_date', '-level']
         verbose_name = "Award"
         verbose_name_plural = "Awards"
+        indexes = [
+            models.Index(fields=['student', 'award_date'], name='award_student_date_idx'),
+            models.Index(fields=['award_date', 'level'], name='award_date_level_idx'),
+            models.Index(fields=['award_type', 'award_date'], name='award_type_date_idx'),
+            models.Index(fields=['grade', 'award_date'], name='award_grade_date_idx'),
+            models.Index(fields=['school_class', 'award_date'], name='award_class_date_idx'),
+        ]
 
 
 class NotificationType(models.TextChoices):
@@ -358,6 +690,62 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        # Serves the per-user inbox, which is always read newest-first
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+
+
+class ReportJobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+    SUCCEEDED = 'succeeded', 'Succeeded'
+    FAILED = 'failed', 'Failed'
+
+
+def report_job_storage():
+    return FileSystemStorage(location=settings.REPORT_JOB_RESULT_DIR)
+
+
+class ReportJob(models.Model):
+    """
+    A report, export or import queued to run outside the request cycle (see report_jobs.py).
+    The run_report_jobs worker claims queued rows, runs the target action as the
+    requesting user and keeps the result: JSON in result, files in result_file.
+    Imports read their upload from input_file, which is deleted once the job ends.
+    """
+    target = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    requested_by = models.ForeignKey(CustomUser, related_name='report_jobs', on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=20,
+        choices=ReportJobStatus.choices,
+        default=ReportJobStatus.QUEUED
+    )
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    # Running counters reported alongside progress, e.g. rows processed so far
+    progress_detail = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    result_file = models.FileField(upload_to='%Y/%m/', storage=report_job_storage, blank=True)
+    input_file = models.FileField(upload_to='input/%Y/%m/', storage=report_job_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched by every progress update; a running job that stops updating is stale
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='reportjob_status_idx'),
+            models.Index(fields=['requested_by', 'created_at'], name='reportjob_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target} #{self.id} ({self.status})"
+
@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords the pool's start-up costs more than it saves
+PARALLEL_HASH_MIN_PASSWORDS = 16
+
+
+def _hash_chunk(passwords):
+    # Runs in a worker process; settings are configured from DJANGO_SETTINGS_MODULE,
+    # which the workers inherit. This module imports no models, so no app setup is needed.
+    return [make_password(password) for password in passwords]
+
+
+def hash_worker_count():
+    """
+    Worker processes for password hashing: PASSWORD_HASH_WORKERS, or the CPUs this
+    process may run on
+    """
+    return settings.PASSWORD_HASH_WORKERS or os.process_cpu_count() or 1
+
+
+class PasswordHasher:
+    """
+    make_password for many passwords, spread over a process pool. Hashing is CPU
+    bound and holds the GIL, so threads would not help; small batches and single-CPU
+    hosts hash inline.
+
+    The pool is started on the first batch large enough to need it and reused for
+    every later one, so a chunked import pays the spawn and Django import cost of
+    its workers once. Use it as a context manager to shut the pool down.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or hash_worker_count()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __call__(self, passwords):
+        """
+        Hashes of passwords, in input order
+        """
+        passwords = list(passwords)
+        workers = min(self.workers, len(passwords))
+        if workers <= 1 or len(passwords) < PARALLEL_HASH_MIN_PASSWORDS:
+            return _hash_chunk(passwords)
+
+        if self._pool is None:
+            # spawn rather than fork: the parent may be a threaded server holding database connections
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        # A few chunks per worker keeps them all busy to the end without per-password IPC
+        chunk_size = -(-len(passwords) // (workers * 4))
+        chunks = [passwords[start:start + chunk_size] for start in range(0, len(passwords), chunk_size)]
+        return [password for hashed in self._pool.map(_hash_chunk, chunks) for password in hashed]
+
+
+def make_passwords(passwords, workers=None):
+    """
+    Hash one batch of passwords with a pool of its own; callers hashing several
+    batches share a PasswordHasher instead. Returns the hashes in input order.
+    """
+    with PasswordHasher(workers) as hash_passwords:
+        return hash_passwords(passwords)
@@ -0,0 +1,239 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import CustomUser, ReportCacheInvalidation, SchoolClass
+
+# Data sources a cached report can depend on, named in invalidation rows
+SCORES = 'behavior_scores'
+AWARDS = 'awards'
+OBSERVATIONS = 'parent_observations'
+SELF_REPORTS = 'self_reports'
+RULES = 'rules'
+
+# Invalidation rows older than this are pruned; cached entries never live that long
+INVALIDATION_RETENTION = timedelta(days=1)
+
+
+class ReportCache:
+    """
+    Bounded, process-local LRU cache of report results with a TTL.
+
+    Each entry carries the footprint it was computed from: source tables, date range,
+    grade and class. Writes are logged as ReportCacheInvalidation rows; before serving
+    a hit the cache replays rows it has not seen yet (one query) and evicts only the
+    entries they overlap. Lookups for keys not in the cache skip the log entirely.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_seen = None
+        self.stats = dict.fromkeys(('hits', 'misses', 'expired', 'evicted', 'invalidated'), 0)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.stats['misses'] += 1
+                return None
+        self.sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key, footprint, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, footprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def sync(self):
+        """
+        Apply invalidations logged since the last sync, by any process
+        """
+        if self._last_seen is None:
+            # Entries were stored before this process knew its place in the log,
+            # so they cannot be vouched for; start clean from the current position
+            last_seen = ReportCacheInvalidation.objects.aggregate(last=Max('id'))['last'] or 0
+            with self._lock:
+                self.stats['invalidated'] += len(self._entries)
+                self._entries.clear()
+                self._last_seen = last_seen
+            return
+
+        rows = list(
+            ReportCacheInvalidation.objects.filter(id__gt=self._last_seen).order_by('id')
+            .values_list('id', 'source', 'date_from', 'date_to', 'grade_ids', 'class_ids')
+        )
+        if not rows:
+            return
+        with self._lock:
+            stale = [
+                key for key, (_, footprint, _) in self._entries.items()
+                if any(_overlaps(footprint, row[1:]) for row in rows)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.stats['invalidated'] += len(stale)
+            self._last_seen = max(self._last_seen, rows[-1][0])
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self._last_seen = None
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def info(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+            }
+
+
+def _overlaps(footprint, invalidation):
+    sources, start, end, grade_id, class_id = footprint
+    source, date_from, date_to, grade_ids, class_ids = invalidation
+    if source not in sources:
+        return False
+    if start is not None and date_to is not None and date_to < start:
+        return False
+    if end is not None and date_from is not None and date_from > end:
+        return False
+    if grade_id is not None and grade_ids is not None and grade_id not in grade_ids:
+        return False
+    if class_id is not None and class_ids is not None and class_id not in class_ids:
+        return False
+    return True
+
+
+report_cache = ReportCache(
+    max_entries=getattr(settings, 'REPORT_CACHE_MAX_ENTRIES', 256),
+    ttl=getattr(settings, 'REPORT_CACHE_TTL_SECONDS', 300),
+)
+
+
+def _parse_id(value):
+    return int(value) if value not in (None, '') else None
+
+
+def cached_report(*sources, default_days=None):
+    """
+    Cache a ReportsViewSet action keyed by (action, normalized params, caller scope).
+
+    sources names the data the report reads. default_days is the look-back applied
+    when start_date is omitted (None for an unbounded report). Requests with params
+    that do not parse are passed through so the action can reject them.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            params = request.query_params
+            try:
+                start = date_type.fromisoformat(params['start_date']) if params.get('start_date') else None
+                end = date_type.fromisoformat(params['end_date']) if params.get('end_date') else None
+                grade_id = _parse_id(params.get('grade_id'))
+                class_id = _parse_id(params.get('class_id'))
+            except ValueError:
+                return view_method(self, request, *args, **kwargs)
+
+            today = timezone.localdate()
+            if start is None and default_days is not None:
+                start = (end or today) - timedelta(days=default_days)
+
+            # Defaults depend on the current day, so it is part of the key
+            key = (
+                view_method.__name__,
+                tuple(sorted((name, value) for name, value in params.items())),
+                today,
+                getattr(request.user, 'role', None),
+            )
+            cached = report_cache.get(key)
+            if cached is not None:
+                return Response(cached, headers={'X-Report-Cache': 'hit'})
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                report_cache.set(key, (frozenset(sources), start, end, grade_id, class_id), response.data)
+                response['X-Report-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_reports(source, dates=None, class_ids=None, student_ids=None):
+    """
+    Log a write touching source on the given dates, for rows recorded in class_ids or
+    belonging to student_ids. Grades are derived from those classes and the students'
+    home classes. Passing None for dates or for both id lists invalidates that axis entirely.
+    """
+    dates = [day for day in (dates or []) if day is not None] if dates is not None else None
+    grade_ids = None
+    all_class_ids = None
+    if class_ids is not None or student_ids is not None:
+        classes = SchoolClass.objects.filter(id__in=set(class_ids or [])) | SchoolClass.objects.filter(
+            id__in=CustomUser.objects.filter(id__in=set(student_ids or [])).values('school_class_id')
+        )
+        rows = list(classes.order_by().values_list('id', 'grade_id').distinct())
+        all_class_ids = sorted({class_id for class_id, _ in rows} | {c for c in class_ids or [] if c is not None})
+        grade_ids = sorted({grade_id for _, grade_id in rows})
+
+    row = ReportCacheInvalidation.objects.create(
+        source=source,
+        date_from=min(dates) if dates else None,
+        date_to=max(dates) if dates else None,
+        grade_ids=grade_ids,
+        class_ids=all_class_ids,
+    )
+    if row.id % 500 == 0:
+        ReportCacheInvalidation.objects.filter(
+            created_at__lt=timezone.now() - INVALIDATION_RETENTION
+        ).delete()
+
+
+def local_date(moment):
+    """
+    Local calendar day of a timestamp (created_at columns), or None
+    """
+    return timezone.localdate(moment) if moment else None
+
+
+def invalidate_for_scores(scores):
+    """
+    Invalidate the reports affected by created, edited or deleted BehaviorScore rows
+    """
+    scores = list(scores)
+    if scores:
+        invalidate_reports(
+            SCORES,
+            dates=[score.date_of_behavior for score in scores] + [local_date(score.created_at) for score in scores],
+            class_ids=[score.school_class_id for score in scores],
+            student_ids=[score.student_id for score in scores],
+        )
@@ -0,0 +1,189 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.temp import NamedTemporaryFile
+from django.db.models import F
+from django.http import HttpRequest, QueryDict, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+from .models import ReportJob, ReportJobStatus
+
+# Jobs a client may submit: target -> (viewset, action, result filename or None for JSON)
+JOB_TARGETS = {
+    'behavior-time-series': ('api.reports.ReportsViewSet', 'behavior_time_series', None),
+    'award-analytics': ('api.reports.ReportsViewSet', 'award_analytics', None),
+    'user-engagement': ('api.reports.ReportsViewSet', 'user_engagement', None),
+    'dimension-analysis': ('api.reports.ReportsViewSet', 'dimension_analysis', None),
+    'leaderboard': ('api.reports.ReportsViewSet', 'leaderboard', None),
+    'cube': ('api.reports.ReportsViewSet', 'cube', None),
+    'distribution': ('api.reports.ReportsViewSet', 'distribution', None),
+    'behavior-scores-export': ('api.views.BehaviorScoreViewSet', 'export_scores', 'behavior_scores.csv'),
+    'users-export': ('api.views.UserViewSet', 'export_users', 'users.csv'),
+}
+
+# Jobs created by their own endpoints rather than POST /report-jobs/: target -> handler,
+# a function taking the claimed job and returning its JSON result
+JOB_HANDLERS = {
+    'users-import': 'api.user_import.run_import_job',
+}
+
+
+def target_view(target):
+    """
+    (viewset class, action name, result filename) for a job target
+    """
+    viewset_path, action_name, filename = JOB_TARGETS[target]
+    return import_string(viewset_path), action_name, filename
+
+
+def job_request(job):
+    """
+    A GET request for the job's target carrying its params, authenticated as the
+    user who submitted it, so the action applies that user's permissions and scope
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = f'/report-jobs/{job.id}/'
+    request.META['SERVER_NAME'] = 'report-worker'
+    request.META['SERVER_PORT'] = '80'
+    query = QueryDict(mutable=True)
+    for name, value in job.params.items():
+        query.setlist(name, [str(item) for item in value] if isinstance(value, list) else [str(value)])
+    request.GET = query
+    # Honoured by rest_framework.request.Request in place of the configured authenticators
+    request._force_auth_user = job.requested_by
+    request.report_job = job
+    return request
+
+
+def report_progress(request, done, total):
+    """
+    Record how far a job has got; a no-op when the action is serving a normal request
+    """
+    job = getattr(request, 'report_job', None)
+    if job is None or not total:
+        return
+    update_job_progress(job, done * 100 // total)
+
+
+def update_job_progress(job, progress, detail=None):
+    """
+    Store a running job's percent complete (capped below 100 until the result is
+    stored) and, optionally, its progress counters
+    """
+    progress = min(99, progress)
+    if progress != job.progress or (detail is not None and detail != job.progress_detail):
+        job.progress = progress
+        changes = {'progress': progress, 'updated_at': timezone.now()}
+        if detail is not None:
+            job.progress_detail = changes['progress_detail'] = detail
+        ReportJob.objects.filter(id=job.id).update(**changes)
+
+
+def run_job(job):
+    """
+    Run a claimed job to completion and store its result or error
+    """
+    try:
+        if job.target in JOB_HANDLERS:
+            job.result = import_string(JOB_HANDLERS[job.target])(job)
+        else:
+            run_target_view(job)
+    except Exception as exc:
+        job.status = ReportJobStatus.FAILED
+        job.error = str(exc) or exc.__class__.__name__
+    else:
+        job.status = ReportJobStatus.SUCCEEDED
+        job.progress = 100
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def run_target_view(job):
+    """
+    Run a JOB_TARGETS action for the job and keep its response as the result
+    """
+    viewset_class, action_name, filename = target_view(job.target)
+    response = viewset_class.as_view({'get': action_name})(job_request(job))
+
+    if response.status_code >= 400:
+        detail = response.data.get('detail') if isinstance(getattr(response, 'data', None), dict) else None
+        raise ValueError(detail or f'The report returned status {response.status_code}.')
+
+    if filename is None:
+        job.result = response.data if isinstance(response, Response) else None
+    elif isinstance(response, StreamingHttpResponse):
+        # Spool to disk so large exports never sit in memory
+        with NamedTemporaryFile() as spool:
+            for chunk in response.streaming_content:
+                spool.write(chunk)
+            job.result_file.save(filename, File(spool), save=False)
+    else:
+        job.result_file.save(filename, ContentFile(response.content), save=False)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running and return it, or None.
+    Uses a conditional UPDATE, so concurrent workers never claim the same row.
+    """
+    while True:
+        job_id = ReportJob.objects.filter(status=ReportJobStatus.QUEUED).order_by('id') \
+            .values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(id=job_id, status=ReportJobStatus.QUEUED).update(
+            status=ReportJobStatus.RUNNING, started_at=now, updated_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ReportJob.objects.select_related('requested_by').get(id=job_id)
+
+
+def requeue_stale_jobs():
+    """
+    Requeue running jobs whose worker stopped reporting, failing those out of attempts;
+    returns the number of jobs touched
+    """
+    stale = ReportJob.objects.filter(
+        status=ReportJobStatus.RUNNING,
+        updated_at__lt=timezone.now() - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+    )
+    failed = stale.filter(attempts__gte=settings.REPORT_JOB_MAX_ATTEMPTS).update(
+        status=ReportJobStatus.FAILED, error='The worker running this job stopped responding.',
+        finished_at=timezone.now()
+    )
+    return failed + stale.update(status=ReportJobStatus.QUEUED, progress=0)
+
+
+def prune_jobs():
+    """
+    Delete finished jobs past the retention period together with their result files
+    """
+    expired = ReportJob.objects.filter(
+        status__in=[ReportJobStatus.SUCCEEDED, ReportJobStatus.FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=settings.REPORT_JOB_RETENTION_DAYS)
+    )
+    for job in expired.exclude(result_file='', input_file='').only('id', 'result_file', 'input_file'):
+        job.result_file.delete(save=False)
+        job.input_file.delete(save=False)
+    return expired.delete()[0]
+
+
+def run_pending_jobs(limit=None):
+    """
+    Run queued jobs one after another until none are left (or limit is reached);
+    returns the number of jobs run
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
@@ -1,16 +1,24 @@
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponse
 from django.db.models import Count, Sum, Avg, Q, F
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
 from rest_framework.decorators import action
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.response import Response
 from .models import (CustomUser, Grade, SchoolClass, BehaviorScore, 
-                    ParentObservation, StudentSelfReport, Award, UserRole, ScoreType)
+                    ParentObservation, StudentSelfReport, Award, UserRole, ScoreType,
+                    LeaderboardEntry, LeaderboardScope, LeaderboardPeriod, ScoreCube)
+from .report_cache import (AWARDS, OBSERVATIONS, RULES, SCORES, SELF_REPORTS,
+                           cached_report, report_cache)
+from .rule_tree import get_rule_tree
+from .score_rollups import ROLLUP_FIELDS, period_start, period_end, raw_measures, rollup_measures
 from .permissions import (IsSystemAdmin, IsPrincipal, IsDirector, 
                          CanExportReports)
 import json
-from datetime import datetime, timedelta
+from datetime import date as date_type, datetime, time, timedelta
+
+import numpy as np
 
 class ReportsViewSet(viewsets.ViewSet):
     """
@@ -22,98 +30,150 @@ class ReportsViewSet(viewsets.ViewSet):
         """
         Only users with CanExportReports permission can access reports.
         """
-        if self.action in ['behavior_time_series', 'award_analytics', 'user_engagement', 'dimension_analysis']:
+        if self.action in ['behavior_time_series', 'award_analytics', 'user_engagement', 'dimension_analysis',
+                           'leaderboard', 'cube', 'distribution']:
             self.permission_classes = [permissions.IsAuthenticated, CanExportReports]
+        elif self.action == 'cache_stats':
+            self.permission_classes = [permissions.IsAuthenticated, IsSystemAdmin]
         return super().get_permissions()
     
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """
+        Hit, miss and eviction counters of this worker process's report cache, for tuning
+        REPORT_CACHE_MAX_ENTRIES and REPORT_CACHE_TTL_SECONDS
+        """
+        stats = report_cache.info()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        return Response(stats)
+    
+    # Longest gap-filled series behavior_time_series will build (about ten years of days)
+    MAX_TIME_SERIES_BUCKETS = 3660
+    
     @action(detail=False, methods=['get'], url_path='behavior-time-series')
+    @cached_report(SCORES, default_days=30)
     def behavior_time_series(self, request):
         """
         Generate time-series data for behavior scores
+        
+        Positive and negative counts and points are aggregated per bucket in one query
+        and gap-filled over the requested range, so every bucket is present even when
+        nothing was recorded. layout=columnar returns parallel arrays instead of the
+        default positive_series/negative_series point lists.
         """
         # Get query parameters
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
         grade_id = request.query_params.get('grade_id')
         class_id = request.query_params.get('class_id')
         interval = request.query_params.get('interval', 'day')  # day, week, month
+        if interval not in ('day', 'week', 'month'):
+            interval = 'day'
+        columnar = request.query_params.get('layout') == 'columnar'
         
-        # Base queryset
-        queryset = BehaviorScore.objects.all()
-        
-        # Apply filters
-        if start_date:
-            queryset = queryset.filter(date_of_behavior__gte=start_date)
-        else:
+        try:
+            end_date = date_type.fromisoformat(request.query_params['end_date']) \
+                if request.query_params.get('end_date') else timezone.localdate()
             # Default to last 30 days if no start date provided
-            default_start = datetime.now() - timedelta(days=30)
-            queryset = queryset.filter(date_of_behavior__gte=default_start)
-            
-        if end_date:
-            queryset = queryset.filter(date_of_behavior__lte=end_date)
-            
+            start_date = date_type.fromisoformat(request.query_params['start_date']) \
+                if request.query_params.get('start_date') else end_date - timedelta(days=30)
+        except ValueError:
+            return Response({'detail': 'start_date and end_date must be YYYY-MM-DD dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start_date > end_date:
+            return Response({'detail': 'start_date must not be after end_date.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        buckets = self._time_buckets(interval, start_date, end_date)
+        if len(buckets) > self.MAX_TIME_SERIES_BUCKETS:
+            return Response({'detail': f'The range spans more than {self.MAX_TIME_SERIES_BUCKETS} '
+                                       f'{interval} buckets; use a longer interval.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        # Base queryset: the score cube, which carries the grade and class each score was
+        # recorded in, so every filter is an indexed range scan on one table
+        queryset = ScoreCube.objects.filter(date__gte=start_date, date__lte=end_date)
+        
         if grade_id:
-            queryset = queryset.filter(student__school_class__grade_id=grade_id)
+            queryset = queryset.filter(grade_id=grade_id)
             
         if class_id:
             queryset = queryset.filter(school_class_id=class_id)
         
         # Apply time grouping based on interval
         if interval == 'week':
-            trunc_function = TruncWeek('date_of_behavior')
+            trunc_function = TruncWeek('date')
         elif interval == 'month':
-            trunc_function = TruncMonth('date_of_behavior')
+            trunc_function = TruncMonth('date')
         else:  # Default to day
-            trunc_function = TruncDay('date_of_behavior')
+            trunc_function = TruncDay('date')
         
-        # Generate time series data for positive and negative scores
-        positive_series = (
+        # Positive and negative sides per bucket in a single grouped query
+        rows = (
             queryset
-            .filter(score_type=ScoreType.POSITIVE)
-            .annotate(date=trunc_function)
-            .values('date')
-            .annotate(
-                count=Count('id'),
-                points=Sum('points')
-            )
-            .order_by('date')
+            .annotate(bucket=trunc_function)
+            .values('bucket')
+            .annotate(**rollup_measures())
+            .order_by()
         )
+        totals = {row['bucket']: row for row in rows}
         
-        negative_series = (
-            queryset
-            .filter(score_type=ScoreType.NEGATIVE)
-            .annotate(date=trunc_function)
-            .values('date')
-            .annotate(
-                count=Count('id'),
-                points=Sum('points')
-            )
-            .order_by('date')
-        )
+        # Gap-fill: one entry per bucket across the whole range
+        columns = {field: [] for field in ROLLUP_FIELDS}
+        for bucket in buckets:
+            row = totals.get(bucket)
+            for field in ROLLUP_FIELDS:
+                columns[field].append(row[field] if row else 0)
+        dates = [bucket.isoformat() for bucket in buckets]
+        
+        if columnar:
+            return Response({
+                'interval': interval,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'dates': dates,
+                **columns
+            })
         
         # Format response data
         result = {
             'positive_series': [
-                {
-                    'date': entry['date'].isoformat() if entry['date'] else None,
-                    'count': entry['count'],
-                    'points': entry['points']
-                }
-                for entry in positive_series
+                {'date': day, 'count': count, 'points': points}
+                for day, count, points in zip(dates, columns['positive_count'], columns['positive_points'])
             ],
             'negative_series': [
-                {
-                    'date': entry['date'].isoformat() if entry['date'] else None,
-                    'count': entry['count'],
-                    'points': entry['points']
-                }
-                for entry in negative_series
+                {'date': day, 'count': count, 'points': points}
+                for day, count, points in zip(dates, columns['negative_count'], columns['negative_points'])
             ]
         }
         
         return Response(result)
     
+    @staticmethod
+    def _time_buckets(interval, start_date, end_date):
+        """
+        Start dates of every day, week (Monday) or month bucket overlapping the range,
+        matching TruncDay/TruncWeek/TruncMonth
+        """
+        if interval == 'week':
+            bucket = start_date - timedelta(days=start_date.weekday())
+        elif interval == 'month':
+            bucket = start_date.replace(day=1)
+        else:
+            bucket = start_date
+        
+        buckets = []
+        while bucket <= end_date:
+            buckets.append(bucket)
+            if interval == 'week':
+                bucket += timedelta(days=7)
+            elif interval == 'month':
+                bucket = (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+            else:
+                bucket += timedelta(days=1)
+        return buckets
+    
     @action(detail=False, methods=['get'], url_path='award-analytics')
+    @cached_report(AWARDS, default_days=30)
     def award_analytics(self, request):
         """
         Generate analytics for awards and recognitions
@@ -138,11 +198,12 @@ class ReportsViewSet(viewsets.ViewSet):
         if end_date:
             queryset = queryset.filter(award_date__lte=end_date)
             
+        # Class and grade as of the award, not the student's current class
         if grade_id:
-            queryset = queryset.filter(student__school_class__grade_id=grade_id)
+            queryset = queryset.filter(grade_id=grade_id)
             
         if class_id:
-            queryset = queryset.filter(student__school_class_id=class_id)
+            queryset = queryset.filter(school_class_id=class_id)
         
         # Award distribution by type
         awards_by_type = (
@@ -206,113 +267,134 @@ class ReportsViewSet(viewsets.ViewSet):
         return Response(result)
     
     @action(detail=False, methods=['get'], url_path='user-engagement')
+    @cached_report(SCORES, OBSERVATIONS, SELF_REPORTS, default_days=30)
     def user_engagement(self, request):
         """
         Generate analytics on user engagement (parents, students, teachers)
+        
+        Each table is summarized by one aggregate with filtered counts plus one grouped
+        top-5 query: six queries in total whatever the range or filters.
+        Optional grade_id/class_id restrict observations and self-reports by the
+        student's home class and behavior scores by the class they were recorded in.
         """
         # Get query parameters
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        grade_id = request.query_params.get('grade_id')
+        class_id = request.query_params.get('class_id')
+        
+        # Default date range if not provided; both ends are inclusive days
+        try:
+            end_date = date_type.fromisoformat(request.query_params['end_date']) \
+                if request.query_params.get('end_date') else timezone.localdate()
+            start_date = date_type.fromisoformat(request.query_params['start_date']) \
+                if request.query_params.get('start_date') else end_date - timedelta(days=30)
+        except ValueError:
+            return Response({'detail': 'start_date and end_date must be YYYY-MM-DD dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        # created_at is a timestamp, so compare against local midnights to stay index-friendly
+        created_range = Q(
+            created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        )
+        student_filter = Q()
+        score_filter = Q()
+        if grade_id:
+            student_filter &= Q(student__school_class__grade_id=grade_id)
+            score_filter &= Q(grade_id=grade_id)
+        if class_id:
+            student_filter &= Q(student__school_class_id=class_id)
+            score_filter &= Q(school_class_id=class_id)
+        
+        observations = ParentObservation.objects.filter(created_range, student_filter).order_by()
+        reports = StudentSelfReport.objects.filter(created_range, student_filter).order_by()
+        scores = BehaviorScore.objects.filter(created_range, score_filter).order_by()
         
-        # Default date range if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).isoformat().split('T')[0]
-            
-        if not end_date:
-            end_date = datetime.now().isoformat().split('T')[0]
-            
         # Parent engagement - observations submitted
-        parent_observations = (
-            ParentObservation.objects
-            .filter(created_at__gte=start_date, created_at__lte=end_date)
+        observation_totals = observations.aggregate(
+            total=Count('id'),
+            approved=Count('id', filter=Q(status='approved')),
+            active=Count('parent_id', distinct=True)
+        )
+        top_parents = (
+            observations
             .values('parent_id')
             .annotate(
                 observation_count=Count('id'),
                 approved_count=Count('id', filter=Q(status='approved')),
                 rejection_rate=Count('id', filter=Q(status='rejected')) * 1.0 / Count('id')
             )
+            .order_by('-observation_count', 'parent_id')[:5]
         )
         
         # Student engagement - self-reports submitted
-        student_reports = (
-            StudentSelfReport.objects
-            .filter(created_at__gte=start_date, created_at__lte=end_date)
+        report_totals = reports.aggregate(
+            total=Count('id'),
+            approved=Count('id', filter=Q(status='approved')),
+            active=Count('student_id', distinct=True)
+        )
+        top_students = (
+            reports
             .values('student_id')
             .annotate(
                 report_count=Count('id'),
                 approved_count=Count('id', filter=Q(status='approved')),
                 rejection_rate=Count('id', filter=Q(status='rejected')) * 1.0 / Count('id')
             )
+            .order_by('-report_count', 'student_id')[:5]
         )
         
         # Teacher engagement - behavior scores recorded
-        teacher_scores = (
-            BehaviorScore.objects
-            .filter(created_at__gte=start_date, created_at__lte=end_date)
+        score_totals = scores.aggregate(
+            total=Count('id'),
+            positive=Count('id', filter=Q(score_type=ScoreType.POSITIVE)),
+            negative=Count('id', filter=Q(score_type=ScoreType.NEGATIVE)),
+            active=Count('recorded_by_id', distinct=True)
+        )
+        top_teachers = (
+            scores
             .values('recorded_by_id')
             .annotate(
                 score_count=Count('id'),
                 positive_count=Count('id', filter=Q(score_type=ScoreType.POSITIVE)),
                 negative_count=Count('id', filter=Q(score_type=ScoreType.NEGATIVE))
             )
+            .order_by('-score_count', 'recorded_by_id')[:5]
         )
         
         # Format response data
         result = {
             'parent_engagement': {
-                'total_observations': ParentObservation.objects.filter(
-                    created_at__gte=start_date, created_at__lte=end_date
-                ).count(),
-                'active_parents': parent_observations.count(),
-                'approval_rate': ParentObservation.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date,
-                    status='approved'
-                ).count() / max(ParentObservation.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date
-                ).count(), 1),
-                'top_engaged_parents': list(parent_observations.order_by('-observation_count')[:5])
+                'total_observations': observation_totals['total'],
+                'active_parents': observation_totals['active'],
+                'approval_rate': observation_totals['approved'] / max(observation_totals['total'], 1),
+                'top_engaged_parents': list(top_parents)
             },
             'student_engagement': {
-                'total_reports': StudentSelfReport.objects.filter(
-                    created_at__gte=start_date, created_at__lte=end_date
-                ).count(),
-                'active_students': student_reports.count(),
-                'approval_rate': StudentSelfReport.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date,
-                    status='approved'
-                ).count() / max(StudentSelfReport.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date
-                ).count(), 1),
-                'top_engaged_students': list(student_reports.order_by('-report_count')[:5])
+                'total_reports': report_totals['total'],
+                'active_students': report_totals['active'],
+                'approval_rate': report_totals['approved'] / max(report_totals['total'], 1),
+                'top_engaged_students': list(top_students)
             },
             'teacher_engagement': {
-                'total_scores': BehaviorScore.objects.filter(
-                    created_at__gte=start_date, created_at__lte=end_date
-                ).count(),
-                'active_teachers': teacher_scores.count(),
-                'positive_negative_ratio': BehaviorScore.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date,
-                    score_type=ScoreType.POSITIVE
-                ).count() / max(BehaviorScore.objects.filter(
-                    created_at__gte=start_date, 
-                    created_at__lte=end_date,
-                    score_type=ScoreType.NEGATIVE
-                ).count(), 1),
-                'most_active_teachers': list(teacher_scores.order_by('-score_count')[:5])
+                'total_scores': score_totals['total'],
+                'active_teachers': score_totals['active'],
+                'positive_negative_ratio': score_totals['positive'] / max(score_totals['negative'], 1),
+                'most_active_teachers': list(top_teachers)
             }
         }
         
         return Response(result)
     
     @action(detail=False, methods=['get'], url_path='dimension-analysis')
+    @cached_report(SCORES, RULES)
     def dimension_analysis(self, request):
         """
         Analyze scores by moral dimension
+        
+        layout=tree returns the whole rule hierarchy instead: a root with chapter,
+        dimension and sub-item levels nested as children, each carrying its subtotals,
+        ready for a drill-down chart. It comes from a single query grouped by sub-item,
+        summed up the cached rule tree by id.
         """
         # Get query parameters
         start_date = request.query_params.get('start_date')
@@ -320,75 +402,436 @@ class ReportsViewSet(viewsets.ViewSet):
         grade_id = request.query_params.get('grade_id')
         class_id = request.query_params.get('class_id')
         
-        # Base queryset
-        queryset = BehaviorScore.objects.all()
+        if request.query_params.get('layout') == 'tree':
+            # Sub-items are below the cube's grain, so this reads the scores themselves
+            scores = BehaviorScore.objects.all()
+            if start_date:
+                scores = scores.filter(date_of_behavior__gte=start_date)
+            if end_date:
+                scores = scores.filter(date_of_behavior__lte=end_date)
+            if grade_id:
+                scores = scores.filter(grade_id=grade_id)
+            if class_id:
+                scores = scores.filter(school_class_id=class_id)
+            sub_item_scores = scores.values('rule_sub_item_id').annotate(**raw_measures()).order_by()
+            return Response(self._rule_hierarchy(sub_item_scores, get_rule_tree()))
+        
+        # Base queryset: the score cube, already keyed by dimension, grade and class
+        queryset = ScoreCube.objects.all()
         
         # Apply filters
         if start_date:
-            queryset = queryset.filter(date_of_behavior__gte=start_date)
+            queryset = queryset.filter(date__gte=start_date)
             
         if end_date:
-            queryset = queryset.filter(date_of_behavior__lte=end_date)
+            queryset = queryset.filter(date__lte=end_date)
             
         if grade_id:
-            queryset = queryset.filter(student__school_class__grade_id=grade_id)
+            queryset = queryset.filter(grade_id=grade_id)
             
         if class_id:
             queryset = queryset.filter(school_class_id=class_id)
         
-        # Scores by dimension
+        # Scores by dimension, positive and negative side by side in one grouped query
         dimension_scores = (
             queryset
-            .values(
-                'rule_sub_item__dimension__name', 
-                'rule_sub_item__dimension_id',
-                'score_type'
-            )
+            .values('dimension_id')
             .annotate(
-                count=Count('id'),
-                total_points=Sum('points')
+                positive_count=Sum('positive_count'),
+                negative_count=Sum('negative_count'),
+                positive_points=Sum('positive_points'),
+                negative_points=Sum('negative_points')
             )
+            .order_by()
         )
         
-        # Process data to calculate net scores by dimension
-        dimensions_data = {}
-        for entry in dimension_scores:
-            dimension_name = entry['rule_sub_item__dimension__name']
-            if dimension_name not in dimensions_data:
-                dimensions_data[dimension_name] = {
-                    'positive_count': 0,
-                    'negative_count': 0,
-                    'positive_points': 0,
-                    'negative_points': 0,
-                    'name': dimension_name,
-                    'dimension_id': entry['rule_sub_item__dimension_id']
-                }
-                
-            if entry['score_type'] == ScoreType.POSITIVE:
-                dimensions_data[dimension_name]['positive_count'] = entry['count']
-                dimensions_data[dimension_name]['positive_points'] = entry['total_points']
-            else:
-                dimensions_data[dimension_name]['negative_count'] = entry['count']
-                dimensions_data[dimension_name]['negative_points'] = entry['total_points']
-        
-        # Calculate net scores and format response
+        # Calculate net scores and format response, naming dimensions from the cached rule tree
+        dimensions = get_rule_tree().dimensions
         result = []
-        for dimension_name, data in dimensions_data.items():
-            net_points = data['positive_points'] - data['negative_points']
-            total_records = data['positive_count'] + data['negative_count']
-            
+        for entry in dimension_scores:
+            dimension = dimensions.get(entry['dimension_id'])
             result.append({
-                'dimension_id': data['dimension_id'],
-                'dimension_name': dimension_name,
-                'positive_count': data['positive_count'],
-                'negative_count': data['negative_count'],
-                'positive_points': data['positive_points'],
-                'negative_points': data['negative_points'],
-                'net_points': net_points,
-                'total_records': total_records
+                'dimension_id': entry['dimension_id'],
+                'dimension_name': dimension.name if dimension else None,
+                'positive_count': entry['positive_count'],
+                'negative_count': entry['negative_count'],
+                'positive_points': entry['positive_points'],
+                'negative_points': entry['negative_points'],
+                'net_points': entry['positive_points'] - entry['negative_points'],
+                'total_records': entry['positive_count'] + entry['negative_count']
             })
         
         # Sort by net points (descending)
         result.sort(key=lambda x: x['net_points'], reverse=True)
         
         return Response(result)
+    
+    @staticmethod
+    def _rule_hierarchy(sub_item_rows, rule_tree):
+        """
+        Nest per-sub-item totals under their dimension and chapter, adding each level's
+        subtotals. Nodes are keyed by id and ordered as in the rule configuration;
+        levels without scores are left out.
+        """
+        root = {'level': 'all', 'id': None, 'name': None, **{field: 0 for field in ROLLUP_FIELDS}}
+        # id(node) -> {child key: child node}, and each node's position among its siblings
+        children = {id(root): {}}
+        sort_keys = {}
+        
+        for row in sub_item_rows:
+            path = [root]
+            for level, rule_node in zip(('chapter', 'dimension', 'sub_item'),
+                                        rule_tree.sub_item_path(row['rule_sub_item_id'])):
+                siblings = children[id(path[-1])]
+                key = rule_node.id if rule_node else None
+                if key not in siblings:
+                    child = {'level': level, 'id': key, 'name': rule_node.name if rule_node else None,
+                             **{field: 0 for field in ROLLUP_FIELDS}}
+                    siblings[key] = child
+                    children[id(child)] = {}
+                    sort_keys[id(child)] = (rule_node is None, rule_node.order if rule_node else 0, key or 0)
+                path.append(siblings[key])
+            for entry in path:
+                for field in ROLLUP_FIELDS:
+                    entry[field] += row[field]
+        
+        def finish(entry):
+            entry['net_points'] = entry['positive_points'] - entry['negative_points']
+            entry['total_records'] = entry['positive_count'] + entry['negative_count']
+            if entry['level'] != 'sub_item':
+                entry['children'] = [
+                    finish(child) for child in sorted(children[id(entry)].values(),
+                                                      key=lambda child: sort_keys[id(child)])
+                ]
+            return entry
+        
+        return finish(root)
+    
+    @action(detail=False, methods=['get'], url_path='leaderboard')
+    def leaderboard(self, request):
+        """
+        Rank students by net points within a class or grade for a week, month or term.
+        
+        Reads the incrementally maintained LeaderboardEntry table, so top-N and
+        single-student rank lookups are index seeks rather than re-aggregating scores.
+        
+        Query parameters:
+        - scope: class | grade (default: class)
+        - scope_id: SchoolClass or Grade id (required)
+        - period: week | month | term (default: week)
+        - date: any day inside the period (default: today)
+        - limit: number of top students to return (default: 20, max: 100)
+        - student_id: optionally also return this student's rank
+        """
+        scope = request.query_params.get('scope', LeaderboardScope.CLASS)
+        scope_id = request.query_params.get('scope_id')
+        period = request.query_params.get('period', LeaderboardPeriod.WEEK)
+        
+        if scope not in LeaderboardScope.values:
+            return Response({'detail': f'scope must be one of {LeaderboardScope.values}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if period not in LeaderboardPeriod.values:
+            return Response({'detail': f'period must be one of {LeaderboardPeriod.values}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        student_id = request.query_params.get('student_id')
+        try:
+            scope_id = int(scope_id)
+            student_id = int(student_id) if student_id else None
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            day = (datetime.strptime(request.query_params['date'], '%Y-%m-%d').date()
+                   if request.query_params.get('date') else datetime.now().date())
+        except (TypeError, ValueError):
+            return Response({'detail': 'scope_id, student_id and limit must be integers and date must be YYYY-MM-DD'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        start = period_start(period, day)
+        entries = LeaderboardEntry.objects.filter(
+            scope=scope, scope_id=scope_id, period=period, period_start=start
+        )
+        
+        top_entries = (
+            entries
+            .order_by('-net_points', 'student_id')
+            .values('student_id', 'student__first_name', 'student__last_name', 'net_points', 'score_count')
+            [:limit]
+        )
+        
+        # Standard competition ranking: tied students share a rank
+        top = []
+        for position, entry in enumerate(top_entries, 1):
+            rank = top[-1]['rank'] if top and top[-1]['net_points'] == entry['net_points'] else position
+            top.append({
+                'rank': rank,
+                'student_id': entry['student_id'],
+                'student_name': f"{entry['student__first_name']} {entry['student__last_name']}".strip(),
+                'net_points': entry['net_points'],
+                'score_count': entry['score_count']
+            })
+        
+        result = {
+            'scope': scope,
+            'scope_id': scope_id,
+            'period': period,
+            'period_start': start.isoformat(),
+            'period_end': period_end(period, start).isoformat(),
+            'participants': entries.count(),
+            'top': top
+        }
+        
+        if student_id is not None:
+            own_entry = entries.filter(student_id=student_id).values('net_points', 'score_count').first()
+            result['student'] = {
+                'student_id': student_id,
+                'rank': entries.filter(net_points__gt=own_entry['net_points']).count() + 1 if own_entry else None,
+                'net_points': own_entry['net_points'] if own_entry else None,
+                'score_count': own_entry['score_count'] if own_entry else 0
+            }
+        
+        return Response(result)
+    
+    # Cube axes: query parameter name -> ScoreCube column
+    CUBE_DIMENSIONS = {
+        'grade': 'grade_id',
+        'class': 'school_class_id',
+        'chapter': 'chapter_id',
+        'dimension': 'dimension_id',
+    }
+    CUBE_TIME_DIMENSIONS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+    CUBE_MEASURES = ROLLUP_FIELDS + ('net_points', 'total_count')
+    
+    @action(detail=False, methods=['get'], url_path='cube')
+    @cached_report(SCORES, RULES)
+    def cube(self, request):
+        """
+        Slice the precomputed ScoreCube (grade x class x chapter x dimension x day).
+        
+        Every request is a single grouped query over the cube's indexed cells, never
+        over raw scores, so arbitrary slices answer in milliseconds.
+        
+        Query parameters:
+        - dimensions: comma-separated axes to group by, from grade, class, chapter,
+          dimension and at most one of day, week, month (default: none, one total row)
+        - measures: comma-separated from positive_count, negative_count, positive_points,
+          negative_points, net_points, total_count (default: all)
+        - grade_id, class_id, chapter_id, dimension_id: filter to one member
+        - start_date, end_date: YYYY-MM-DD bounds, inclusive
+        """
+        params = request.query_params
+        dimensions = [name for name in params.get('dimensions', '').split(',') if name]
+        measures = [name for name in params.get('measures', '').split(',') if name] or list(self.CUBE_MEASURES)
+        
+        unknown = [name for name in dimensions
+                   if name not in self.CUBE_DIMENSIONS and name not in self.CUBE_TIME_DIMENSIONS]
+        if unknown or len(set(dimensions)) != len(dimensions):
+            return Response({'detail': f'dimensions must be distinct values from '
+                                       f'{list(self.CUBE_DIMENSIONS) + list(self.CUBE_TIME_DIMENSIONS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        time_dimensions = [name for name in dimensions if name in self.CUBE_TIME_DIMENSIONS]
+        if len(time_dimensions) > 1:
+            return Response({'detail': 'Only one of day, week or month can be used as a dimension.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if any(name not in self.CUBE_MEASURES for name in measures):
+            return Response({'detail': f'measures must be values from {list(self.CUBE_MEASURES)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            filters = {
+                self.CUBE_DIMENSIONS[name]: int(params[f'{name}_id'])
+                for name in self.CUBE_DIMENSIONS if params.get(f'{name}_id')
+            }
+            if params.get('start_date'):
+                filters['date__gte'] = date_type.fromisoformat(params['start_date'])
+            if params.get('end_date'):
+                filters['date__lte'] = date_type.fromisoformat(params['end_date'])
+        except ValueError:
+            return Response({'detail': 'Ids must be integers and start_date and end_date must be YYYY-MM-DD dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        group_fields = [self.CUBE_DIMENSIONS[name] for name in dimensions if name in self.CUBE_DIMENSIONS]
+        annotations = {}
+        if time_dimensions:
+            annotations['period'] = self.CUBE_TIME_DIMENSIONS[time_dimensions[0]]('date')
+        
+        sums = {f'{field}_sum': Sum(field) for field in ROLLUP_FIELDS}
+        cells = ScoreCube.objects.filter(**filters).order_by()
+        if group_fields or annotations:
+            cells = cells.values(*group_fields, **annotations).annotate(**sums)
+        else:
+            # No axes: a single grand-total row
+            cells = [cells.aggregate(**sums)]
+        
+        grade_names = (dict(Grade.objects.values_list('id', 'name'))
+                       if 'grade' in dimensions else {})
+        class_names = (dict(SchoolClass.objects.values_list('id', 'name'))
+                       if 'class' in dimensions else {})
+        rule_tree = get_rule_tree()
+        names = {
+            'grade_id': ('grade_name', grade_names),
+            'school_class_id': ('class_name', class_names),
+            'chapter_id': ('chapter_name', {key: node.name for key, node in rule_tree.chapters.items()}),
+            'dimension_id': ('dimension_name', {key: node.name for key, node in rule_tree.dimensions.items()}),
+        }
+        
+        rows = []
+        for cell in cells:
+            totals = {field: cell[f'{field}_sum'] or 0 for field in ROLLUP_FIELDS}
+            if not (totals['positive_count'] or totals['negative_count']):
+                continue
+            totals['net_points'] = totals['positive_points'] - totals['negative_points']
+            totals['total_count'] = totals['positive_count'] + totals['negative_count']
+            
+            row = {}
+            for name in dimensions:
+                if name in self.CUBE_TIME_DIMENSIONS:
+                    period = cell['period']
+                    row[name] = (period.date() if isinstance(period, datetime) else period).isoformat()
+                    continue
+                column = self.CUBE_DIMENSIONS[name]
+                label, lookup = names[column]
+                row[column] = cell[column]
+                row[label] = lookup.get(cell[column])
+            row.update((measure, totals[measure]) for measure in measures)
+            rows.append(row)
+        
+        # Order rows by the requested axes, left to right
+        sort_columns = [self.CUBE_DIMENSIONS.get(name, name) for name in dimensions]
+        rows.sort(key=lambda row: tuple(row[column] for column in sort_columns))
+        
+        return Response({
+            'dimensions': dimensions,
+            'measures': measures,
+            'rows': rows,
+        })
+    
+    DISTRIBUTION_PERCENTILES = (10, 25, 50, 75, 90)
+    
+    @action(detail=False, methods=['get'], url_path='distribution')
+    @cached_report(SCORES, default_days=30)
+    def distribution(self, request):
+        """
+        Distribution of per-student net points across a grade or class.
+        
+        Every student whose home class is in scope counts, including those with no
+        scores. Net points come from the daily rollup in one grouped query and all
+        statistics are computed on NumPy arrays, so grades of thousands of students
+        answer in milliseconds.
+        
+        Query parameters:
+        - scope: grade | class (default: grade)
+        - scope_id: Grade or SchoolClass id (required)
+        - start_date, end_date: YYYY-MM-DD bounds, inclusive (default: the last 30 days)
+        - bins: number of histogram bins (default: 10, max: 50)
+        - student_id: optionally also return this student's standing
+        """
+        params = request.query_params
+        scope = params.get('scope', LeaderboardScope.GRADE)
+        if scope not in LeaderboardScope.values:
+            return Response({'detail': f'scope must be one of {LeaderboardScope.values}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            scope_id = int(params.get('scope_id'))
+            bins = min(max(int(params.get('bins', 10)), 1), 50)
+            end_date = (date_type.fromisoformat(params['end_date'])
+                        if params.get('end_date') else timezone.localdate())
+            start_date = (date_type.fromisoformat(params['start_date'])
+                          if params.get('start_date') else end_date - timedelta(days=30))
+            student_id = int(params['student_id']) if params.get('student_id') else None
+        except (TypeError, ValueError):
+            return Response({'detail': 'scope_id, bins and student_id must be integers and '
+                                       'start_date and end_date must be YYYY-MM-DD dates.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        students = CustomUser.objects.filter(role=UserRole.STUDENT)
+        if scope == LeaderboardScope.GRADE:
+            students = students.filter(school_class__grade_id=scope_id)
+        else:
+            students = students.filter(school_class_id=scope_id)
+        
+        in_range = Q(daily_scores__date__gte=start_date, daily_scores__date__lte=end_date)
+        # Grouping on the two selected columns only, not every user column
+        rows = (
+            students
+            .order_by('id')
+            .values('id', 'school_class_id')
+            .annotate(net_points=(
+                Coalesce(Sum('daily_scores__positive_points', filter=in_range), 0)
+                - Coalesce(Sum('daily_scores__negative_points', filter=in_range), 0)
+            ))
+            .values_list('id', 'school_class_id', 'net_points')
+        )
+        table = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+        student_ids, class_ids, net = table[:, 0], table[:, 1], table[:, 2]
+        
+        result = {
+            'scope': scope,
+            'scope_id': scope_id,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'count': len(net),
+        }
+        if not len(net):
+            return Response({**result, 'mean': None, 'std': None, 'min': None, 'max': None,
+                             'percentiles': {}, 'histogram': {'edges': [], 'counts': []},
+                             'classes': [], 'students': {'student_id': [], 'school_class_id': [],
+                                                         'net_points': [], 'z_score': [],
+                                                         'percentile_rank': []}})
+        
+        mean = net.mean()
+        std = net.std()
+        z_scores = (net - mean) / std if std else np.zeros(len(net))
+        # Mid-rank percentile: students below plus half of those tied, as a percentage
+        ordered = np.sort(net)
+        percentile_ranks = (np.searchsorted(ordered, net, 'left')
+                            + np.searchsorted(ordered, net, 'right')) * 50 / len(net)
+        counts, edges = np.histogram(net, bins=bins)
+        
+        # Per-class means and mean z-score within the scope's distribution
+        class_keys, class_index = np.unique(class_ids, return_inverse=True)
+        class_sizes = np.bincount(class_index)
+        class_means = np.bincount(class_index, weights=net) / class_sizes
+        class_z = np.bincount(class_index, weights=z_scores) / class_sizes
+        class_names = dict(SchoolClass.objects.filter(id__in=class_keys.tolist()).values_list('id', 'name'))
+        
+        result.update({
+            'mean': round(float(mean), 4),
+            'std': round(float(std), 4),
+            'min': int(ordered[0]),
+            'max': int(ordered[-1]),
+            'percentiles': {
+                f'p{percentile}': round(float(value), 4)
+                for percentile, value in zip(self.DISTRIBUTION_PERCENTILES,
+                                             np.percentile(net, self.DISTRIBUTION_PERCENTILES))
+            },
+            'histogram': {'edges': np.round(edges, 4).tolist(), 'counts': counts.tolist()},
+            'classes': [
+                {
+                    'school_class_id': class_id,
+                    'class_name': class_names.get(class_id),
+                    'students': size,
+                    'mean': round(class_mean, 4),
+                    'mean_z_score': round(mean_z, 4),
+                }
+                for class_id, size, class_mean, mean_z in zip(class_keys.tolist(), class_sizes.tolist(),
+                                                              class_means.tolist(), class_z.tolist())
+            ],
+            # Columnar: one entry per student, ordered by student id
+            'students': {
+                'student_id': student_ids.tolist(),
+                'school_class_id': class_ids.tolist(),
+                'net_points': net.tolist(),
+                'z_score': np.round(z_scores, 4).tolist(),
+                'percentile_rank': np.round(percentile_ranks, 2).tolist(),
+            },
+        })
+        
+        if student_id is not None:
+            position = np.searchsorted(student_ids, student_id)
+            found = position < len(student_ids) and student_ids[position] == student_id
+            result['student'] = {
+                'student_id': student_id,
+                'net_points': int(net[position]) if found else None,
+                'z_score': round(float(z_scores[position]), 4) if found else None,
+                'percentile_rank': round(float(percentile_ranks[position]), 2) if found else None,
+            }
+        
+        return Response(result)
@@ -0,0 +1,105 @@
+import re
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .models import ClassType, CustomUser, Grade, SchoolClass, UserRole
+from .report_cache import OBSERVATIONS, SCORES, SELF_REPORTS, invalidate_reports
+from .score_sync import bump_sync_scope_version
+
+
+class RolloverError(ValueError):
+    """
+    A class mapping that cannot be applied; the message lists every problem found
+    """
+
+
+def _natural_key(name):
+    # "Grade 2" before "Grade 10"
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def next_grade_mapping(graduate=True, overrides=None):
+    """
+    Source class id -> target class id moving every home class up one grade: each
+    class goes to the class of the same name in the next grade (grades ordered by
+    name, numbers compared numerically). Classes in the last grade map to None
+    (students leave their class) when graduate is set, and are left out otherwise.
+    Entries of overrides replace the derived ones, e.g. for a class with no
+    same-named class in the next grade.
+    """
+    overrides = {int(source): target for source, target in (overrides or {}).items()}
+    grades = sorted(Grade.objects.values_list('id', 'name'), key=lambda grade: _natural_key(grade[1]))
+    classes = {}
+    for class_id, name, grade_id in SchoolClass.objects.filter(class_type=ClassType.HOME_CLASS) \
+            .order_by().values_list('id', 'name', 'grade_id'):
+        classes.setdefault(grade_id, {})[name] = class_id
+
+    mapping = {}
+    missing = []
+    for (grade_id, _), (next_grade_id, next_grade_name) in zip(grades, grades[1:]):
+        for name, class_id in classes.get(grade_id, {}).items():
+            target_id = classes.get(next_grade_id, {}).get(name)
+            if target_id is None and class_id not in overrides:
+                missing.append(f"No class named '{name}' in {next_grade_name}.")
+            mapping[class_id] = target_id
+    if missing:
+        raise RolloverError(' '.join(missing))
+    if graduate and grades:
+        mapping.update((class_id, None) for class_id in classes.get(grades[-1][0], {}).values())
+    mapping.update(overrides)
+    return mapping
+
+
+def rollover_students(mapping, dry_run=False):
+    """
+    Move every student whose home class is a key of mapping to the mapped class
+    (None removes them from their class).
+
+    The whole move is one UPDATE with a CASE over the source classes inside a single
+    transaction, so chained mappings (1 -> 2, 2 -> 3) move each student exactly once.
+    With dry_run nothing is written. Returns {'dry_run', 'moved', 'classes'}, where
+    classes lists each source class with its target and student count.
+    """
+    mapping = {int(source): (int(target) if target is not None else None) for source, target in mapping.items()}
+    mapping = {source: target for source, target in mapping.items() if source != target}
+    class_ids = set(mapping) | {target for target in mapping.values() if target is not None}
+    classes = {
+        class_id: (name, grade_name)
+        for class_id, name, grade_name in SchoolClass.objects.filter(id__in=class_ids)
+        .order_by().values_list('id', 'name', 'grade__name')
+    }
+    unknown = sorted(class_ids - set(classes))
+    if unknown:
+        raise RolloverError(f"Classes not found: {unknown}.")
+
+    students = CustomUser.objects.filter(role=UserRole.STUDENT, school_class_id__in=mapping)
+    counts = dict(students.order_by().values('school_class_id').annotate(count=Count('id'))
+                  .values_list('school_class_id', 'count'))
+    summary = [
+        {
+            'source_class_id': source,
+            'source_class_name': classes[source][0],
+            'source_grade_name': classes[source][1],
+            'target_class_id': target,
+            'target_class_name': classes[target][0] if target is not None else None,
+            'target_grade_name': classes[target][1] if target is not None else None,
+            'students': counts.get(source, 0),
+        }
+        for source, target in sorted(mapping.items(), key=lambda item: (_natural_key(classes[item[0]][1]),
+                                                                          _natural_key(classes[item[0]][0])))
+    ]
+
+    moved = 0
+    if not dry_run and counts:
+        with transaction.atomic():
+            moved = students.update(school_class_id=Case(
+                *(When(school_class_id=source, then=Value(target)) for source, target in mapping.items()),
+                output_field=IntegerField()
+            ))
+            # Reports that place students by their current class
+            for source in (SCORES, OBSERVATIONS, SELF_REPORTS):
+                invalidate_reports(source, class_ids=sorted(class_ids))
+            # Every moved student changes class teachers, so syncing clients start over
+            bump_sync_scope_version()
+    return {'dry_run': dry_run, 'moved': moved if not dry_run else sum(counts.values()), 'classes': summary}
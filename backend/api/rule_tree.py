@@ -0,0 +1,107 @@
+import threading
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from .models import CacheVersion, RuleChapter, RuleDimension, RuleSubItem
+
+# CacheVersion counter bumped by every write to the rule hierarchy
+RULE_TREE_VERSION = 'rule_tree'
+
+
+class ChapterNode(NamedTuple):
+    id: int
+    name: str
+    order: int
+
+
+class DimensionNode(NamedTuple):
+    id: int
+    name: str
+    order: int
+    chapter_id: int
+
+
+class SubItemNode(NamedTuple):
+    id: int
+    name: str
+    order: int
+    dimension_id: int
+
+
+class RuleTree:
+    """
+    Immutable snapshot of RuleChapter -> RuleDimension -> RuleSubItem with O(1) id lookups
+    """
+    __slots__ = ('version', 'chapters', 'dimensions', 'sub_items')
+
+    def __init__(self, version, chapters, dimensions, sub_items):
+        self.version = version
+        self.chapters = MappingProxyType({node.id: node for node in chapters})
+        self.dimensions = MappingProxyType({node.id: node for node in dimensions})
+        self.sub_items = MappingProxyType({node.id: node for node in sub_items})
+
+    def chapter_of_dimension(self, dimension_id) -> Optional[ChapterNode]:
+        dimension = self.dimensions.get(dimension_id)
+        return self.chapters.get(dimension.chapter_id) if dimension else None
+
+    def sub_item_path(self, sub_item_id):
+        """
+        (chapter, dimension, sub_item) nodes for a sub-item id; missing levels are None
+        """
+        sub_item = self.sub_items.get(sub_item_id)
+        dimension = self.dimensions.get(sub_item.dimension_id) if sub_item else None
+        chapter = self.chapters.get(dimension.chapter_id) if dimension else None
+        return chapter, dimension, sub_item
+
+    def sub_item_names(self, sub_item_id):
+        """
+        (chapter name, dimension name, sub-item name) for a sub-item id; missing levels are None
+        """
+        return tuple(node.name if node else None for node in self.sub_item_path(sub_item_id))
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def load_rule_tree(version):
+    return RuleTree(
+        version,
+        (ChapterNode(*row) for row in RuleChapter.objects.order_by().values_list('id', 'name', 'order')),
+        (DimensionNode(*row) for row in RuleDimension.objects.order_by()
+            .values_list('id', 'name', 'order', 'chapter_id')),
+        (SubItemNode(*row) for row in RuleSubItem.objects.order_by()
+            .values_list('id', 'name', 'order', 'dimension_id')),
+    )
+
+
+def get_rule_tree():
+    """
+    Current rule tree snapshot for this process.
+    Costs one version lookup while the snapshot is fresh, and three more
+    queries to rebuild it after any rule write in any process.
+    """
+    global _snapshot
+    version = CacheVersion.current(RULE_TREE_VERSION)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = load_rule_tree(version)
+        return _snapshot
+
+
+def clear_rule_tree_cache():
+    """
+    Drop this process's snapshot so the next lookup reloads it
+    """
+    global _snapshot
+    _snapshot = None
+
+
+def bump_rule_tree_version():
+    """
+    Invalidate every process's rule tree snapshot; call after writing rules
+    """
+    CacheVersion.bump(RULE_TREE_VERSION)
@@ -0,0 +1,427 @@
+import logging
+from collections import defaultdict
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import (BehaviorScore, RuleDimension, RuleSubItem, ScoreType, StudentDailyScore,
+                     LeaderboardEntry, LeaderboardScope, LeaderboardPeriod, ScoreCube)
+
+logger = logging.getLogger(__name__)
+
+# Key and counter columns of StudentDailyScore, in the order used by key and delta tuples
+ROLLUP_KEY_FIELDS = ('student_id', 'school_class_id', 'grade_id', 'dimension_id', 'date')
+ROLLUP_FIELDS = ('positive_count', 'negative_count', 'positive_points', 'negative_points')
+
+# Key and counter columns of LeaderboardEntry
+LEADERBOARD_KEY_FIELDS = ('scope', 'scope_id', 'period', 'period_start', 'student_id')
+LEADERBOARD_FIELDS = ('net_points', 'score_count')
+
+# Key columns of ScoreCube; its counters are ROLLUP_FIELDS
+CUBE_KEY_FIELDS = ('grade_id', 'school_class_id', 'chapter_id', 'dimension_id', 'date')
+
+
+def raw_measures():
+    """
+    Conditional aggregates producing the rollup counters from raw BehaviorScore rows
+    """
+    return {
+        'positive_count': Count('id', filter=Q(score_type=ScoreType.POSITIVE)),
+        'negative_count': Count('id', filter=Q(score_type=ScoreType.NEGATIVE)),
+        'positive_points': Coalesce(Sum('points', filter=Q(score_type=ScoreType.POSITIVE)), 0),
+        'negative_points': Coalesce(Sum('points', filter=Q(score_type=ScoreType.NEGATIVE)), 0),
+    }
+
+
+def rollup_measures():
+    """
+    The same counters summed over StudentDailyScore rows
+    """
+    return {field: Coalesce(Sum(field), 0) for field in ROLLUP_FIELDS}
+
+
+def score_key(student_id, school_class_id, grade_id, dimension_id, date):
+    """
+    Rollup row key for a score: (student, class, grade snapshot, dimension, day)
+    """
+    return (student_id, school_class_id, grade_id, dimension_id, date)
+
+
+def score_delta(score_type, points, sign=1):
+    """
+    Counter changes contributed by one score; sign=-1 removes it
+    """
+    if score_type == ScoreType.POSITIVE:
+        return (sign, 0, sign * points, 0)
+    return (0, sign, 0, sign * points)
+
+
+# Attempts at merging a batch of deltas when concurrent writers race to insert the same row
+MERGE_ATTEMPTS = 3
+
+
+def merge_counters(model, key_fields, counter_fields, deltas, count_fields):
+    """
+    Add counter deltas to rows of a rollup model.
+
+    deltas maps key tuples (values of key_fields) -> tuples of changes to counter_fields.
+    Existing rows are locked and updated, missing rows are inserted, and rows whose
+    count_fields all drop to zero are removed, in one transaction and a fixed number
+    of queries regardless of how many keys are touched. Returns the deltas applied,
+    leaving out removals that found no row.
+
+    Two transactions can both find a key missing and both insert it. The loser's
+    INSERT fails on the unique key once the winner commits. Its savepoint is then
+    rolled back and the merge rerun, and this time it finds and locks the winner's row.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return {}
+
+    for attempt in range(1, MERGE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                return _merge_counters_once(model, key_fields, counter_fields, deltas, count_fields)
+        except IntegrityError:
+            if attempt == MERGE_ATTEMPTS:
+                raise
+
+
+def _merge_counters_once(model, key_fields, counter_fields, deltas, count_fields):
+    count_positions = [counter_fields.index(field) for field in count_fields]
+    candidates = model.objects.select_for_update().order_by().filter(**{
+        f'{field}__in': {key[position] for key in deltas}
+        for position, field in enumerate(key_fields)
+    })
+    existing = {}
+    for row in candidates:
+        key = tuple(getattr(row, field) for field in key_fields)
+        if key in deltas:
+            existing[key] = row
+
+    to_create, to_update, to_delete, unmatched = [], [], [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            if all(delta[position] <= 0 for position in count_positions):
+                # Removing something that was never rolled up: the table has drifted
+                # from the scores it summarises, so there is no row left to correct
+                unmatched.append(key)
+                continue
+            row = model(**dict(zip(key_fields, key)))
+            to_create.append(row)
+
+        for field, change in zip(counter_fields, delta):
+            setattr(row, field, getattr(row, field) + change)
+
+        if row.pk is None:
+            continue
+        if all(getattr(row, counter_fields[position]) <= 0 for position in count_positions):
+            to_delete.append(row.pk)
+        else:
+            to_update.append(row)
+
+    if to_delete:
+        model.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        model.objects.bulk_update(to_update, counter_fields)
+    if to_create:
+        model.objects.bulk_create(to_create)
+    if unmatched:
+        logger.warning(
+            'Dropped %d removal(s) from %s with no row to remove them from, e.g. %s; '
+            'run rebuild_score_rollup to resynchronise it',
+            len(unmatched), model.__name__, unmatched[0]
+        )
+    skipped = set(unmatched)
+    return {key: delta for key, delta in deltas.items() if key not in skipped}
+
+
+def apply_deltas(deltas):
+    """
+    Add counter deltas to the rollup and the leaderboards and cube derived from it.
+    Only the deltas the rollup took are passed on, so the derived tables keep
+    agreeing with it even where it has drifted from the raw scores.
+
+    deltas maps score_key(...) -> (positive_count, negative_count, positive_points, negative_points).
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    with transaction.atomic():
+        applied = merge_counters(StudentDailyScore, ROLLUP_KEY_FIELDS, ROLLUP_FIELDS, deltas,
+                                 count_fields=('positive_count', 'negative_count'))
+        apply_leaderboard_deltas(applied)
+        apply_cube_deltas(applied)
+
+
+def apply_scores(scores, sign=1):
+    """
+    Roll newly created (sign=1) or removed (sign=-1) BehaviorScore instances into the rollup
+    """
+    sub_item_ids = {score.rule_sub_item_id for score in scores}
+    dimensions = dict(
+        RuleSubItem.objects.filter(id__in=sub_item_ids).order_by().values_list('id', 'dimension_id')
+    )
+
+    deltas = defaultdict(lambda: (0, 0, 0, 0))
+    for score in scores:
+        key = score_key(score.student_id, score.school_class_id, score.grade_id,
+                        dimensions.get(score.rule_sub_item_id), score.date_of_behavior)
+        if key[3] is None:
+            continue
+        deltas[key] = tuple(a + b for a, b in zip(deltas[key], score_delta(score.score_type, score.points, sign)))
+    apply_deltas(deltas)
+
+
+def move_sub_item(sub_item_id, old_dimension_id, new_dimension_id):
+    """
+    Re-key a sub-item's scores from its old dimension to its new one. Rollup rows are
+    shared with the dimension's other sub-items, so the sub-item's own contribution is
+    recomputed from its scores and moved as a pair of deltas, which also moves its cube
+    cells; leaderboards are not keyed by dimension and come out unchanged.
+    """
+    if old_dimension_id == new_dimension_id:
+        return
+    grouped = grouped_raw_scores(BehaviorScore.objects.filter(rule_sub_item_id=sub_item_id))
+    deltas = defaultdict(lambda: (0, 0, 0, 0))
+    for (student_id, school_class_id, grade_id, _, day), counters in grouped.items():
+        old_key = score_key(student_id, school_class_id, grade_id, old_dimension_id, day)
+        new_key = score_key(student_id, school_class_id, grade_id, new_dimension_id, day)
+        deltas[old_key] = tuple(a - b for a, b in zip(deltas[old_key], counters))
+        deltas[new_key] = tuple(a + b for a, b in zip(deltas[new_key], counters))
+    apply_deltas(deltas)
+
+
+def grouped_raw_scores(queryset=None):
+    """
+    Aggregate raw BehaviorScore rows into rollup-shaped values, keyed like the rollup
+    """
+    queryset = BehaviorScore.objects.all() if queryset is None else queryset
+    rows = (
+        queryset
+        .order_by()
+        .values('student_id', 'school_class_id', 'grade_id', 'rule_sub_item__dimension_id', 'date_of_behavior')
+        .annotate(**raw_measures())
+    )
+    return {
+        score_key(row['student_id'], row['school_class_id'], row['grade_id'],
+                  row['rule_sub_item__dimension_id'], row['date_of_behavior']):
+            tuple(row[field] for field in ROLLUP_FIELDS)
+        for row in rows.iterator()
+    }
+
+
+def rebuild_rollup(batch_size=2000):
+    """
+    Recompute the whole rollup (and the leaderboards and cube derived from it) from
+    raw BehaviorScore rows; returns the number of rollup rows written
+    """
+    grouped = grouped_raw_scores()
+    with transaction.atomic():
+        StudentDailyScore.objects.all().delete()
+        StudentDailyScore.objects.bulk_create(
+            (
+                StudentDailyScore(**dict(zip(ROLLUP_KEY_FIELDS, key)), **dict(zip(ROLLUP_FIELDS, values)))
+                for key, values in grouped.items()
+            ),
+            batch_size=batch_size
+        )
+        rebuild_leaderboards(batch_size=batch_size)
+        rebuild_cube(batch_size=batch_size)
+    return len(grouped)
+
+
+def verify_rollup():
+    """
+    Compare the rollup against raw BehaviorScore rows, and the leaderboards and cube
+    against the rollup. Returns a list of (key, expected, actual) tuples for every
+    mismatching row.
+    """
+    mismatches = _compare(
+        grouped_raw_scores(),
+        _table_values(StudentDailyScore, ROLLUP_KEY_FIELDS, ROLLUP_FIELDS)
+    )
+    mismatches += _compare(
+        grouped_leaderboards(),
+        _table_values(LeaderboardEntry, LEADERBOARD_KEY_FIELDS, LEADERBOARD_FIELDS)
+    )
+    return mismatches + _compare(
+        grouped_cube(),
+        _table_values(ScoreCube, CUBE_KEY_FIELDS, ROLLUP_FIELDS)
+    )
+
+
+def _table_values(model, key_fields, counter_fields):
+    return {
+        tuple(row[:len(key_fields)]): tuple(row[len(key_fields):])
+        for row in model.objects.order_by().values_list(*key_fields, *counter_fields).iterator()
+    }
+
+
+def _compare(expected, actual):
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in sorted(expected.keys() | actual.keys(), key=str)
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+# Leaderboards
+
+def period_start(period, day):
+    """
+    First day of the week (Monday), month or school term containing day
+    """
+    if period == LeaderboardPeriod.WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == LeaderboardPeriod.MONTH:
+        return day.replace(day=1)
+    start_months = sorted(settings.SCHOOL_TERM_START_MONTHS)
+    earlier = [month for month in start_months if month <= day.month]
+    if earlier:
+        return date_type(day.year, earlier[-1], 1)
+    return date_type(day.year - 1, start_months[-1], 1)
+
+
+def period_end(period, start):
+    """
+    Last day of the period beginning at start
+    """
+    if period == LeaderboardPeriod.WEEK:
+        return start + timedelta(days=6)
+    if period == LeaderboardPeriod.MONTH:
+        following = start.replace(day=28) + timedelta(days=4)
+        return following.replace(day=1) - timedelta(days=1)
+    start_months = sorted(settings.SCHOOL_TERM_START_MONTHS)
+    later = [month for month in start_months if month > start.month]
+    if later:
+        return date_type(start.year, later[0], 1) - timedelta(days=1)
+    return date_type(start.year + 1, start_months[0], 1) - timedelta(days=1)
+
+
+def leaderboard_deltas(daily_deltas):
+    """
+    Translate rollup deltas into (scope, scope_id, period, period_start, student) ->
+    (net_points, score_count) changes for every class and grade leaderboard they touch.
+    Grade leaderboards count scores in the grade they were recorded in.
+    """
+    deltas = defaultdict(lambda: (0, 0))
+    for (student_id, school_class_id, grade_id, _, day), counters in daily_deltas.items():
+        positive_count, negative_count, positive_points, negative_points = counters
+        change = (positive_points - negative_points, positive_count + negative_count)
+        scopes = [(LeaderboardScope.CLASS, school_class_id)]
+        if grade_id is not None:
+            scopes.append((LeaderboardScope.GRADE, grade_id))
+        for scope, scope_id in scopes:
+            for period in LeaderboardPeriod.values:
+                key = (scope, scope_id, period, period_start(period, day), student_id)
+                deltas[key] = tuple(a + b for a, b in zip(deltas[key], change))
+    return deltas
+
+
+def apply_leaderboard_deltas(daily_deltas):
+    """
+    Fold rollup deltas into the class and grade leaderboards
+    """
+    if daily_deltas:
+        merge_counters(LeaderboardEntry, LEADERBOARD_KEY_FIELDS, LEADERBOARD_FIELDS,
+                       leaderboard_deltas(daily_deltas), count_fields=('score_count',))
+
+
+def grouped_leaderboards():
+    """
+    Leaderboard values recomputed from the StudentDailyScore rollup
+    """
+    daily = _table_values(StudentDailyScore, ROLLUP_KEY_FIELDS, ROLLUP_FIELDS)
+    return {key: value for key, value in leaderboard_deltas(daily).items() if value[1]}
+
+
+def rebuild_leaderboards(batch_size=2000):
+    """
+    Recompute every leaderboard from the rollup; returns the number of entries written
+    """
+    grouped = grouped_leaderboards()
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(
+            (
+                LeaderboardEntry(**dict(zip(LEADERBOARD_KEY_FIELDS, key)), **dict(zip(LEADERBOARD_FIELDS, values)))
+                for key, values in grouped.items()
+            ),
+            batch_size=batch_size
+        )
+    return len(grouped)
+
+
+# Analytics cube
+
+def cube_deltas(daily_deltas, dimension_chapters=None):
+    """
+    Translate rollup deltas into (grade, class, chapter, dimension, day) cube deltas;
+    the grade is the scores' snapshot carried in the rollup key
+    """
+    if dimension_chapters is None:
+        dimension_chapters = dict(
+            RuleDimension.objects.filter(id__in={key[3] for key in daily_deltas})
+            .order_by().values_list('id', 'chapter_id')
+        )
+
+    deltas = defaultdict(lambda: (0, 0, 0, 0))
+    for (_, school_class_id, grade_id, dimension_id, day), counters in daily_deltas.items():
+        chapter_id = dimension_chapters.get(dimension_id)
+        if grade_id is None or chapter_id is None:
+            continue
+        key = (grade_id, school_class_id, chapter_id, dimension_id, day)
+        deltas[key] = tuple(a + b for a, b in zip(deltas[key], counters))
+    return deltas
+
+
+def apply_cube_deltas(daily_deltas):
+    """
+    Fold rollup deltas into the analytics cube
+    """
+    if daily_deltas:
+        merge_counters(ScoreCube, CUBE_KEY_FIELDS, ROLLUP_FIELDS, cube_deltas(daily_deltas),
+                       count_fields=('positive_count', 'negative_count'))
+
+
+def grouped_cube():
+    """
+    Cube values recomputed from the StudentDailyScore rollup
+    """
+    daily = _table_values(StudentDailyScore, ROLLUP_KEY_FIELDS, ROLLUP_FIELDS)
+    dimension_chapters = dict(RuleDimension.objects.order_by().values_list('id', 'chapter_id'))
+    return {
+        key: value for key, value in cube_deltas(daily, dimension_chapters).items()
+        if value[0] or value[1]
+    }
+
+
+def move_dimension(dimension_id, chapter_id):
+    """
+    Re-key a dimension's cube cells to the chapter it moved to. A dimension's cells all
+    carry its one chapter, so no two of them merge and a plain UPDATE does it.
+    """
+    ScoreCube.objects.filter(dimension_id=dimension_id).update(chapter_id=chapter_id)
+
+
+def rebuild_cube(batch_size=2000):
+    """
+    Recompute the cube from the rollup; returns the number of cells written
+    """
+    grouped = grouped_cube()
+    with transaction.atomic():
+        ScoreCube.objects.all().delete()
+        ScoreCube.objects.bulk_create(
+            (
+                ScoreCube(**dict(zip(CUBE_KEY_FIELDS, key)), **dict(zip(ROLLUP_FIELDS, values)))
+                for key, values in grouped.items()
+            ),
+            batch_size=batch_size
+        )
+    return len(grouped)
@@ -0,0 +1,67 @@
+import base64
+
+from django.db import transaction
+
+from .models import BehaviorScoreChange, CacheVersion
+
+SYNC_CURSOR_PREFIX = 'bsc2:'
+# Cursors from before the scope version existed; they always trigger a resync
+LEGACY_SYNC_CURSOR_PREFIX = 'bsc1:'
+# CacheVersion counter bumped by writes that change which scores a user may see
+SYNC_SCOPE_VERSION = 'score_sync_scope'
+
+
+def record_score_changes(scores, deleted=False):
+    """
+    Log created or edited (deleted=False) or removed (deleted=True) BehaviorScore
+    instances for delta sync, replacing any earlier entry for the same score
+    """
+    scores = [score for score in scores if score.pk is not None]
+    if not scores:
+        return
+    with transaction.atomic():
+        BehaviorScoreChange.objects.filter(score_id__in=[score.pk for score in scores]).delete()
+        BehaviorScoreChange.objects.bulk_create(
+            BehaviorScoreChange(score_id=score.pk, student_id=score.student_id,
+                                school_class_id=score.school_class_id, deleted=deleted)
+            for score in scores
+        )
+
+
+def sync_scope_version():
+    return CacheVersion.current(SYNC_SCOPE_VERSION)
+
+
+def bump_sync_scope_version():
+    """
+    Send every syncing client back to a full resync. Call after a write that moves
+    scores into or out of some user's scope without logging a change for them: a
+    student changing home class, teacher or parent assignments changing, or a score
+    edited onto another student or class (whose old viewers get no tombstone).
+    """
+    CacheVersion.bump(SYNC_SCOPE_VERSION)
+
+
+def encode_sync_cursor(scope_version, change_id):
+    return base64.urlsafe_b64encode(f'{SYNC_CURSOR_PREFIX}{scope_version}:{change_id}'.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """
+    (scope version, change id) encoded in an opaque cursor; legacy cursors carry no
+    scope version (None). Raises ValueError for anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Malformed cursor')
+    if raw.startswith(LEGACY_SYNC_CURSOR_PREFIX):
+        scope_version, change_id = None, int(raw[len(LEGACY_SYNC_CURSOR_PREFIX):])
+    elif raw.startswith(SYNC_CURSOR_PREFIX):
+        scope_version, _, change_id = raw[len(SYNC_CURSOR_PREFIX):].partition(':')
+        scope_version, change_id = int(scope_version), int(change_id)
+    else:
+        raise ValueError('Malformed cursor')
+    if change_id < 0 or (scope_version is not None and scope_version < 0):
+        raise ValueError('Malformed cursor')
+    return scope_version, change_id
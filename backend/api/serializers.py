@@ -2,7 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
 from .models import (CustomUser, Grade, SchoolClass, RuleChapter, RuleDimension, RuleSubItem, 
                     StudentParentRelationship, BehaviorScore, ParentObservation, StudentSelfReport, 
-                    Award, Notification, NotificationType) # Added Notification models
+                    Award, Notification, NotificationType, ScoreType, ReportJob, ReportJobStatus) # Added Notification models
+from .report_jobs import JOB_TARGETS
+from .rule_tree import get_rule_tree
 
 # Define SchoolClassSerializer before UserSerializer
 class SchoolClassSerializer(serializers.ModelSerializer):
@@ -130,17 +132,17 @@ class UserSerializer(serializers.ModelSerializer):
 class RuleSubItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = RuleSubItem
-        fields = ['id', 'name', 'description', 'dimension', 'max_score']
+        fields = ['id', 'name', 'description', 'dimension', 'order']
 
 class RuleDimensionSerializer(serializers.ModelSerializer):
-    sub_items = RuleSubItemSerializer(many=True, read_only=True, source='rulesubitem_set') # For nested listing
+    sub_items = RuleSubItemSerializer(many=True, read_only=True) # For nested listing
 
     class Meta:
         model = RuleDimension
         fields = ['id', 'name', 'description', 'chapter', 'sub_items']
 
 class RuleChapterSerializer(serializers.ModelSerializer):
-    dimensions = RuleDimensionSerializer(many=True, read_only=True, source='ruledimension_set') # For nested listing
+    dimensions = RuleDimensionSerializer(many=True, read_only=True) # For nested listing
 
     class Meta:
         model = RuleChapter
@@ -165,12 +167,35 @@ class StudentParentRelationshipSerializer(serializers.ModelSerializer):
         return f"{obj.parent.first_name} {obj.parent.last_name}".strip()
 
 # Serializers for behavior tracking and awards
-class BehaviorScoreSerializer(serializers.ModelSerializer):
+class RuleTreeNamesMixin:
+    """
+    Resolves rule sub-item, dimension and chapter names from the cached rule tree
+    instead of following rule_sub_item -> dimension -> chapter for every row.
+    The snapshot is fetched once per request and shared through the serializer context.
+    """
+    @property
+    def rule_tree(self):
+        context = self.context
+        if 'rule_tree' not in context:
+            context['rule_tree'] = get_rule_tree()
+        return context['rule_tree']
+
+    def get_rule_name(self, obj):
+        sub_item = self.rule_tree.sub_items.get(obj.rule_sub_item_id)
+        return sub_item.name if sub_item else None
+
+    def get_dimension_name(self, obj):
+        return self.rule_tree.sub_item_names(obj.rule_sub_item_id)[1]
+
+    def get_chapter_name(self, obj):
+        return self.rule_tree.sub_item_names(obj.rule_sub_item_id)[0]
+
+class BehaviorScoreSerializer(RuleTreeNamesMixin, serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
     recorder_name = serializers.SerializerMethodField()
-    rule_name = serializers.ReadOnlyField(source='rule_sub_item.name')
-    dimension_name = serializers.ReadOnlyField(source='rule_sub_item.dimension.name')
-    chapter_name = serializers.ReadOnlyField(source='rule_sub_item.dimension.chapter.name')
+    rule_name = serializers.SerializerMethodField()
+    dimension_name = serializers.SerializerMethodField()
+    chapter_name = serializers.SerializerMethodField()
     score_type_display = serializers.ReadOnlyField(source='get_score_type_display')
     school_class_name = serializers.ReadOnlyField(source='school_class.name')
     
@@ -180,7 +205,7 @@ class BehaviorScoreSerializer(serializers.ModelSerializer):
             'id', 'student', 'student_name', 'rule_sub_item', 'rule_name',
             'dimension_name', 'chapter_name', 'recorded_by', 'recorder_name',
             'school_class', 'school_class_name', 'score_type', 'score_type_display',
-            'points', 'comment', 'created_at', 'date_of_behavior'
+            'points', 'comment', 'created_at', 'date_of_behavior', 'idempotency_key'
         ]
     
     def get_student_name(self, obj):
@@ -189,10 +214,30 @@ class BehaviorScoreSerializer(serializers.ModelSerializer):
     def get_recorder_name(self, obj):
         return f"{obj.recorded_by.first_name} {obj.recorded_by.last_name}".strip()
 
-class ParentObservationSerializer(serializers.ModelSerializer):
+class BehaviorScoreBulkItemSerializer(serializers.Serializer):
+    """
+    Shape validation for one record of a bulk scoring request.
+    Related ids are plain integers here; the view resolves them against
+    prefetched students, sub-items and classes instead of one query per row.
+    """
+    student = serializers.IntegerField()
+    rule_sub_item = serializers.IntegerField()
+    school_class = serializers.IntegerField(required=False, allow_null=True)
+    score_type = serializers.ChoiceField(choices=ScoreType.choices, default=ScoreType.POSITIVE)
+    points = serializers.IntegerField(default=1)
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+    date_of_behavior = serializers.DateField(required=False)
+
+class BehaviorScoreIngestItemSerializer(BehaviorScoreBulkItemSerializer):
+    """
+    One queued offline record; the client-generated key identifies it across retries
+    """
+    idempotency_key = serializers.UUIDField()
+
+class ParentObservationSerializer(RuleTreeNamesMixin, serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
     parent_name = serializers.SerializerMethodField()
-    rule_name = serializers.ReadOnlyField(source='rule_sub_item.name', default=None)
+    rule_name = serializers.SerializerMethodField()
     reviewer_name = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
     
@@ -224,9 +269,9 @@ class ParentObservationSerializer(serializers.ModelSerializer):
         }
         return status_map.get(obj.status, obj.status)
 
-class StudentSelfReportSerializer(serializers.ModelSerializer):
+class StudentSelfReportSerializer(RuleTreeNamesMixin, serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
-    rule_name = serializers.ReadOnlyField(source='rule_sub_item.name', default=None)
+    rule_name = serializers.SerializerMethodField()
     reviewer_name = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
     
@@ -290,3 +335,30 @@ class NotificationSerializer(serializers.ModelSerializer):
     
     def get_user_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}".strip()
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    target = serializers.ChoiceField(choices=sorted(JOB_TARGETS))
+    has_result = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'target', 'params', 'status', 'progress', 'progress_detail', 'attempts', 'error',
+            'has_result', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = ['status', 'progress', 'progress_detail', 'attempts', 'error', 'created_at',
+                            'started_at', 'finished_at']
+    
+    def get_has_result(self, obj):
+        return obj.status == ReportJobStatus.SUCCEEDED
+    
+    def validate_params(self, value):
+        # Params become a query string, so only scalars and lists of scalars make sense
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('params must be an object of query parameters.')
+        for name, param in value.items():
+            items = param if isinstance(param, list) else [param]
+            if any(isinstance(item, (dict, list)) or item is None for item in items):
+                raise serializers.ValidationError(f'params.{name} must be a value or a list of values.')
+        return value
+
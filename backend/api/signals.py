@@ -0,0 +1,266 @@
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (BehaviorScore, CustomUser, Grade, LeaderboardEntry, LeaderboardScope, SchoolClass,
+                     RuleChapter, RuleDimension, RuleSubItem, Award, ParentObservation,
+                     StudentParentRelationship, StudentSelfReport)
+from .report_cache import (AWARDS, OBSERVATIONS, RULES, SCORES, SELF_REPORTS,
+                           invalidate_for_scores, invalidate_reports, local_date)
+from .rule_tree import clear_rule_tree_cache
+from .score_rollups import apply_deltas, apply_scores, move_dimension, move_sub_item, score_delta, score_key
+from .score_sync import bump_sync_scope_version, record_score_changes
+
+
+@receiver(pre_save, sender=BehaviorScore)
+def remember_previous_score(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored version of an edited score so its old contribution can be undone
+    """
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = (
+        BehaviorScore.objects.filter(pk=instance.pk)
+        .values_list('student_id', 'school_class_id', 'grade_id', 'rule_sub_item__dimension_id',
+                     'date_of_behavior', 'score_type', 'points')
+        .first()
+    )
+
+
+@receiver(post_save, sender=BehaviorScore)
+def rollup_saved_score(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep StudentDailyScore current when a score is created or edited
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is None:
+        apply_scores([instance])
+        return
+
+    student_id, school_class_id, grade_id, dimension_id, date, score_type, points = previous
+    new_dimension_id = instance.rule_sub_item.dimension_id
+    old_key = score_key(student_id, school_class_id, grade_id, dimension_id, date)
+    new_key = score_key(instance.student_id, instance.school_class_id, instance.grade_id, new_dimension_id,
+                        instance.date_of_behavior)
+    old_delta = score_delta(score_type, points, -1)
+    new_delta = score_delta(instance.score_type, instance.points)
+    if old_key == new_key:
+        apply_deltas({new_key: tuple(a + b for a, b in zip(old_delta, new_delta))})
+    else:
+        apply_deltas({old_key: old_delta, new_key: new_delta})
+
+
+@receiver(post_delete, sender=BehaviorScore)
+def rollup_deleted_score(sender, instance, **kwargs):
+    """
+    Remove a deleted score's contribution from StudentDailyScore
+    """
+    apply_scores([instance], sign=-1)
+
+
+@receiver(post_save, sender=BehaviorScore)
+def log_saved_score(sender, instance, raw=False, **kwargs):
+    """
+    Record created and edited scores for delta sync. The change row follows the score
+    to its new student or class, so a move also sends its old viewers to a resync.
+    """
+    if raw:
+        return
+    record_score_changes([instance])
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous[:2] != (instance.student_id, instance.school_class_id):
+        bump_sync_scope_version()
+
+
+@receiver(post_delete, sender=BehaviorScore)
+def log_deleted_score(sender, instance, **kwargs):
+    """
+    Leave a tombstone so syncing clients drop the deleted score
+    """
+    record_score_changes([instance], deleted=True)
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_previous_user_scope(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Capture the stored home class and role of an edited user; saves that only touch
+    other fields (last_login on every sign-in) skip the lookup
+    """
+    instance._sync_previous_scope = None
+    if raw or instance.pk is None or (update_fields is not None and not {'school_class', 'role'} & set(update_fields)):
+        return
+    instance._sync_previous_scope = (
+        CustomUser.objects.filter(pk=instance.pk).values_list('school_class_id', 'role').first()
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def resync_on_user_scope_change(sender, instance, raw=False, **kwargs):
+    """
+    A student changing class changes which teachers see their scores, and a role
+    change changes what the user sees; either sends syncing clients to a resync
+    """
+    previous = getattr(instance, '_sync_previous_scope', None)
+    if not raw and previous is not None and previous != (instance.school_class_id, instance.role):
+        bump_sync_scope_version()
+
+
+@receiver(m2m_changed, sender=CustomUser.teaching_classes.through)
+@receiver(m2m_changed, sender=SchoolClass.class_teachers.through)
+def resync_on_teacher_assignment(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_sync_scope_version()
+
+
+@receiver(post_save, sender=StudentParentRelationship)
+@receiver(post_delete, sender=StudentParentRelationship)
+@receiver(post_delete, sender=SchoolClass)
+def resync_on_scope_change(sender, raw=False, **kwargs):
+    """
+    Parents gaining or losing a child, and students left without a class when theirs
+    is deleted, change which scores syncing clients may see
+    """
+    if not raw:
+        bump_sync_scope_version()
+
+
+@receiver(post_save, sender=BehaviorScore)
+def invalidate_saved_score_reports(sender, instance, raw=False, **kwargs):
+    """
+    Evict cached reports covering the score as it is now and, after an edit, as it was
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is None:
+        invalidate_for_scores([instance])
+        return
+    student_id, school_class_id, _, _, date, _, _ = previous
+    invalidate_reports(
+        SCORES,
+        dates=[date, instance.date_of_behavior, local_date(instance.created_at)],
+        class_ids=[school_class_id, instance.school_class_id],
+        student_ids=[student_id, instance.student_id],
+    )
+
+
+@receiver(post_delete, sender=BehaviorScore)
+def invalidate_deleted_score_reports(sender, instance, **kwargs):
+    invalidate_for_scores([instance])
+
+
+@receiver(pre_save, sender=Award)
+def remember_previous_award(sender, instance, raw=False, **kwargs):
+    instance._report_previous = None
+    if not raw and instance.pk is not None:
+        instance._report_previous = (
+            Award.objects.filter(pk=instance.pk).values_list('school_class_id', 'award_date').first()
+        )
+
+
+@receiver(post_save, sender=Award)
+@receiver(post_delete, sender=Award)
+def invalidate_award_reports(sender, instance, raw=False, **kwargs):
+    """
+    Evict cached award analytics for the award's date and class snapshot (old and new on edits)
+    """
+    if raw:
+        return
+    class_ids = [instance.school_class_id]
+    dates = [instance.award_date]
+    previous = getattr(instance, '_report_previous', None)
+    if previous is not None:
+        class_ids.append(previous[0])
+        dates.append(previous[1])
+    invalidate_reports(AWARDS, dates=dates, class_ids=class_ids)
+
+
+@receiver(post_save, sender=ParentObservation)
+@receiver(post_delete, sender=ParentObservation)
+@receiver(post_save, sender=StudentSelfReport)
+@receiver(post_delete, sender=StudentSelfReport)
+def invalidate_observation_reports(sender, instance, raw=False, **kwargs):
+    """
+    Evict cached engagement reports for the day the observation or self-report was submitted
+    """
+    if raw:
+        return
+    invalidate_reports(
+        OBSERVATIONS if sender is ParentObservation else SELF_REPORTS,
+        dates=[local_date(instance.created_at)],
+        student_ids=[instance.student_id],
+    )
+
+
+@receiver(post_delete, sender=SchoolClass)
+def drop_class_leaderboards(sender, instance, **kwargs):
+    """
+    Leaderboard scopes are plain ids, so clear them when their class goes away
+    """
+    LeaderboardEntry.objects.filter(scope=LeaderboardScope.CLASS, scope_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Grade)
+def drop_grade_leaderboards(sender, instance, **kwargs):
+    LeaderboardEntry.objects.filter(scope=LeaderboardScope.GRADE, scope_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=RuleSubItem)
+def remember_previous_dimension(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored dimension of an edited sub-item so its rollup rows can follow a move
+    """
+    instance._rollup_previous_dimension = None
+    if not raw and instance.pk is not None:
+        instance._rollup_previous_dimension = (
+            RuleSubItem.objects.filter(pk=instance.pk).values_list('dimension_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=RuleSubItem)
+def rollup_moved_sub_item(sender, instance, raw=False, **kwargs):
+    """
+    Rollup rows are keyed by the dimension a score's sub-item had when it was written;
+    re-key the sub-item's rows when it moves, so later edits and deletes find them
+    """
+    previous = getattr(instance, '_rollup_previous_dimension', None)
+    if not raw and previous is not None and previous != instance.dimension_id:
+        move_sub_item(instance.pk, previous, instance.dimension_id)
+
+
+@receiver(pre_save, sender=RuleDimension)
+def remember_previous_chapter(sender, instance, raw=False, **kwargs):
+    instance._cube_previous_chapter = None
+    if not raw and instance.pk is not None:
+        instance._cube_previous_chapter = (
+            RuleDimension.objects.filter(pk=instance.pk).values_list('chapter_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=RuleDimension)
+def cube_moved_dimension(sender, instance, raw=False, **kwargs):
+    """
+    Cube cells carry the chapter their dimension had when they were written; move
+    them with the dimension so chapter slices agree with the live rule tree
+    """
+    previous = getattr(instance, '_cube_previous_chapter', None)
+    if not raw and previous is not None and previous != instance.chapter_id:
+        move_dimension(instance.pk, instance.chapter_id)
+
+
+@receiver(post_save, sender=RuleChapter)
+@receiver(post_save, sender=RuleDimension)
+@receiver(post_save, sender=RuleSubItem)
+@receiver(post_delete, sender=RuleChapter)
+@receiver(post_delete, sender=RuleDimension)
+@receiver(post_delete, sender=RuleSubItem)
+def drop_local_rule_tree(sender, **kwargs):
+    """
+    Rule writes from any code path in this process (admin, shell, imports) refresh its
+    own snapshot; other processes follow the version bumped by the rule viewsets.
+    Cached reports that label rules are evicted in every process.
+    """
+    clear_rule_tree_cache()
+    invalidate_reports(RULES)
@@ -0,0 +1,340 @@
+import contextlib
+import itertools
+import math
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (CustomUser, UserRole, Grade, SchoolClass, StudentParentRelationship,
+                     RuleChapter, RuleDimension, RuleSubItem, BehaviorScore, ScoreType,
+                     ParentObservation, StudentSelfReport, Award, Notification, NotificationType)
+from .report_cache import AWARDS, OBSERVATIONS, RULES, SCORES, SELF_REPORTS, invalidate_reports
+from .rule_tree import bump_rule_tree_version
+from .score_rollups import rebuild_rollup
+from .score_sync import record_score_changes
+
+# Rule hierarchy of the generated school: chapter -> dimension -> sub-items
+RULE_TREE = {
+    'Civility and Courtesy': {
+        'Respect for Others': ['Greets teachers and elders', 'Speaks politely', 'Waits their turn',
+                               'Listens without interrupting', 'Thanks others for help'],
+        'Classroom Manners': ['Raises hand before speaking', 'Keeps desk tidy', 'Arrives on time',
+                              'Follows seating plan', 'Keeps voice low'],
+    },
+    'Diligence and Learning': {
+        'Homework': ['Submits homework on time', 'Corrects mistakes', 'Completes reading log',
+                     'Prepares materials', 'Reviews notes'],
+        'Participation': ['Answers questions', 'Helps classmates', 'Leads group work',
+                          'Asks thoughtful questions', 'Presents to class'],
+    },
+    'Responsibility': {
+        'Duties': ['Completes cleaning duty', 'Looks after class plants', 'Returns library books',
+                   'Takes care of equipment', 'Reports problems to teachers'],
+        'Honesty': ['Admits mistakes', 'Returns lost property', 'Tells the truth',
+                    'Does own work', 'Keeps promises'],
+    },
+    'Health and Safety': {
+        'Personal Health': ['Washes hands', 'Eats lunch', 'Joins morning exercise',
+                            'Wears uniform correctly', 'Rests at break'],
+        'Safety': ['Walks in corridors', 'Lines up quietly', 'Follows fire drill',
+                   'Uses equipment safely', 'Stays within school grounds'],
+    },
+    'Community and Environment': {
+        'Environment': ['Sorts recycling', 'Saves water', 'Turns off lights',
+                        'Picks up litter', 'Cares for school garden'],
+        'Community Service': ['Volunteers for events', 'Helps younger students', 'Joins charity drive',
+                              'Welcomes visitors', 'Represents the school'],
+    },
+}
+
+FIRST_NAMES = ['Wei', 'Fang', 'Min', 'Jing', 'Lei', 'Yan', 'Hao', 'Xin', 'Yu', 'Jun',
+               'Li', 'Ting', 'Chen', 'Hui', 'Bo', 'Lan', 'Qiang', 'Mei', 'Tao', 'Ying']
+LAST_NAMES = ['Wang', 'Li', 'Zhang', 'Liu', 'Chen', 'Yang', 'Huang', 'Zhao', 'Wu', 'Zhou',
+              'Xu', 'Sun', 'Ma', 'Zhu', 'Hu', 'Guo', 'He', 'Lin', 'Gao', 'Luo']
+# Last day of generated history unless given; fixed so a seed reproduces the same school on any day
+DEFAULT_END_DATE = date(2025, 6, 30)
+AWARD_NAMES = {
+    'star': ['Weekly Star', 'Monthly Star', 'Class Star'],
+    'badge': ['Kindness Badge', 'Reading Badge', 'Tidy Desk Badge', 'Helper Badge'],
+    'certificate': ['Certificate of Merit', 'Perfect Attendance', 'Term Excellence'],
+    'other': ['Principal Commendation'],
+}
+
+
+class SchoolGenerator:
+    """
+    Builds a deterministic synthetic school for load testing.
+
+    Every row is inserted with bulk_create, so signals do not fire; the rollup,
+    leaderboards, cube, change log and report cache are brought up to date once at
+    the end instead. Usernames start with prefix so a generated school can sit next
+    to real data.
+    """
+    def __init__(self, *, seed=42, prefix='syn', grades=6, students=5000, class_size=30,
+                 scores=2_000_000, observations_per_student=4, self_reports_per_student=4,
+                 awards_per_student=2, notifications_per_user=10, days=365, end_date=DEFAULT_END_DATE,
+                 password='password', batch_size=5000, log=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.grade_count = grades
+        self.student_count = students
+        self.class_size = class_size
+        self.score_count = scores
+        self.observations_per_student = observations_per_student
+        self.self_reports_per_student = self_reports_per_student
+        self.awards_per_student = awards_per_student
+        self.notifications_per_user = notifications_per_user
+        self.end_date = end_date
+        self.days = days
+        self.password = password
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def generate(self):
+        """
+        Create the whole school; returns {model name: rows created}
+        """
+        if CustomUser.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise ValueError(f"Users prefixed '{self.prefix}_' already exist; choose another prefix.")
+
+        self.counts = {}
+        self.school_days = [
+            day for day in (self.end_date - timedelta(days=offset) for offset in range(self.days))
+            if day.weekday() < 5
+        ] or [self.end_date]
+        self.password_hash = make_password(self.password)
+
+        with transaction.atomic():
+            self.create_structure()
+            self.create_rule_tree()
+        with _explicit_timestamps(BehaviorScore, ParentObservation, StudentSelfReport, Award, Notification):
+            self.create_scores()
+            self.create_observations()
+            self.create_self_reports()
+            self.create_awards()
+            self.create_notifications()
+
+        self.log('Rebuilding rollup, leaderboards and cube...')
+        rebuild_rollup(batch_size=self.batch_size)
+        bump_rule_tree_version()
+        for source in (SCORES, AWARDS, OBSERVATIONS, SELF_REPORTS, RULES):
+            invalidate_reports(source)
+        return self.counts
+
+    # Structure
+
+    def _users(self, kind, count, role, **fields):
+        users = [
+            CustomUser(
+                username=f'{self.prefix}_{kind}_{number:05d}',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                email=f'{self.prefix}_{kind}_{number:05d}@example.com',
+                password=self.password_hash,
+                role=role,
+                **fields,
+            )
+            for number in range(1, count + 1)
+        ]
+        created = CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+        self.counts[kind] = self.counts.get(kind, 0) + len(created)
+        return created
+
+    def create_structure(self):
+        class_count = max(1, math.ceil(self.student_count / self.class_size))
+        self.grades = Grade.objects.bulk_create(
+            Grade(name=f'{self.prefix.upper()} Grade {number}', description='Synthetic grade')
+            for number in range(1, self.grade_count + 1)
+        )
+        self.classes = SchoolClass.objects.bulk_create(
+            SchoolClass(name=f'Class {index // self.grade_count + 1}',
+                        grade=self.grades[index % self.grade_count])
+            for index in range(class_count)
+        )
+        self.counts['grades'] = len(self.grades)
+        self.counts['classes'] = len(self.classes)
+        self.log(f'Created {len(self.grades)} grades and {len(self.classes)} classes.')
+
+        for kind, role in (('admin', UserRole.SYSTEM_ADMINISTRATOR), ('principal', UserRole.PRINCIPAL),
+                           ('director', UserRole.DIRECTOR), ('supervisor', UserRole.MORAL_EDUCATION_SUPERVISOR)):
+            self._users(kind, 1, role)
+
+        # One class teacher per class; each teaching teacher covers a few classes of one grade
+        self.class_teachers = self._users('class_teacher', len(self.classes), UserRole.CLASS_TEACHER)
+        SchoolClass.class_teachers.through.objects.bulk_create(
+            SchoolClass.class_teachers.through(schoolclass_id=school_class.id, customuser_id=teacher.id)
+            for school_class, teacher in zip(self.classes, self.class_teachers)
+        )
+        teaching_teachers = self._users('teaching_teacher', max(1, len(self.classes) // 2),
+                                        UserRole.TEACHING_TEACHER)
+        classes_by_grade = {}
+        for school_class in self.classes:
+            classes_by_grade.setdefault(school_class.grade_id, []).append(school_class)
+        self.recorders = {school_class.id: [teacher] for school_class, teacher in zip(self.classes, self.class_teachers)}
+        links = []
+        for index, teacher in enumerate(teaching_teachers):
+            grade_classes = classes_by_grade[self.grades[index % self.grade_count].id]
+            for school_class in self.rng.sample(grade_classes, min(len(grade_classes), 4)):
+                links.append(CustomUser.teaching_classes.through(customuser_id=teacher.id,
+                                                                 schoolclass_id=school_class.id))
+                self.recorders[school_class.id].append(teacher)
+        CustomUser.teaching_classes.through.objects.bulk_create(links, batch_size=self.batch_size)
+
+        self.students = self._users('student', self.student_count, UserRole.STUDENT)
+        for index, student in enumerate(self.students):
+            student.school_class = self.classes[index % len(self.classes)]
+        CustomUser.objects.bulk_update(self.students, ['school_class'], batch_size=self.batch_size)
+
+        # Roughly one parent per student, with some siblings sharing parents
+        parents = self._users('parent', self.student_count, UserRole.PARENT)
+        self.parent_of = {}
+        relationships = []
+        for index, student in enumerate(self.students):
+            parent = parents[index - 1] if index and self.rng.random() < 0.1 else parents[index]
+            self.parent_of[student.id] = parent
+            relationships.append(StudentParentRelationship(student_id=student.id, parent_id=parent.id))
+        StudentParentRelationship.objects.bulk_create(relationships, batch_size=self.batch_size)
+        self.counts['relationships'] = len(relationships)
+        self.log(f'Created {len(self.students)} students and {len(relationships)} parent links.')
+
+    def create_rule_tree(self):
+        self.sub_items = []
+        for chapter_order, (chapter_name, dimensions) in enumerate(RULE_TREE.items()):
+            chapter = RuleChapter.objects.create(name=f'{self.prefix.upper()} {chapter_name}', order=chapter_order)
+            for dimension_order, (dimension_name, sub_item_names) in enumerate(dimensions.items()):
+                dimension = RuleDimension.objects.create(chapter=chapter, name=dimension_name, order=dimension_order)
+                self.sub_items += RuleSubItem.objects.bulk_create(
+                    RuleSubItem(dimension=dimension, name=name, order=order)
+                    for order, name in enumerate(sub_item_names)
+                )
+        # A few rules are used far more often than the rest
+        self.sub_item_weights = [1 / (rank + 1) for rank in range(len(self.sub_items))]
+        self.rng.shuffle(self.sub_item_weights)
+        self.counts['rule_sub_items'] = len(self.sub_items)
+
+    # Histories
+
+    def _moment(self, day):
+        return timezone.make_aware(datetime.combine(day, time(self.rng.randint(7, 17), self.rng.randint(0, 59))))
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    def create_scores(self):
+        # Activity and conduct vary by student: some are scored far more often or more negatively
+        activity = [self.rng.lognormvariate(0, 0.6) for _ in self.students]
+        negative_rate = {student.id: min(0.6, 0.08 + self.rng.expovariate(10)) for student in self.students}
+        activity = list(itertools.accumulate(activity))
+        sub_item_weights = list(itertools.accumulate(self.sub_item_weights))
+        created = 0
+        for size in self._batches(self.score_count):
+            scores = []
+            sub_items = self.rng.choices(self.sub_items, cum_weights=sub_item_weights, k=size)
+            students = self.rng.choices(self.students, cum_weights=activity, k=size)
+            for student, sub_item in zip(students, sub_items):
+                negative = self.rng.random() < negative_rate[student.id]
+                day = self.rng.choice(self.school_days)
+                scores.append(BehaviorScore(
+                    student_id=student.id,
+                    school_class_id=student.school_class.id,
+                    grade_id=student.school_class.grade_id,
+                    recorded_by_id=self.rng.choice(self.recorders[student.school_class.id]).id,
+                    rule_sub_item_id=sub_item.id,
+                    score_type=ScoreType.NEGATIVE if negative else ScoreType.POSITIVE,
+                    points=self.rng.randint(1, 5) if negative else self.rng.choice((1, 1, 1, 2, 2, 3)),
+                    comment='Synthetic note' if self.rng.random() < 0.05 else '',
+                    date_of_behavior=day,
+                    created_at=self._moment(day),
+                ))
+            with transaction.atomic():
+                scores = BehaviorScore.objects.bulk_create(scores)
+                record_score_changes(scores)
+            created += len(scores)
+            if created % (self.batch_size * 40) == 0 or created == self.score_count:
+                self.log(f'Created {created} behavior scores.')
+        self.counts['behavior_scores'] = created
+
+    def _review(self, day):
+        status = self.rng.choices(('approved', 'rejected', 'pending'), weights=(6, 1, 2))[0]
+        if status == 'pending':
+            return {'status': status}
+        reviewer = self.class_teachers[self.rng.randrange(len(self.class_teachers))]
+        return {'status': status, 'reviewed_by_id': reviewer.id,
+                'reviewed_at': self._moment(min(day + timedelta(days=1), self.end_date))}
+
+    def create_observations(self):
+        rows = []
+        for student in self.students:
+            for _ in range(self.rng.randint(0, 2 * self.observations_per_student)):
+                day = self.rng.choice(self.school_days)
+                rows.append(ParentObservation(
+                    student_id=student.id, parent_id=self.parent_of[student.id].id,
+                    rule_sub_item_id=self.rng.choice(self.sub_items).id,
+                    description='Helped at home without being asked.', date_of_behavior=day,
+                    created_at=self._moment(day), **self._review(day),
+                ))
+        self.counts['parent_observations'] = len(ParentObservation.objects.bulk_create(rows, batch_size=self.batch_size))
+
+    def create_self_reports(self):
+        rows = []
+        for student in self.students:
+            for _ in range(self.rng.randint(0, 2 * self.self_reports_per_student)):
+                day = self.rng.choice(self.school_days)
+                rows.append(StudentSelfReport(
+                    student_id=student.id, rule_sub_item_id=self.rng.choice(self.sub_items).id,
+                    description='Tidied the classroom after lunch.', date_of_behavior=day,
+                    created_at=self._moment(day), **self._review(day),
+                ))
+        self.counts['self_reports'] = len(StudentSelfReport.objects.bulk_create(rows, batch_size=self.batch_size))
+
+    def create_awards(self):
+        rows = []
+        for student in self.students:
+            for _ in range(self.rng.randint(0, 2 * self.awards_per_student)):
+                award_type = self.rng.choices(list(AWARD_NAMES), weights=(6, 3, 2, 1))[0]
+                day = self.rng.choice(self.school_days)
+                rows.append(Award(
+                    student_id=student.id, name=self.rng.choice(AWARD_NAMES[award_type]),
+                    award_type=award_type, level=self.rng.randint(1, 5) if award_type == 'star' else 1,
+                    awarded_by_id=self.rng.choice(self.recorders[student.school_class.id]).id,
+                    award_date=day, created_at=self._moment(day),
+                    school_class_id=student.school_class.id, grade_id=student.school_class.grade_id,
+                ))
+        self.counts['awards'] = len(Award.objects.bulk_create(rows, batch_size=self.batch_size))
+
+    def create_notifications(self):
+        recipients = self.students + list({parent.id: parent for parent in self.parent_of.values()}.values())
+        created = 0
+        for size in self._batches(len(recipients) * self.notifications_per_user):
+            rows = []
+            for user in self.rng.choices(recipients, k=size):
+                day = self.rng.choice(self.school_days)
+                notification_type = self.rng.choice(NotificationType.values)
+                rows.append(Notification(
+                    user_id=user.id, title=f'{notification_type.title()} update',
+                    message='Synthetic notification', notification_type=notification_type,
+                    is_read=day < self.end_date - timedelta(days=7) or self.rng.random() < 0.5,
+                    created_at=self._moment(day),
+                ))
+            created += len(Notification.objects.bulk_create(rows))
+        self.counts['notifications'] = created
+
+
+@contextlib.contextmanager
+def _explicit_timestamps(*models):
+    """
+    Let created_at values set on generated rows through, instead of auto_now_add
+    stamping every historical row with the current time
+    """
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
@@ -1,3 +1,1596 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import (BehaviorScore, BehaviorScoreChange, CacheVersion, ParentObservation,
+                     StudentSelfReport, Award, Notification, ScoreType, CustomUser, UserRole, RuleChapter,
+                     RuleDimension, RuleSubItem, Grade, SchoolClass, ReportJob, ReportJobStatus,
+                     StudentParentRelationship, StudentDailyScore, LeaderboardEntry, LeaderboardPeriod, LeaderboardScope,
+                     ScoreCube)
+from .report_cache import report_cache
+from . import user_import
+from .benchmarks import compare, run_benchmarks
+from .early_warning import detect_early_warnings, send_early_warnings
+from .pagination import CreatedAtCursorPagination
+from .password_hashing import make_passwords
+from .report_jobs import run_pending_jobs
+from .rule_tree import get_rule_tree
+from .score_rollups import (period_end, period_start, rebuild_cube, rebuild_leaderboards, rebuild_rollup,
+                            verify_rollup)
+from .score_sync import SYNC_SCOPE_VERSION
+from .serializers import BehaviorScoreSerializer
+
+
+class SchoolTestCase(TestCase):
+    """
+    Base for API tests: a system administrator the client is logged in as, a
+    Courtesy > Greetings rule, and builders for classes, students and scores.
+    Every test starts with an empty report cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('admin', password='x', role=UserRole.SYSTEM_ADMINISTRATOR)
+        cls.chapter = RuleChapter.objects.create(name='Courtesy')
+        cls.dimension = RuleDimension.objects.create(chapter=cls.chapter, name='Greetings')
+        cls.sub_item = RuleSubItem.objects.create(dimension=cls.dimension, name='-')
+        # As on a live school, so query counts show a bump as a single UPDATE
+        CacheVersion.objects.create(name=SYNC_SCOPE_VERSION)
+
+    def setUp(self):
+        report_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    @staticmethod
+    def create_class(name='A', grade='Grade 1'):
+        if not isinstance(grade, Grade):
+            grade = Grade.objects.get_or_create(name=grade)[0]
+        return SchoolClass.objects.create(name=name, grade=grade)
+
+    @staticmethod
+    def create_student(username, school_class=None):
+        return CustomUser.objects.create_user(username, password='x', role=UserRole.STUDENT,
+                                              school_class=school_class)
+
+    @classmethod
+    def create_score(cls, student, day=date(2025, 3, 3), score_type=ScoreType.POSITIVE, points=1, **fields):
+        fields.setdefault('rule_sub_item', cls.sub_item)
+        fields.setdefault('school_class_id', student.school_class_id)
+        return BehaviorScore.objects.create(student=student, recorded_by=cls.admin, date_of_behavior=day,
+                                            score_type=score_type, points=points, **fields)
+
+
+class ScoreSummaryTests(SchoolTestCase):
+    """
+    /behavior-scores/summary/ reads the StudentDailyScore rollup (and raw scores
+    for sub-items) yet matches aggregating the raw scores directly, at every
+    group_by level, with same-named dimensions in different chapters kept apart.
+    """
+    url = '/api/behavior-scores/summary/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Safety also has a Greetings dimension
+        safety = RuleChapter.objects.create(name='Safety')
+        safety_greetings = RuleDimension.objects.create(chapter=safety, name='Greetings')
+        crossing = RuleDimension.objects.create(chapter=safety, name='Crossing')
+        cls.sub_items = [
+            cls.sub_item,
+            RuleSubItem.objects.create(dimension=cls.dimension, name='Waves'),
+            RuleSubItem.objects.create(dimension=safety_greetings, name='Nods'),
+            RuleSubItem.objects.create(dimension=crossing, name='Looks both ways'),
+        ]
+        cls.classes = [cls.create_class(name) for name in ('A', 'B')]
+        students = [cls.create_student(f'student{n}', cls.classes[n % 2]) for n in range(3)]
+        for n, (student, sub_item) in enumerate((s, i) for s in students for i in cls.sub_items):
+            cls.create_score(student, date(2025, 3, 1 + n % 5), rule_sub_item=sub_item, points=1 + n % 3)
+            if n % 2:
+                cls.create_score(student, date(2025, 3, 2 + n % 4), ScoreType.NEGATIVE, 1 + n % 4,
+                                 rule_sub_item=sub_item)
+
+    def summary(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def raw_groups(self, key, scores=None):
+        """
+        Counters per key(score), summed directly over BehaviorScore rows
+        """
+        groups = {}
+        for score in scores if scores is not None else BehaviorScore.objects.select_related('rule_sub_item__dimension'):
+            group = groups.setdefault(key(score), {'positive_count': 0, 'negative_count': 0,
+                                                   'positive_points': 0, 'negative_points': 0})
+            group[f'{score.score_type}_count'] += 1
+            group[f'{score.score_type}_points'] += score.points
+        for group in groups.values():
+            group['net_points'] = group['positive_points'] - group['negative_points']
+        return groups
+
+    def groups_by_id(self, data):
+        return {group['id']: {field: value for field, value in group.items() if field not in ('id', 'name')}
+                for group in data['groups']}
+
+    def test_totals_match_raw_scores(self):
+        data = self.summary()
+        raw = self.raw_groups(lambda score: None)[None]
+        self.assertEqual(
+            (data['total_positive_points'], data['total_negative_points'], data['net_score'], data['total_records']),
+            (raw['positive_points'], raw['negative_points'], raw['net_points'],
+             raw['positive_count'] + raw['negative_count'])
+        )
+
+        filtered = self.summary(class_id=self.classes[0].id, start_date='2025-03-02', end_date='2025-03-04')
+        scores = BehaviorScore.objects.filter(school_class=self.classes[0],
+                                              date_of_behavior__range=(date(2025, 3, 2), date(2025, 3, 4)))
+        self.assertEqual(filtered['net_score'], self.raw_groups(lambda score: None, scores)[None]['net_points'])
+
+    def test_each_group_by_level_matches_raw_scores(self):
+        levels = {
+            'chapter': lambda score: score.rule_sub_item.dimension.chapter_id,
+            'dimension': lambda score: score.rule_sub_item.dimension_id,
+            'sub_item': lambda score: score.rule_sub_item_id,
+        }
+        for level, key in levels.items():
+            with self.subTest(level=level):
+                data = self.summary(group_by=level)
+                self.assertEqual(data['group_by'], level)
+                self.assertEqual(self.groups_by_id(data), self.raw_groups(key))
+
+        sub_items = self.summary(group_by='sub_item', student_id=self.create_student('idle').id)
+        self.assertEqual((sub_items['groups'], sub_items['total_records']), ([], 0))
+        self.assertEqual(self.client.get(self.url, {'group_by': 'term'}).status_code, 400)
+
+    def test_same_named_dimensions_in_different_chapters(self):
+        data = self.summary(group_by='dimension')
+        greetings = [group for group in data['groups'] if group['name'] == 'Greetings']
+        self.assertEqual(len(greetings), 2)
+        self.assertEqual(len({group['id'] for group in greetings}), 2)
+        # dimension_scores is keyed by name, so the two Greetings dimensions share one entry
+        self.assertEqual(data['dimension_scores']['Greetings'], sum(group['net_points'] for group in greetings))
+        self.assertEqual(set(data['dimension_scores']), {'Greetings', 'Crossing'})
+
+
+class BulkScoringTests(SchoolTestCase):
+    """
+    /behavior-scores/bulk/ validates the whole batch before writing any of it,
+    reports a result per record, keeps the rollup and change log current for its
+    single bulk INSERT, and costs the same number of queries for any batch size.
+    """
+    url = '/api/behavior-scores/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.school_class = cls.create_class()
+        cls.students = [cls.create_student(f'student{n}', cls.school_class) for n in range(7)]
+
+    def post(self, records, **defaults):
+        return self.client.post(self.url, {'date_of_behavior': '2025-03-03', **defaults, 'scores': records},
+                                format='json')
+
+    def record(self, student, **fields):
+        return {'student': student.id, 'rule_sub_item': self.sub_item.id, **fields}
+
+    def test_one_invalid_record_writes_nothing(self):
+        response = self.post([self.record(self.students[0]), self.record(self.students[1], points='many'),
+                              {'student': 999, 'rule_sub_item': self.sub_item.id}])
+        self.assertEqual((response.status_code, response.data['created']), (400, 0))
+        self.assertEqual([(result['index'], result['status']) for result in response.data['results']],
+                         [(0, 'valid'), (1, 'error'), (2, 'error')])
+        self.assertIn('points', response.data['results'][1]['errors'])
+        self.assertEqual(response.data['results'][2]['errors'], {'student': ['Student with ID 999 not found.']})
+        self.assertFalse(BehaviorScore.objects.exists())
+        self.assertFalse(StudentDailyScore.objects.exists())
+        self.assertFalse(BehaviorScoreChange.objects.exists())
+
+    def test_created_scores_are_rolled_up_and_logged(self):
+        response = self.post([self.record(self.students[0], points=2),
+                              self.record(self.students[0], score_type='negative'),
+                              self.record(self.students[1], date_of_behavior='2025-03-04')])
+        self.assertEqual((response.status_code, response.data['created']), (201, 3))
+        ids = [result['id'] for result in response.data['results']]
+        self.assertEqual([result['status'] for result in response.data['results']], ['created'] * 3)
+        self.assertEqual(sorted(ids), sorted(BehaviorScore.objects.values_list('id', flat=True)))
+        self.assertEqual(BehaviorScore.objects.get(id=ids[2]).school_class_id, self.school_class.id)
+
+        self.assertEqual(sorted(StudentDailyScore.objects.values_list(
+            'student_id', 'date', 'positive_count', 'negative_count', 'positive_points', 'negative_points')), [
+            (self.students[0].id, date(2025, 3, 3), 1, 1, 2, 1),
+            (self.students[1].id, date(2025, 3, 4), 1, 0, 1, 0),
+        ])
+        self.assertEqual(verify_rollup(), [])
+        self.assertEqual(sorted(BehaviorScoreChange.objects.filter(deleted=False).values_list('score_id', flat=True)),
+                         sorted(ids))
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def count_queries(students, day):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post([self.record(student) for student in students], date_of_behavior=day)
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        # Fresh students and days, so both batches insert every rollup row rather than updating some
+        self.post([self.record(self.students[6])])  # Load the rule tree snapshot
+        self.assertEqual(count_queries(self.students[:2], '2024-03-05'), count_queries(self.students[2:6], '2023-03-07'))
+
+
+class ScoreExportTests(SchoolTestCase):
+    """
+    The score CSV export streams one joined query, so its query count does not
+    grow with the rows exported, and it honours the list filters.
+    """
+    url = '/api/behavior-scores/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('A', 'B')]
+        cls.students = [cls.create_student(f'student{n}', cls.classes[n % 2]) for n in range(4)]
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode().splitlines()[1:]
+
+    def add_scores(self, count, day=date(2025, 3, 3)):
+        for n in range(count):
+            self.create_score(self.students[n % 4], day)
+
+    def test_constant_queries(self):
+        self.add_scores(4)
+        self.export()  # Load the rule tree snapshot
+        # The rule tree version check plus the joined export query
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.export()), 4)
+        self.add_scores(4)
+        with self.assertNumQueries(2):
+            rows = self.export()
+        self.assertEqual(len(rows), 8)
+        self.assertIn(f'{self.students[1].id},,2025-03-03,Courtesy,Greetings,-,Positive,1,,,B', rows)
+
+    def test_date_and_class_filters(self):
+        self.add_scores(4, date(2025, 3, 1))
+        self.add_scores(4, date(2025, 3, 10))
+        rows = self.export(start_date='2025-03-05', class_id=self.classes[0].id)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row.split(',')[2] for row in rows}, {'2025-03-10'})
+        self.assertEqual({row.split(',')[-1] for row in rows}, {'A'})
+        self.assertEqual(len(self.export(end_date='2025-03-01', student_id=self.students[0].id)), 1)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    Guard the composite indexes on the scoring tables: every hot filter used by the
+    list views, score summary and reports must be answered by an index search rather
+    than a full table scan.
+    """
+    start = date(2025, 1, 1)
+    end = date(2025, 6, 30)
+    # Bounds for created_at, which is a DateTimeField
+    start_time = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    end_time = datetime(2025, 6, 30, 23, 59, 59, tzinfo=dt_timezone.utc)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexSearch(self, queryset):
+        """
+        Every read of the queryset's table is an index SEARCH; a SCAN, even one using
+        an index, visits the whole table or index
+        """
+        table = queryset.model._meta.db_table
+        plan = self.explain(queryset)
+        scans = [step for step in plan if step.startswith(f'SCAN {table}')]
+        self.assertTrue(plan and not scans, f'{table} is scanned rather than searched:\n' + '\n'.join(plan))
+
+    def assertIndexOrderedTopN(self, queryset):
+        """
+        An unfiltered, sliced queryset walks an index in the requested order and stops
+        at the limit: no full table scan and no sort
+        """
+        table = queryset.model._meta.db_table
+        plan = self.explain(queryset)
+        self.assertTrue(any(step.startswith(f'SCAN {table} USING') and 'INDEX' in step for step in plan),
+                        f'{table} is not read in index order:\n' + '\n'.join(plan))
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', ' '.join(plan))
+
+    def test_behavior_score_filters_use_indexes(self):
+        scores = BehaviorScore.objects.order_by()
+        self.assertIndexSearch(scores.filter(student_id=1, date_of_behavior__range=(self.start, self.end)))
+        self.assertIndexSearch(scores.filter(school_class_id=1, date_of_behavior__range=(self.start, self.end)))
+        self.assertIndexSearch(scores.filter(score_type=ScoreType.POSITIVE, date_of_behavior__gte=self.start))
+        self.assertIndexSearch(scores.filter(date_of_behavior__range=(self.start, self.end)))
+        self.assertIndexSearch(scores.filter(created_at__gte=self.start_time))
+        self.assertIndexSearch(scores.filter(grade_id=1, date_of_behavior__range=(self.start, self.end)))
+        self.assertIndexOrderedTopN(BehaviorScore.objects.order_by('-created_at', '-id')[:50])
+
+    def test_observation_and_self_report_filters_use_indexes(self):
+        for model in (ParentObservation, StudentSelfReport):
+            with self.subTest(model=model.__name__):
+                reports = model.objects.order_by()
+                self.assertIndexSearch(reports.filter(student_id=1, date_of_behavior__gte=self.start))
+                self.assertIndexSearch(reports.filter(status='pending').order_by('-created_at'))
+                self.assertIndexSearch(reports.filter(created_at__gte=self.start_time, created_at__lte=self.end_time))
+
+    def test_award_filters_use_indexes(self):
+        awards = Award.objects.order_by()
+        self.assertIndexSearch(awards.filter(student_id=1, award_date__gte=self.start))
+        self.assertIndexSearch(awards.filter(award_date__range=(self.start, self.end)))
+        self.assertIndexSearch(awards.filter(award_type='star', award_date__gte=self.start))
+        self.assertIndexSearch(awards.filter(grade_id=1, award_date__gte=self.start))
+        self.assertIndexSearch(awards.filter(school_class_id=1, award_date__gte=self.start))
+        self.assertIndexOrderedTopN(Award.objects.order_by('-award_date', '-level', '-id')[:50])
+
+    def test_notification_inbox_uses_index(self):
+        inbox = Notification.objects.filter(user_id=1).order_by('-created_at', '-id')[:50]
+        self.assertIndexSearch(inbox)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', ' '.join(self.explain(inbox)))
+
+
+class CursorPaginationTests(SchoolTestCase):
+    """
+    The cursor-paginated lists walk every row exactly once, in order, including
+    orderings whose leading field is shared by many rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = cls.create_student('student', cls.create_class())
+        for points in (1, 1, 1, 2, 1, 1, 3, 1):
+            cls.create_score(cls.student, points=points)
+        for level in (1, 2, 1, 1, 2):
+            Award.objects.create(student=cls.student, name='Helper', award_date=date(2025, 3, 3), level=level)
+
+    def walk(self, url, params):
+        ids, pages = [], []
+        response = self.client.get(url, {**params, 'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response)
+            ids += [row['id'] for row in response.data['results']]
+            if response.data['next'] is None:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_tied_leading_field_pages_through_every_row(self):
+        # Six scores share points=1; an offset-based cursor capped below that would stall
+        with mock.patch.object(CreatedAtCursorPagination, 'offset_cutoff', 2):
+            ids, pages = self.walk('/api/behavior-scores/', {'ordering': 'points'})
+        expected = list(BehaviorScore.objects.order_by('points', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+
+        # previous returns the page before, in the same order
+        previous = self.client.get(pages[2].data['previous'])
+        self.assertEqual(previous.data['results'], pages[1].data['results'])
+        self.assertIsNotNone(previous.data['next'])
+
+    def test_awards_on_one_date_page_by_level(self):
+        ids, _ = self.walk('/api/awards/', {})
+        expected = list(Award.objects.order_by('-award_date', '-level', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_invalid_position_rejected(self):
+        for position in (b'p=nonsense', b'p=%5B%221%22%5D', b'p=%5B%22x%22%2C%221%22%5D'):
+            with self.subTest(position=position):
+                cursor = base64.b64encode(position).decode()
+                self.assertEqual(self.client.get('/api/behavior-scores/', {'cursor': cursor}).status_code, 404)
+
+    def test_unread_notification_count(self):
+        for is_read in (False, False, True):
+            Notification.objects.create(user=self.admin, title='Note', message='-', is_read=is_read)
+        Notification.objects.create(user=self.student, title='Note', message='-')
+        response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.data, {'count': 2})
+
+
+class ScoreListQueryTests(SchoolTestCase):
+    """
+    A page of scores, parent observations or self-reports joins the users and class
+    it names in the page query, so the list costs a fixed number of queries however
+    many rows it holds.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        reviewer = CustomUser.objects.create_user('reviewer', password='x', role=UserRole.CLASS_TEACHER,
+                                                  first_name='Ms', last_name='Reviewer')
+        for n in range(5):
+            student = cls.create_student(f'student{n}', cls.create_class(f'Class {n}'))
+            parent = CustomUser.objects.create_user(f'parent{n}', password='x', role=UserRole.PARENT)
+            cls.create_score(student)
+            ParentObservation.objects.create(student=student, parent=parent, rule_sub_item=cls.sub_item,
+                                             description='-', date_of_behavior=date(2025, 3, 3),
+                                             reviewed_by=reviewer)
+            StudentSelfReport.objects.create(student=student, rule_sub_item=cls.sub_item, description='-',
+                                             date_of_behavior=date(2025, 3, 3), reviewed_by=reviewer)
+
+    def test_page_costs_fixed_queries(self):
+        self.client.get('/api/behavior-scores/')  # Load the rule tree snapshot
+        # The page itself plus the rule tree version check
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/behavior-scores/', {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual({row['school_class_name'] for row in response.data['results']},
+                         {f'Class {n}' for n in range(5)})
+
+    def test_observation_and_self_report_pages_cost_fixed_queries(self):
+        self.client.get('/api/behavior-scores/')  # Load the rule tree snapshot
+        for url in ('/api/parent-observations/', '/api/student-self-reports/'):
+            with self.subTest(url=url):
+                # The page itself plus the rule tree version check
+                with self.assertNumQueries(2):
+                    response = self.client.get(url, {'page_size': 50})
+                self.assertEqual(len(response.data['results']), 5)
+                self.assertEqual({row['reviewer_name'] for row in response.data['results']}, {'Ms Reviewer'})
+
+
+class ScoreRollupTests(SchoolTestCase):
+    """
+    StudentDailyScore follows every score create, edit and delete, survives
+    concurrent first writes to the same row, and can be verified and rebuilt
+    from raw scores with rebuild_score_rollup.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('A', 'B')]
+        cls.student = cls.create_student('student', cls.classes[0])
+
+    def rollup(self):
+        return sorted(StudentDailyScore.objects.values_list(
+            'school_class_id', 'date', 'positive_count', 'negative_count', 'positive_points', 'negative_points'))
+
+    def test_rollup_follows_score_writes(self):
+        day = date(2025, 3, 3)
+        score = self.create_score(self.student, day, points=2)
+        self.create_score(self.student, day, ScoreType.NEGATIVE, 1)
+        self.assertEqual(self.rollup(), [(self.classes[0].id, day, 1, 1, 2, 1)])
+
+        score.score_type, score.points = ScoreType.NEGATIVE, 3
+        score.save()
+        self.assertEqual(self.rollup(), [(self.classes[0].id, day, 0, 2, 0, 4)])
+
+        score.school_class = self.classes[1]
+        score.save()
+        self.assertEqual(self.rollup(), [(self.classes[0].id, day, 0, 1, 0, 1), (self.classes[1].id, day, 0, 1, 0, 3)])
+
+        score.delete()
+        self.assertEqual(self.rollup(), [(self.classes[0].id, day, 0, 1, 0, 1)])
+        self.assertEqual(verify_rollup(), [])
+
+    def test_rows_follow_sub_item_moving_dimension(self):
+        day = date(2025, 3, 3)
+        moved = RuleSubItem.objects.create(dimension=self.dimension, name='Moved')
+        other_dimension = RuleDimension.objects.create(chapter=self.chapter, name='Listening')
+        self.create_score(self.student, day)
+        score = self.create_score(self.student, day, points=3, rule_sub_item=moved)
+
+        response = self.client.patch(f'/api/rule-subitems/{moved.id}/', {'dimension': other_dimension.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(StudentDailyScore.objects.values_list('dimension_id', 'positive_points')),
+                         sorted([(self.dimension.id, 1), (other_dimension.id, 3)]))
+
+        with self.assertNoLogs('api.score_rollups', 'WARNING'):
+            score.delete()
+        self.assertEqual(self.rollup(), [(self.classes[0].id, day, 1, 0, 1, 0)])
+        # The leaderboards dropped the deleted score's points along with the rollup
+        self.assertEqual(sorted(LeaderboardEntry.objects.values_list('scope', 'period', 'net_points', 'score_count')),
+                         sorted((scope, period, 1, 1) for scope in LeaderboardScope.values
+                                for period in LeaderboardPeriod.values))
+        self.assertEqual(verify_rollup(), [])
+
+    def test_removal_without_row_is_logged(self):
+        score = self.create_score(self.student)
+        # A rollup row stranded under a stale key, as moves used to leave them
+        StudentDailyScore.objects.update(dimension=RuleDimension.objects.create(chapter=self.chapter, name='Old'))
+        rebuild_leaderboards()
+        rebuild_cube()
+        with self.assertLogs('api.score_rollups', 'WARNING') as logs:
+            score.delete()
+        self.assertIn('StudentDailyScore', logs.output[0])
+        # The leaderboards and cube skip the removal with it and still agree with the rollup,
+        # which alone differs from the raw scores until it is rebuilt
+        self.assertEqual([key for key, _, _ in verify_rollup()],
+                         [(self.student.id, self.classes[0].id, self.classes[0].grade_id,
+                           StudentDailyScore.objects.get().dimension_id, date(2025, 3, 3))])
+        self.assertEqual(set(LeaderboardEntry.objects.values_list('net_points', flat=True)), {1})
+
+    def test_concurrent_first_insert_is_merged(self):
+        # Another writer inserted and committed the row just after our lookup missed it
+        StudentDailyScore.objects.create(student=self.student, school_class=self.classes[0],
+                                         grade=self.classes[0].grade, dimension=self.dimension, date=date(2025, 3, 3),
+                                         positive_count=1, positive_points=5)
+        real_select_for_update = StudentDailyScore.objects.select_for_update
+        lookups = []
+
+        def miss_first_lookup(*args, **kwargs):
+            lookups.append(1)
+            return StudentDailyScore.objects.none() if len(lookups) == 1 else real_select_for_update(*args, **kwargs)
+
+        with mock.patch.object(StudentDailyScore.objects, 'select_for_update', side_effect=miss_first_lookup):
+            self.create_score(self.student, date(2025, 3, 3), points=2)
+        # The first INSERT hit the unique key; the retry found the row and added to it
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(self.rollup(), [(self.classes[0].id, date(2025, 3, 3), 2, 0, 7, 0)])
+
+    def test_rebuild_command(self):
+        for day in range(1, 4):
+            self.create_score(self.student, date(2025, 3, day))
+        StudentDailyScore.objects.filter(date=date(2025, 3, 1)).update(positive_points=9)
+        StudentDailyScore.objects.filter(date=date(2025, 3, 2)).delete()
+
+        err = io.StringIO()
+        # Leaderboards and cube built from the damaged rollup mismatch too
+        with self.assertRaisesMessage(CommandError, 'Rollup does not match raw scores'):
+            call_command('rebuild_score_rollup', verify_only=True, stdout=io.StringIO(), stderr=err)
+        self.assertIn('expected (1, 0, 1, 0), found (1, 0, 9, 0)', err.getvalue())
+
+        out = io.StringIO()
+        call_command('rebuild_score_rollup', stdout=out)
+        self.assertIn('Rebuilt rollup with 3 rows', out.getvalue())
+        self.assertEqual(verify_rollup(), [])
+
+
+class LeaderboardTests(SchoolTestCase):
+    """
+    Leaderboard entries follow every score create, edit and delete, rank students
+    with shared ranks for ties, and bucket scores by week, month and school term.
+    """
+    url = '/api/reports/leaderboard/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.school_class = cls.create_class()
+        cls.students = [cls.create_student(f'student{i}', cls.school_class) for i in range(3)]
+
+    def entries(self, period=LeaderboardPeriod.WEEK, scope=LeaderboardScope.CLASS):
+        # The scores in these tests all belong to one student
+        return dict(LeaderboardEntry.objects.filter(scope=scope, period=period)
+                    .values_list('period_start', 'net_points'))
+
+    def board(self, **params):
+        return self.client.get(self.url, {'scope_id': self.school_class.id, 'date': '2025-03-05', **params})
+
+    def test_entries_follow_score_writes(self):
+        student = self.students[0]
+        score = self.create_score(student, date(2025, 3, 5), points=3)
+        self.create_score(student, date(2025, 3, 6), ScoreType.NEGATIVE, 1)
+        for scope in LeaderboardScope.values:
+            self.assertEqual(self.entries(scope=scope), {date(2025, 3, 3): 2})
+        self.assertEqual(self.entries(LeaderboardPeriod.MONTH), {date(2025, 3, 1): 2})
+
+        score.points = 5
+        score.save()
+        self.assertEqual(self.entries(), {date(2025, 3, 3): 4})
+
+        # Moving the score to the next week splits it across two weekly entries
+        score.date_of_behavior = date(2025, 3, 10)
+        score.save()
+        self.assertEqual(self.entries(), {date(2025, 3, 3): -1, date(2025, 3, 10): 5})
+        self.assertEqual(self.entries(LeaderboardPeriod.MONTH), {date(2025, 3, 1): 4})
+
+        score.delete()
+        self.assertEqual(self.entries(), {date(2025, 3, 3): -1})
+        self.assertEqual(verify_rollup(), [])
+
+    def test_ranks_share_ties(self):
+        for student, points in zip(self.students, (5, 5, 2)):
+            self.create_score(student, date(2025, 3, 5), points=points)
+        data = self.board(student_id=self.students[2].id).data
+        self.assertEqual([(row['rank'], row['net_points']) for row in data['top']], [(1, 5), (1, 5), (3, 2)])
+        self.assertEqual([row['student_id'] for row in data['top'][:2]], [self.students[0].id, self.students[1].id])
+        self.assertEqual((data['participants'], data['student']['rank']), (3, 3))
+
+        self.assertEqual(self.board(limit=1).data['top'][0]['student_id'], self.students[0].id)
+        self.assertEqual(self.board(period='month', date='2025-04-01').data['top'], [])
+        unranked = self.board(date='2025-04-01', student_id=self.students[0].id).data['student']
+        self.assertEqual((unranked['rank'], unranked['score_count']), (None, 0))
+
+    def test_rejects_invalid_parameters(self):
+        self.assertEqual(self.board(student_id='abc').status_code, 400)
+        self.assertEqual(self.board(scope_id='x').status_code, 400)
+        self.assertEqual(self.board(period='year').status_code, 400)
+
+    def test_period_boundaries(self):
+        for period, day, start, end in (
+            (LeaderboardPeriod.WEEK, date(2025, 3, 9), date(2025, 3, 3), date(2025, 3, 9)),
+            (LeaderboardPeriod.WEEK, date(2025, 3, 10), date(2025, 3, 10), date(2025, 3, 16)),
+            (LeaderboardPeriod.WEEK, date(2025, 1, 1), date(2024, 12, 30), date(2025, 1, 5)),
+            (LeaderboardPeriod.MONTH, date(2024, 2, 29), date(2024, 2, 1), date(2024, 2, 29)),
+            (LeaderboardPeriod.MONTH, date(2025, 12, 31), date(2025, 12, 1), date(2025, 12, 31)),
+            # Terms start in February and September (SCHOOL_TERM_START_MONTHS)
+            (LeaderboardPeriod.TERM, date(2025, 1, 31), date(2024, 9, 1), date(2025, 1, 31)),
+            (LeaderboardPeriod.TERM, date(2025, 2, 1), date(2025, 2, 1), date(2025, 8, 31)),
+            (LeaderboardPeriod.TERM, date(2025, 9, 1), date(2025, 9, 1), date(2026, 1, 31)),
+        ):
+            with self.subTest(period=period, day=day):
+                self.assertEqual(period_start(period, day), start)
+                self.assertEqual(period_end(period, start), end)
+
+        self.create_score(self.students[0], date(2025, 1, 31))
+        self.create_score(self.students[0], date(2025, 2, 1))
+        self.assertEqual(self.entries(LeaderboardPeriod.TERM), {date(2024, 9, 1): 1, date(2025, 2, 1): 1})
+
+
+class RuleTreeCacheTests(TestCase):
+    """
+    Rule names on serialized scores come from the versioned rule tree snapshot,
+    so their cost does not grow with the number of rows, and rule writes made
+    through the API are visible on the next request.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = CustomUser.objects.create_user(
+            'supervisor', password='x', role=UserRole.MORAL_EDUCATION_SUPERVISOR)
+        school_class = SchoolClass.objects.create(name='1A', grade=Grade.objects.create(name='Grade 1'))
+        cls.student = CustomUser.objects.create_user(
+            'student', password='x', role=UserRole.STUDENT, school_class=school_class)
+        chapter = RuleChapter.objects.create(name='Courtesy')
+        dimension = RuleDimension.objects.create(chapter=chapter, name='Greetings')
+        cls.sub_items = [RuleSubItem.objects.create(dimension=dimension, name=f'Rule {i}') for i in range(3)]
+        BehaviorScore.objects.bulk_create(
+            BehaviorScore(student=cls.student, recorded_by=cls.supervisor, rule_sub_item=sub_item,
+                          school_class=school_class, date_of_behavior=date(2025, 3, day))
+            for day in range(1, 11) for sub_item in cls.sub_items
+        )
+
+    def serialize(self, scores):
+        return BehaviorScoreSerializer(scores, many=True).data
+
+    def test_rule_names_cost_constant_queries(self):
+        scores = list(BehaviorScore.objects.select_related('student', 'recorded_by', 'school_class'))
+        self.serialize(scores[:1])
+        with self.assertNumQueries(1):
+            data = self.serialize(scores)
+        self.assertEqual(len(data), 30)
+        self.assertEqual(
+            {(row['chapter_name'], row['dimension_name'], row['rule_name']) for row in data},
+            {('Courtesy', 'Greetings', sub_item.name) for sub_item in self.sub_items}
+        )
+
+    def test_rule_write_invalidates_snapshot(self):
+        client = APIClient()
+        client.force_authenticate(self.supervisor)
+        sub_item = self.sub_items[0]
+        response = client.patch(f'/api/rule-subitems/{sub_item.id}/', {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = self.serialize(BehaviorScore.objects.filter(rule_sub_item=sub_item))
+        self.assertEqual({row['rule_name'] for row in data}, {'Renamed'})
+
+    def test_nested_rule_listing(self):
+        client = APIClient()
+        client.force_authenticate(self.supervisor)
+        response = client.get('/api/rule-chapters/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data[0]['dimensions'][0]['sub_items']), 3)
+        response = client.get('/api/rule-dimensions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data[0]['sub_items']], ['Rule 0', 'Rule 1', 'Rule 2'])
+
+
+class ScoreChangesSyncTests(SchoolTestCase):
+    """
+    /behavior-scores/changes/ returns only what changed since a cursor, including
+    tombstones for deletions, and answers 304 when the client's ETag still matches.
+    Writes that move scores out of a user's scope send their cursors back to a
+    full resync, since no tombstone reaches the users who lost sight of them.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('A', 'B')]
+        cls.student = cls.create_student('student', cls.classes[0])
+        cls.scores = [cls.create_score(cls.student, date(2025, 3, day)) for day in range(1, 4)]
+        cls.class_teacher = CustomUser.objects.create_user('class_teacher', password='x', role=UserRole.CLASS_TEACHER)
+        cls.classes[0].class_teachers.add(cls.class_teacher)
+
+    def get_changes(self, params=None, **headers):
+        return self.client.get('/api/behavior-scores/changes/', params or {}, **headers)
+
+    def test_changes_since_cursor(self):
+        initial = self.get_changes()
+        self.assertEqual(len(initial.data['changed']), 3)
+        since = {'since': initial.data['cursor']}
+
+        unchanged = self.get_changes(since)
+        self.assertEqual((unchanged.data['changed'], unchanged.data['deleted'], unchanged.data['reset']),
+                         ([], [], False))
+        self.assertEqual(self.get_changes(since, HTTP_IF_NONE_MATCH=unchanged['ETag']).status_code, 304)
+
+        self.client.patch(f'/api/behavior-scores/{self.scores[0].id}/', {'points': 5}, format='json')
+        self.client.delete(f'/api/behavior-scores/{self.scores[1].id}/')
+        changed = self.get_changes(since, HTTP_IF_NONE_MATCH=unchanged['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([(row['id'], row['points']) for row in changed.data['changed']], [(self.scores[0].id, 5)])
+        self.assertEqual(changed.data['deleted'], [self.scores[1].id])
+
+    def test_rename_changes_etag(self):
+        initial = self.get_changes()
+        self.student.first_name = 'Renamed'
+        self.student.save()
+        self.classes[0].name = 'A2'
+        self.classes[0].save()
+        renamed = self.get_changes(HTTP_IF_NONE_MATCH=initial['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual({(row['student_name'], row['school_class_name']) for row in renamed.data['changed']},
+                         {('Renamed', 'A2')})
+
+    def test_student_leaving_class_resets_teacher_sync(self):
+        self.client.force_authenticate(self.class_teacher)
+        initial = self.get_changes()
+        self.assertEqual(len(initial.data['changed']), 3)
+
+        # The student's scores keep their change rows, which now match only the new class's teachers
+        self.student.school_class = self.classes[1]
+        self.student.save()
+        after_move = self.get_changes({'since': initial.data['cursor']})
+        self.assertEqual((after_move.data['reset'], after_move.data['changed'], after_move.data['deleted']),
+                         (True, [], []))
+        self.assertFalse(self.get_changes({'since': after_move.data['cursor']}).data['reset'])
+
+    def test_score_moved_to_other_class_resets_sync(self):
+        teacher = CustomUser.objects.create_user('teacher', password='x', role=UserRole.TEACHING_TEACHER)
+        teacher.teaching_classes.add(self.classes[0])
+        self.client.force_authenticate(teacher)
+        cursor = self.get_changes().data['cursor']
+
+        self.scores[0].school_class = self.classes[1]
+        self.scores[0].save()
+        moved = self.get_changes({'since': cursor})
+        self.assertTrue(moved.data['reset'])
+        self.assertEqual(sorted(row['id'] for row in moved.data['changed']), [score.id for score in self.scores[1:]])
+
+        # Edits that keep the score in place are ordinary changes
+        self.client.force_authenticate(self.admin)
+        cursor = self.get_changes().data['cursor']
+        self.client.patch(f'/api/behavior-scores/{self.scores[1].id}/', {'points': 2}, format='json')
+        self.assertFalse(self.get_changes({'since': cursor}).data['reset'])
+
+    def test_invalid_cursor_rejected(self):
+        self.assertEqual(self.get_changes({'since': 'not-a-cursor'}).status_code, 400)
+        # Cursors issued before scope versions existed are honoured with a full resync
+        legacy = base64.urlsafe_b64encode(b'bsc1:2').decode().rstrip('=')
+        response = self.get_changes({'since': legacy})
+        self.assertEqual((response.status_code, response.data['reset'], len(response.data['changed'])), (200, True, 3))
+
+
+class OfflineIngestTests(SchoolTestCase):
+    """
+    Offline batches are deduplicated on their idempotency keys, so retrying an
+    upload acknowledges records instead of duplicating them.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = cls.create_student('student', cls.create_class())
+
+    def record(self, key, **fields):
+        return {'idempotency_key': key, 'student': self.student.id, 'rule_sub_item': self.sub_item.id,
+                'date_of_behavior': '2025-03-01', **fields}
+
+    def ingest(self, records):
+        return self.client.post('/api/behavior-scores/ingest/', {'scores': records}, format='json')
+
+    def test_retried_batch_is_deduplicated(self):
+        keys = [str(uuid.uuid4()) for _ in range(3)]
+        first = self.ingest([self.record(key) for key in keys] + [self.record('not-a-uuid')])
+        self.assertEqual((first.data['created'], first.data['error']), (3, 1))
+
+        retry = self.ingest([self.record(keys[0]), self.record(keys[1], points=4), self.record(keys[1], points=5)])
+        self.assertEqual([result['status'] for result in retry.data['results']], ['unchanged', 'duplicate', 'updated'])
+        self.assertEqual(BehaviorScore.objects.count(), 3)
+        self.assertEqual(BehaviorScore.objects.get(idempotency_key=keys[1]).points, 5)
+
+    def test_single_create_retry_returns_original(self):
+        payload = {**self.record(str(uuid.uuid4())), 'school_class': self.student.school_class_id,
+                   'recorded_by': self.admin.id}
+        first = self.client.post('/api/behavior-scores/', payload, format='json')
+        retry = self.client.post('/api/behavior-scores/', payload, format='json')
+        self.assertEqual((first.status_code, retry.status_code), (201, 200))
+        self.assertEqual(first.data['id'], retry.data['id'])
+
+
+class BehaviorTimeSeriesTests(SchoolTestCase):
+    """
+    The behavior time series has one bucket per day, week or month of the range,
+    in order, with zeros where nothing was recorded; layout=columnar carries the
+    same numbers as parallel arrays.
+    """
+    url = '/api/reports/behavior-time-series/'
+    params = {'start_date': '2025-03-01', 'end_date': '2025-03-20'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        student = cls.create_student('student', cls.create_class())
+        cls.create_score(student, date(2025, 3, 3), points=2)
+        cls.create_score(student, date(2025, 3, 5), ScoreType.NEGATIVE, 1)
+        cls.create_score(student, date(2025, 3, 19), points=3)
+
+    def series(self, **params):
+        response = self.client.get(self.url, {**self.params, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_empty_days_are_filled_in_order(self):
+        data = self.series(interval='day')
+        days = [date(2025, 3, 1) + timedelta(days=n) for n in range(20)]
+        self.assertEqual([point['date'] for point in data['positive_series']], [day.isoformat() for day in days])
+        self.assertEqual([point['date'] for point in data['negative_series']], [day.isoformat() for day in days])
+        positive = {point['date']: (point['count'], point['points']) for point in data['positive_series']}
+        self.assertEqual((positive['2025-03-03'], positive['2025-03-19'], positive['2025-03-04']), ((1, 2), (1, 3), (0, 0)))
+        self.assertEqual(sum(point['count'] for point in data['negative_series']), 1)
+
+    def test_empty_weeks_are_filled_in_order(self):
+        data = self.series(interval='week')
+        # Weeks start on Monday, so the range opens in the week of 24 February
+        self.assertEqual([(point['date'], point['count'], point['points']) for point in data['positive_series']], [
+            ('2025-02-24', 0, 0), ('2025-03-03', 1, 2), ('2025-03-10', 0, 0), ('2025-03-17', 1, 3),
+        ])
+        self.assertEqual([point['count'] for point in data['negative_series']], [0, 1, 0, 0])
+
+    def test_columnar_layout_matches_rows(self):
+        for interval in ('day', 'week', 'month'):
+            with self.subTest(interval=interval):
+                rows, columns = self.series(interval=interval), self.series(interval=interval, layout='columnar')
+                self.assertEqual(columns['dates'], [point['date'] for point in rows['positive_series']])
+                for side in ('positive', 'negative'):
+                    self.assertEqual(columns[f'{side}_count'], [point['count'] for point in rows[f'{side}_series']])
+                    self.assertEqual(columns[f'{side}_points'], [point['points'] for point in rows[f'{side}_series']])
+                self.assertEqual((columns['interval'], columns['start_date'], columns['end_date']),
+                                 (interval, '2025-03-01', '2025-03-20'))
+
+
+class UserEngagementReportTests(SchoolTestCase):
+    """
+    The engagement report summarizes each table with one aggregate and one top-N
+    query, so its query count stays fixed as data grows.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('1A', '1B')]
+        for i in range(6):
+            student = cls.create_student(f'student{i}', cls.classes[i % 2])
+            parent = CustomUser.objects.create_user(f'parent{i}', password='x', role=UserRole.PARENT)
+            for status in ('approved', 'rejected', 'pending')[:i % 3 + 1]:
+                ParentObservation.objects.create(student=student, parent=parent, description='-',
+                                                 date_of_behavior=date(2025, 3, 1), status=status)
+                StudentSelfReport.objects.create(student=student, description='-',
+                                                 date_of_behavior=date(2025, 3, 1), status=status)
+            cls.create_score(student, date(2025, 3, 1),
+                             score_type=ScoreType.NEGATIVE if i == 0 else ScoreType.POSITIVE)
+
+    def test_fixed_query_count(self):
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/reports/user-engagement/')
+        parents = response.data['parent_engagement']
+        self.assertEqual((parents['total_observations'], parents['active_parents']), (12, 6))
+        self.assertAlmostEqual(parents['approval_rate'], 0.5)
+        self.assertEqual(parents['top_engaged_parents'][0]['observation_count'], 3)
+        self.assertEqual(response.data['teacher_engagement']['positive_negative_ratio'], 5)
+
+    def test_class_filter(self):
+        response = self.client.get('/api/reports/user-engagement/', {'class_id': self.classes[0].id})
+        self.assertEqual(response.data['student_engagement']['active_students'], 3)
+        self.assertEqual(response.data['teacher_engagement']['total_scores'], 3)
+
+
+class ReportCacheTests(SchoolTestCase):
+    """
+    Cached reports are served until a write overlapping their date range, grade
+    or class evicts them; unrelated writes leave them in place.
+    """
+    url = '/api/reports/behavior-time-series/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('1A', '1B')]
+        cls.student = cls.create_student('student', cls.classes[0])
+
+    def setUp(self):
+        super().setUp()
+        # Let the cache learn its position in the invalidation log
+        report_cache.sync()
+
+    def cache_status(self, **params):
+        return self.client.get(self.url, {'start_date': '2025-03-01', 'end_date': '2025-03-31', **params})['X-Report-Cache']
+
+    def score(self, day):
+        self.create_score(self.student, day)
+
+    def test_overlapping_write_evicts_only_affected_entries(self):
+        self.assertEqual(self.cache_status(), 'miss')
+        self.assertEqual(self.cache_status(class_id=self.classes[1].id), 'miss')
+        self.assertEqual(self.cache_status(), 'hit')
+
+        self.score(date(2025, 3, 15))
+        self.assertEqual(self.cache_status(), 'miss')
+        self.assertEqual(self.cache_status(class_id=self.classes[1].id), 'hit')
+
+    def test_cache_stats_counts_hits_and_misses(self):
+        self.cache_status()
+        self.cache_status()
+        stats = self.client.get('/api/reports/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+
+class ScoreCubeTests(SchoolTestCase):
+    """
+    The cube tracks score writes incrementally and answers /reports/cube/ slices
+    that agree with the raw scores.
+    """
+    url = '/api/reports/cube/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.grades = [Grade.objects.create(name=name) for name in ('Grade 1', 'Grade 2')]
+        cls.classes = [cls.create_class('A', grade) for grade in cls.grades]
+        cls.dimensions = [cls.dimension, RuleDimension.objects.create(chapter=cls.chapter, name='Punctuality')]
+        cls.sub_items = [cls.sub_item, RuleSubItem.objects.create(dimension=cls.dimensions[1], name='-')]
+        for i, school_class in enumerate(cls.classes):
+            student = cls.create_student(f'student{i}', school_class)
+            for day, sub_item, score_type, points in (
+                (date(2025, 3, 3), cls.sub_items[0], ScoreType.POSITIVE, 2),
+                (date(2025, 3, 4), cls.sub_items[1], ScoreType.NEGATIVE, 1),
+                (date(2025, 4, 1), cls.sub_items[0], ScoreType.POSITIVE, 3),
+            ):
+                cls.create_score(student, day, score_type, points, rule_sub_item=sub_item)
+
+    def test_slices(self):
+        response = self.client.get(self.url, {'dimensions': 'grade,month', 'measures': 'net_points,total_count',
+                                              'dimension_id': self.dimensions[0].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['grade_name'], row['month'], row['net_points'], row['total_count']) for row in response.data['rows']],
+            [('Grade 1', '2025-03-01', 2, 1), ('Grade 1', '2025-04-01', 3, 1),
+             ('Grade 2', '2025-03-01', 2, 1), ('Grade 2', '2025-04-01', 3, 1)]
+        )
+
+        total = self.client.get(self.url, {'end_date': '2025-03-31'}).data['rows']
+        self.assertEqual(len(total), 1)
+        self.assertEqual((total[0]['positive_points'], total[0]['negative_points']), (4, 2))
+
+    def test_tracks_writes_and_rebuild(self):
+        BehaviorScore.objects.filter(school_class=self.classes[0], date_of_behavior=date(2025, 4, 1)).delete()
+        rows = self.client.get(self.url, {'dimensions': 'class', 'measures': 'total_count'}).data['rows']
+        self.assertEqual([row['total_count'] for row in rows], [2, 3])
+        self.assertEqual(verify_rollup(), [])
+
+        # A cube damaged out of band is recomputed from the rollup
+        ScoreCube.objects.update(positive_points=0)
+        self.assertNotEqual(verify_rollup(), [])
+        rebuild_cube()
+        self.assertEqual(verify_rollup(), [])
+
+    def test_follows_rule_moves(self):
+        def cube_slice(level):
+            rows = self.client.get(self.url, {'dimensions': level,
+                                              'measures': 'positive_points,negative_points,total_count'}).data['rows']
+            return {row[f'{level}_id']: (row['positive_points'], row['negative_points'], row['total_count'])
+                    for row in rows}
+
+        def summary_slice(level):
+            groups = self.client.get('/api/behavior-scores/summary/', {'group_by': level}).data['groups']
+            return {group['id']: (group['positive_points'], group['negative_points'],
+                                  group['positive_count'] + group['negative_count'])
+                    for group in groups}
+
+        diligence = RuleChapter.objects.create(name='Diligence')
+        response = self.client.patch(f'/api/rule-dimensions/{self.dimensions[1].id}/', {'chapter': diligence.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cube_slice('chapter'), {self.chapter.id: (10, 0, 4), diligence.id: (0, 2, 2)})
+        self.assertEqual(cube_slice('chapter'), summary_slice('chapter'))
+
+        # A sub-item moving dimension takes its cells along, into the new dimension's chapter
+        response = self.client.patch(f'/api/rule-subitems/{self.sub_items[0].id}/',
+                                     {'dimension': self.dimensions[1].id, 'name': 'Waves'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cube_slice('chapter'), {diligence.id: (10, 2, 6)})
+        self.assertEqual(cube_slice('chapter'), summary_slice('chapter'))
+        self.assertEqual(cube_slice('dimension'), summary_slice('dimension'))
+        self.assertEqual(verify_rollup(), [])
+
+    def test_class_grade_change_keeps_score_grades(self):
+        # Scores stay in the grade they were recorded in; later scores land in the new grade
+        self.classes[0].name = 'B'
+        self.classes[0].grade = self.grades[1]
+        self.classes[0].save()
+        student = CustomUser.objects.get(username='student0')
+        self.create_score(student, date(2025, 4, 2), points=4, school_class_id=self.classes[0].id)
+        self.assertEqual(verify_rollup(), [])
+
+        rows = self.client.get(self.url, {'dimensions': 'grade', 'measures': 'positive_points'}).data['rows']
+        self.assertEqual([(row['grade_name'], row['positive_points']) for row in rows],
+                         [('Grade 1', 5), ('Grade 2', 9)])
+        grade_entries = dict(
+            LeaderboardEntry.objects.filter(scope=LeaderboardScope.GRADE, student=student, period=LeaderboardPeriod.TERM)
+            .values_list('scope_id', 'net_points')
+        )
+        self.assertEqual(grade_entries, {self.grades[0].id: 4, self.grades[1].id: 4})
+
+    def test_rejects_bad_dimensions(self):
+        self.assertEqual(self.client.get(self.url, {'dimensions': 'day,week'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'dimensions': 'student'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'measures': 'average'}).status_code, 400)
+
+
+class DimensionHierarchyTests(SchoolTestCase):
+    """
+    dimension_analysis with layout=tree nests chapter, dimension and sub-item
+    subtotals by id, so same-named dimensions in different chapters stay apart.
+    """
+    url = '/api/reports/dimension-analysis/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        student = cls.create_student('student', cls.create_class())
+        cls.chapter.order = 1
+        cls.chapter.save()
+        cls.chapters = [RuleChapter.objects.create(name='Diligence', order=2), cls.chapter]
+        cls.dimensions = [RuleDimension.objects.create(chapter=cls.chapters[0], name='Effort'), cls.dimension]
+        cls.dimension.name = 'Effort'
+        cls.dimension.save()
+        cls.sub_items = [RuleSubItem.objects.create(dimension=cls.dimensions[0], name=name, order=order)
+                         for name, order in (('Homework', 2), ('Classwork', 1))]
+        cls.sub_items.append(cls.sub_item)
+        for sub_item, score_type, points in ((cls.sub_items[0], ScoreType.POSITIVE, 3),
+                                             (cls.sub_items[1], ScoreType.NEGATIVE, 1),
+                                             (cls.sub_items[2], ScoreType.POSITIVE, 2)):
+            cls.create_score(student, score_type=score_type, points=points, rule_sub_item=sub_item)
+
+    def test_tree_subtotals(self):
+        get_rule_tree()
+        # The rule tree version check and the one grouped score query
+        with self.assertNumQueries(2):
+            tree = self.client.get(self.url, {'layout': 'tree'}).data
+        self.assertEqual((tree['level'], tree['net_points'], tree['total_records']), ('all', 4, 3))
+
+        courtesy, diligence = tree['children']
+        self.assertEqual((courtesy['id'], courtesy['net_points']), (self.chapters[1].id, 2))
+        self.assertEqual((diligence['id'], diligence['net_points']), (self.chapters[0].id, 2))
+        effort, = diligence['children']
+        self.assertEqual((effort['id'], effort['positive_points'], effort['negative_points']),
+                         (self.dimensions[0].id, 3, 1))
+        self.assertEqual([(item['level'], item['name'], item['net_points']) for item in effort['children']],
+                         [('sub_item', 'Classwork', -1), ('sub_item', 'Homework', 3)])
+        self.assertNotIn('children', effort['children'][0])
+
+        # The flat listing keeps the two "Effort" dimensions apart as well
+        flat = self.client.get(self.url).data
+        self.assertEqual(sorted(row['dimension_id'] for row in flat), sorted(d.id for d in self.dimensions))
+
+
+class ClassSnapshotTests(SchoolTestCase):
+    """
+    Scores keep the grade of the class they were recorded in and awards keep the
+    student's class and grade at award time, so moving students or classes later
+    does not rewrite history and grade filters need no joins.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.grades = [Grade.objects.create(name=name) for name in ('Grade 1', 'Grade 2')]
+        cls.classes = [cls.create_class('A', grade) for grade in cls.grades]
+        cls.student = cls.create_student('student', cls.classes[0])
+
+    def score(self):
+        return self.create_score(self.student, points=2)
+
+    def test_score_grade_follows_recording_class(self):
+        score = self.score()
+        bulk, = BehaviorScore.objects.bulk_create([BehaviorScore(
+            student=self.student, recorded_by=self.admin, rule_sub_item=self.sub_item, school_class=self.classes[1],
+            date_of_behavior=date(2025, 3, 4), score_type=ScoreType.POSITIVE, points=1)])
+        self.assertEqual((score.grade_id, bulk.grade_id), (self.grades[0].id, self.grades[1].id))
+
+        score.school_class = self.classes[1]
+        score.save()
+        self.assertEqual(BehaviorScore.objects.get(id=score.id).grade_id, self.grades[1].id)
+
+    def test_award_keeps_class_at_award_time(self):
+        award = Award.objects.create(student=self.student, name='Helper', award_date=date(2025, 3, 3))
+        self.student.school_class = self.classes[1]
+        self.student.save()
+        award.refresh_from_db()
+        award.save()
+        self.assertEqual((award.school_class_id, award.grade_id), (self.classes[0].id, self.grades[0].id))
+
+        grade_awards = self.client.get('/api/reports/award-analytics/', {'grade_id': self.grades[0].id,
+                                                                     'start_date': '2025-01-01'})
+        self.assertEqual(grade_awards.data['awards_by_type'], [{'award_type': 'star', 'count': 1}])
+        later = Award.objects.create(student=self.student, name='Helper', award_date=date(2025, 4, 1))
+        self.assertEqual(later.grade_id, self.grades[1].id)
+
+    def test_grade_filtered_reports_read_one_table(self):
+        self.score()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/reports/behavior-time-series/', {
+                'grade_id': self.grades[0].id, 'start_date': '2025-03-01', 'end_date': '2025-03-31'})
+        self.assertEqual(sum(row['points'] for row in response.data['positive_series']), 2)
+        self.assertFalse([query['sql'] for query in queries if 'JOIN' in query['sql']])
+
+        self.assertFalse('JOIN' in str(BehaviorScore.objects.filter(grade_id=self.grades[0].id).query))
+
+
+class DistributionReportTests(SchoolTestCase):
+    """
+    /reports/distribution/ summarises per-student net points across a scope,
+    counting students without scores, and places classes and students within it.
+    """
+    url = '/api/reports/distribution/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.classes = [cls.create_class(name) for name in ('A', 'B')]
+        cls.grade = cls.classes[0].grade
+        cls.students = []
+        # Net points 6, 2, -2 and 0 (no scores)
+        for i, (school_class, points) in enumerate(zip(cls.classes * 2, [(3, 3), (2,), (-2,), ()])):
+            student = cls.create_student(f'student{i}', school_class)
+            cls.students.append(student)
+            for value in points:
+                cls.create_score(student, points=abs(value),
+                                 score_type=ScoreType.POSITIVE if value > 0 else ScoreType.NEGATIVE)
+
+    def get(self, **params):
+        return self.client.get(self.url, {'scope_id': self.grade.id, 'start_date': '2025-03-01',
+                                          'end_date': '2025-03-31', **params})
+
+    def test_grade_distribution(self):
+        data = self.get(bins=2, student_id=self.students[0].id).data
+        self.assertEqual((data['count'], data['mean'], data['std'], data['min'], data['max']),
+                         (4, 1.5, 2.958, -2, 6))
+        self.assertEqual(data['percentiles']['p50'], 1.0)
+        self.assertEqual(data['histogram'], {'edges': [-2.0, 2.0, 6.0], 'counts': [2, 2]})
+        self.assertEqual(data['students']['net_points'], [6, 2, -2, 0])
+        self.assertEqual(data['students']['percentile_rank'], [87.5, 62.5, 12.5, 37.5])
+        self.assertEqual(data['student'], {'student_id': self.students[0].id, 'net_points': 6,
+                                           'z_score': 1.5213, 'percentile_rank': 87.5})
+        self.assertEqual([(row['class_name'], row['students'], row['mean']) for row in data['classes']],
+                         [('A', 2, 2.0), ('B', 2, 1.0)])
+
+    def test_class_scope_and_validation(self):
+        data = self.get(scope='class', scope_id=self.classes[1].id).data
+        self.assertEqual(data['students']['net_points'], [2, 0])
+        self.assertEqual(self.get(scope='school').status_code, 400)
+        self.assertEqual(self.get(scope_id='x').status_code, 400)
+        self.assertEqual(self.get(start_date='2024-01-01', end_date='2024-01-31').data['students']['z_score'],
+                         [0.0, 0.0, 0.0, 0.0])
+
+
+class EarlyWarningTests(SchoolTestCase):
+    """
+    The nightly scan flags students whose recent negative scores jump above their
+    own rolling baseline and warns their class teachers once per cooldown.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.school_class = cls.create_class()
+        cls.teacher = CustomUser.objects.create_user('teacher', password='x', role=UserRole.CLASS_TEACHER)
+        cls.school_class.class_teachers.add(cls.teacher)
+        cls.steady, cls.spiking = [cls.create_student(name, cls.school_class) for name in ('steady', 'spiking')]
+        # Both get a negative score every week; the spiking student gets five more this week
+        days = [date(2025, 6, 30) - timedelta(days=7 * week) for week in range(14)]
+        days += [date(2025, 6, 25 + offset) for offset in range(5)]
+        BehaviorScore.objects.bulk_create([
+            BehaviorScore(student=student, recorded_by=cls.admin, rule_sub_item=cls.sub_item,
+                          school_class=cls.school_class, date_of_behavior=day,
+                          score_type=ScoreType.NEGATIVE, points=1)
+            for student, student_days in ((cls.steady, days[:14]), (cls.spiking, days))
+            for day in student_days
+        ])
+        rebuild_rollup()
+
+    def test_flags_spike_and_notifies_once(self):
+        warnings = detect_early_warnings(as_of=date(2025, 6, 30))
+        self.assertEqual([warning['student_id'] for warning in warnings], [self.spiking.id])
+        self.assertEqual((warnings[0]['window_negatives'], warnings[0]['baseline_mean']), (7, 2.0))
+
+        self.assertEqual(send_early_warnings(warnings), 1)
+        self.assertEqual(send_early_warnings(warnings), 0)
+        notification = Notification.objects.get(user=self.teacher)
+        self.assertEqual((notification.related_object_type, notification.related_object_id),
+                         ('student_early_warning', self.spiking.id))
+
+    def test_scan_command(self):
+        out = io.StringIO()
+        call_command('scan_early_warnings', date=date(2025, 6, 30), dry_run=True, stdout=out)
+        self.assertIn('Flagged 1 students', out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('scan_early_warnings', window_days=30, baseline_days=14, stdout=out)
+
+
+class UserImportTests(SchoolTestCase):
+    """
+    The CSV user import validates every row in memory against preloaded users and
+    classes, then writes the valid ones in bulk; dry runs write nothing.
+    """
+    url = '/api/users/import/'
+    header = 'username,email,first_name,last_name,role,school_class,password\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.school_class = cls.create_class()
+        cls.existing = CustomUser.objects.create_user('existing', password='old', role=UserRole.STUDENT)
+
+    def upload(self, lines, **params):
+        upload = io.BytesIO((self.header + ''.join(line + '\n' for line in lines)).encode())
+        upload.name = 'users.csv'
+        query = '&'.join(f'{name}=true' for name, value in params.items() if value)
+        return self.client.post(f'{self.url}?{query}', {'file': upload}, format='multipart')
+
+    def test_import_reports_row_errors(self):
+        lines = [
+            f'new1,new1@example.com,Ann,Lee,student,{self.school_class.id},pw1',
+            f'existing,,Eve,,student,{self.school_class.id},',
+            'new1,,,,student,,pw2',
+            'new2,,,,student,999,pw',
+            'new3,,,,wizard,,pw',
+            'new4,,,,teaching_teacher,,',
+            'new5,not-an-email,,,student,,pw',
+        ]
+        # Users and classes are preloaded once; the writes are one INSERT and one UPDATE,
+        # inside the chunk's savepoint and the import's outer one, followed by one cache
+        # invalidation (a class lookup and an insert) per report source for the moved students
+        # and the sync scope version bump (an UPDATE in its own savepoint)
+        with self.assertNumQueries(17):
+            response = self.upload(lines)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['dry_run']),
+                         (1, 1, False))
+        self.assertEqual([error.split(':')[0] for error in response.data['errors']],
+                         ['Row 3 (User', 'Row 4 (User', 'Row 5 (User', 'Row 6 (User', 'Row 7 (User'])
+        self.assertIn('Duplicate of row 1', response.data['errors'][0])
+
+        created = CustomUser.objects.get(username='new1')
+        self.assertTrue(created.check_password('pw1'))
+        self.assertEqual((created.school_class_id, created.first_name), (self.school_class.id, 'Ann'))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.first_name, self.existing.school_class_id), ('Eve', self.school_class.id))
+        self.assertTrue(self.existing.check_password('old'))
+
+    def test_rejected_row_leaves_username_to_later_rows(self):
+        response = self.upload(['fresh,,,,wizard,,pw', 'fresh,,,,student,,pw', 'fresh,,,,student,,pw2'])
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error.split(':')[0] for error in response.data['errors']], ['Row 1 (User', 'Row 3 (User'])
+        self.assertIn('Duplicate of row 2', response.data['errors'][1])
+        self.assertTrue(CustomUser.objects.get(username='fresh').check_password('pw'))
+
+    def test_class_moves_evict_cached_reports(self):
+        other_class = self.create_class('B')
+        self.create_student('mover', other_class)
+        url = '/api/reports/distribution/'
+        params = {'scope': 'class', 'scope_id': self.school_class.id}
+        report_cache.sync()
+        self.assertEqual(self.client.get(url, params).data['count'], 0)
+        self.assertEqual(self.client.get(url, params)['X-Report-Cache'], 'hit')
+
+        self.upload([f'mover,,,,student,{self.school_class.id},'])
+        response = self.client.get(url, params)
+        self.assertEqual((response['X-Report-Cache'], response.data['count']), ('miss', 1))
+
+    @mock.patch('api.password_hashing.PARALLEL_HASH_MIN_PASSWORDS', 2)
+    def test_passwords_hashed_across_processes(self):
+        hashes = make_passwords(['pw0', 'pw1', 'pw2'], workers=2)
+        self.assertEqual([check_password(f'pw{i}', hashed) for i, hashed in enumerate(hashes)], [True] * 3)
+
+    @mock.patch('api.password_hashing.PARALLEL_HASH_MIN_PASSWORDS', 2)
+    @mock.patch('api.user_import.IMPORT_CHUNK_SIZE', 2)
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_one_hashing_pool_per_import(self):
+        with mock.patch('api.password_hashing.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool_class:
+            response = self.upload([f'pooled{i},,,,student,,pw{i}' for i in range(6)])
+        self.assertEqual((response.status_code, response.data['created']), (200, 6))
+        self.assertEqual(pool_class.call_count, 1)
+        self.assertTrue(CustomUser.objects.get(username='pooled5').check_password('pw5'))
+
+    def test_background_import_reports_progress(self):
+        input_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, input_dir)
+        self.enterContext(mock.patch.object(
+            ReportJob._meta.get_field('input_file'), 'storage', FileSystemStorage(location=input_dir)))
+
+        lines = [f'bulk{i},,,,student,{self.school_class.id},pw' for i in range(5)] + ['bulk0,,,,student,,pw']
+        with mock.patch('api.user_import.IMPORT_CHUNK_SIZE', 2), \
+                mock.patch('api.password_hashing.make_password', side_effect=lambda password: password):
+            response = self.upload(lines, background=True)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(CustomUser.objects.filter(username__startswith='bulk').count(), 0)
+            self.assertEqual(run_pending_jobs(), 1)
+
+        job = self.client.get(f"/api/report-jobs/{response.data['id']}/").data
+        self.assertEqual((job['status'], job['progress']), ('succeeded', 100))
+        self.assertEqual(job['progress_detail'], {'processed': 6, 'created': 5, 'updated': 0, 'errors': 1})
+        result = self.client.get(f"/api/report-jobs/{response.data['id']}/result/").data
+        self.assertEqual((result['created'], result['errors']),
+                         (5, ['Row 6 (User: bulk0): Duplicate of row 1; skipped.']))
+        self.assertEqual(CustomUser.objects.filter(username__startswith='bulk',
+                                                   school_class=self.school_class).count(), 5)
+        # The upload held passwords and is gone once the job ends
+        self.assertEqual([name for _, _, files in os.walk(input_dir) for name in files], [])
+
+    def test_failure_in_later_chunk(self):
+        input_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, input_dir)
+        self.enterContext(mock.patch.object(
+            ReportJob._meta.get_field('input_file'), 'storage', FileSystemStorage(location=input_dir)))
+        self.enterContext(mock.patch('api.user_import.IMPORT_CHUNK_SIZE', 2))
+        self.enterContext(mock.patch('api.password_hashing.make_password', side_effect=lambda password: password))
+        real_import_batch = user_import._import_batch
+
+        def conflict_after_first_chunk(batch, *args):
+            if batch[0][0] > 2:
+                raise IntegrityError('UNIQUE constraint failed: api_customuser.username')
+            return real_import_batch(batch, *args)
+
+        self.enterContext(mock.patch('api.user_import._import_batch', side_effect=conflict_after_first_chunk))
+        lines = [f'bulk{i},,,,student,,pw' for i in range(5)]
+
+        # Synchronous imports are all or nothing
+        response = self.upload(lines)
+        self.assertEqual((response.status_code, response.data['failed_rows']), (409, [3, 4]))
+        self.assertIn('rolled back', response.data['error'])
+        self.assertFalse(CustomUser.objects.filter(username__startswith='bulk').exists())
+
+        # Background imports keep the chunks written before the failure and say so
+        job_id = self.upload(lines, background=True).data['id']
+        run_pending_jobs()
+        job = self.client.get(f"/api/report-jobs/{job_id}/").data
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('rows 1-2 were committed (2 created, 0 updated)', job['error'])
+        self.assertEqual((job['progress_detail']['created'], job['progress_detail']['failed_rows'],
+                          job['progress_detail']['partial']), (2, [3, 4], True))
+        self.assertEqual(CustomUser.objects.filter(username__startswith='bulk').count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload(['new1,,,,student,,pw', 'existing,,Eve,,student,,'], dry_run=True)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['dry_run']),
+                         (1, 1, True))
+        self.assertFalse(CustomUser.objects.filter(username='new1').exists())
+        self.assertEqual(CustomUser.objects.get(username='existing').first_name, '')
+
+
+class UserListingQueryTests(SchoolTestCase):
+    """
+    Listing users prefetches everything UserSerializer nests, so the query count
+    does not grow with the number of users; the CSV export is a single flat query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.teacher = CustomUser.objects.create_user('teacher', password='x', role=UserRole.CLASS_TEACHER)
+
+    def add_family(self, n):
+        school_class = self.create_class(f'Class {n}')
+        school_class.class_teachers.add(self.teacher)
+        self.teacher.teaching_classes.add(school_class)
+        student = self.create_student(f'student{n}', school_class)
+        parent = CustomUser.objects.create_user(f'parent{n}', password='x', role=UserRole.PARENT)
+        StudentParentRelationship.objects.create(student=student, parent=parent)
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+            b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_constant_queries(self):
+        self.add_family(1)
+        list_queries = self.count_queries('/api/users/')
+        export_queries = self.count_queries('/api/users/export/')
+        for n in range(2, 6):
+            self.add_family(n)
+        self.assertEqual(self.count_queries('/api/users/'), list_queries)
+        self.assertEqual(self.count_queries('/api/users/export/'), export_queries)
+        self.assertEqual(export_queries, 1)
+
+        children = {user['username']: user['children'] for user in self.client.get('/api/users/').data}
+        self.assertEqual(children['parent3'][0]['school_class']['name'], 'Class 3')
+
+    def test_export_columns(self):
+        self.add_family(1)
+        response = self.client.get('/api/users/export/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,username,email,first_name,last_name,role,role_display,school_class,'
+                                   'school_class_name,school_class_grade_name,password')
+        student = CustomUser.objects.get(username='student1')
+        self.assertIn(f'{student.id},student1,,,,student,Student,{student.school_class_id},Class 1,Grade 1,',
+                      lines)
+
+
+class RolloverTests(SchoolTestCase):
+    """
+    Whole-class rollovers move every student with one UPDATE, whether the mapping
+    is given or derived from the next grade, and a dry run only counts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Named so that a plain string sort would put Grade 10 before Grade 2
+        cls.grades = [Grade.objects.create(name=f'Grade {n}') for n in (10, 2, 1)]
+        cls.classes = {
+            (grade.name, name): cls.create_class(name, grade)
+            for grade in cls.grades for name in ('A', 'B')
+        }
+        for (grade_name, name), school_class in cls.classes.items():
+            for n in range(2):
+                cls.create_student(f"{grade_name.split()[1]}{name}{n}", school_class)
+
+    def class_of(self, username):
+        return CustomUser.objects.get(username=username).school_class
+
+    def test_auto_next_grade(self):
+        response = self.client.post('/api/users/rollover/', {'auto': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['moved'], 12)
+        self.assertEqual(self.class_of('1A0'), self.classes[('Grade 2', 'A')])
+        self.assertEqual(self.class_of('2B1'), self.classes[('Grade 10', 'B')])
+        self.assertIsNone(self.class_of('10A0'))
+        self.assertEqual([row['source_grade_name'] for row in response.data['classes']],
+                         ['Grade 1', 'Grade 1', 'Grade 2', 'Grade 2', 'Grade 10', 'Grade 10'])
+
+    def test_explicit_mapping_moves_each_student_once(self):
+        a, b = self.classes[('Grade 1', 'A')], self.classes[('Grade 1', 'B')]
+        # Class and count lookups, the UPDATE, one invalidation per report source and the
+        # sync scope version bump
+        with self.assertNumQueries(14):
+            response = self.client.post('/api/users/rollover/', {'mapping': {str(a.id): b.id, str(b.id): a.id}},
+                                        format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['moved'], 4)
+        self.assertEqual(self.class_of('1A0'), b)
+        self.assertEqual(self.class_of('1B0'), a)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.client.post('/api/users/rollover/', {'auto': True, 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual(response.data['moved'], 12)
+        self.assertEqual({row['students'] for row in response.data['classes']}, {2})
+        self.assertEqual(self.class_of('1A0'), self.classes[('Grade 1', 'A')])
+
+    def test_invalid_mappings(self):
+        SchoolClass.objects.create(name='C', grade=self.grades[2])
+        response = self.client.post('/api/users/rollover/', {'auto': True}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("No class named 'C' in Grade 2", response.data['error'])
+        extra = SchoolClass.objects.get(name='C')
+        response = self.client.post('/api/users/rollover/', {'auto': True, 'dry_run': True,
+                                                             'mapping': {str(extra.id): None}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/users/rollover/', {'mapping': {'999999': None}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.class_of('1A0'), self.classes[('Grade 1', 'A')])
+
+
+class ReportJobTests(SchoolTestCase):
+    """
+    Reports and exports submitted as jobs run in the worker as the submitting user,
+    and their stored results can be downloaded repeatedly.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.parent = CustomUser.objects.create_user('parent', password='x', role=UserRole.PARENT)
+        student = cls.create_student('student', cls.create_class('1A'))
+        for day in (1, 2, 3):
+            cls.create_score(student, date(2025, 3, day))
+
+    def setUp(self):
+        super().setUp()
+        result_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, result_dir)
+        self.enterContext(mock.patch.object(
+            ReportJob._meta.get_field('result_file'), 'storage', FileSystemStorage(location=result_dir)))
+
+    def submit(self, target, **params):
+        return self.client.post('/api/report-jobs/', {'target': target, 'params': params}, format='json')
+
+    def test_export_job_result_is_stored(self):
+        job = self.submit('behavior-scores-export', start_date='2025-03-02').data
+        self.assertEqual((job['status'], job['has_result']), ('queued', False))
+        self.assertEqual(self.submit('behavior-scores-export', start_date='2025-03-02').data['id'], job['id'])
+        self.assertEqual(self.client.get(f"/api/report-jobs/{job['id']}/result/").status_code, 409)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(self.client.get(f"/api/report-jobs/{job['id']}/").data['progress'], 100)
+        response = self.client.get(f"/api/report-jobs/{job['id']}/result/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+        self.assertEqual(self.client.get(f"/api/report-jobs/{job['id']}/result/",
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_report_job_result_and_errors(self):
+        report = self.submit('cube', dimensions='class').data
+        broken = self.submit('behavior-time-series', start_date='March').data
+        run_pending_jobs()
+
+        self.assertEqual(self.client.get(f"/api/report-jobs/{report['id']}/result/").data['rows'][0]['total_count'], 3)
+        failed = ReportJob.objects.get(id=broken['id'])
+        self.assertEqual(failed.status, ReportJobStatus.FAILED)
+        self.assertIn('YYYY-MM-DD', failed.error)
+
+    def test_permissions_are_checked_on_submit(self):
+        self.client.force_authenticate(self.parent)
+        self.assertEqual(self.submit('cube').status_code, 403)
+        self.assertEqual(self.submit('no-such-report').status_code, 400)
+
+
+class SyntheticSchoolTests(TestCase):
+    """
+    generate_school_data builds a consistent, seed-determined school that the
+    benchmark suite can run every endpoint against.
+    """
+    options = dict(students=24, class_size=8, grades=2, scores=400, days=30, end_date=date(2025, 6, 30),
+                   batch_size=100, stdout=io.StringIO())
+
+    def score_profile(self, prefix):
+        return sorted(BehaviorScore.objects.filter(student__username__startswith=f'{prefix}_')
+                      .values_list('student__username', 'date_of_behavior', 'score_type', 'points'))
+
+    def test_generation_is_deterministic_and_consistent(self):
+        call_command('generate_school_data', prefix='one', **self.options)
+        call_command('generate_school_data', prefix='two', **self.options)
+
+        one = self.score_profile('one')
+        self.assertEqual(len(one), 400)
+        self.assertEqual([row[1:] for row in one], [row[1:] for row in self.score_profile('two')])
+        self.assertEqual(CustomUser.objects.filter(username__startswith='one_student_',
+                                                   school_class__isnull=False).count(), 24)
+        self.assertEqual(verify_rollup(), [])
+        with self.assertRaises(CommandError):
+            call_command('generate_school_data', prefix='one', **self.options)
+
+    def test_benchmarks_cover_endpoints_and_flag_regressions(self):
+        call_command('generate_school_data', **self.options)
+        admin = CustomUser.objects.get(username='syn_admin_00001')
+        results = run_benchmarks(admin, iterations=1)
+
+        self.assertIn('reports-cube', results)
+        self.assertIn('behavior-score-export-scores', results)
+        self.assertEqual({name for name, result in results.items() if result['status'] != 200}, set())
+        self.assertEqual(compare(results, results), [])
+        fewer = {name: dict(result, queries=result['queries'] - 1) for name, result in results.items()}
+        self.assertIn(('reports-cube', f"queries {results['reports-cube']['queries'] - 1} -> "
+                                       f"{results['reports-cube']['queries']}"), compare(results, fewer))
 
-# Create your tests here.
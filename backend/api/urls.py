@@ -23,6 +23,7 @@ router.register(r'awards', views.AwardViewSet, basename='award')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 # Register the advanced reporting ViewSet
 router.register(r'reports', ReportsViewSet, basename='reports')
+router.register(r'report-jobs', views.ReportJobViewSet, basename='report-job')
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
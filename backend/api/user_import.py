@@ -0,0 +1,246 @@
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import CustomUser, SchoolClass, UserRole
+from .password_hashing import PasswordHasher
+from .report_cache import OBSERVATIONS, SCORES, SELF_REPORTS, invalidate_reports
+from .report_jobs import update_job_progress
+from .score_sync import bump_sync_scope_version
+
+# ReportJob target of background imports (see report_jobs.JOB_HANDLERS)
+USER_IMPORT_TARGET = 'users-import'
+# Columns copied from the CSV onto the user; missing ones are imported as blank
+PROFILE_FIELDS = ('email', 'first_name', 'last_name')
+VALID_ROLES = frozenset(UserRole.values)
+# Rows per chunk: one username lookup, bulk INSERT/UPDATE and transaction each
+IMPORT_CHUNK_SIZE = 500
+
+
+class UserImportError(Exception):
+    """
+    An import that stopped part way. results holds the counts of the chunks written
+    before the failure and failed_rows the (first, last) row numbers of the chunk
+    being read or written when it failed; cause is the underlying error.
+    """
+
+    def __init__(self, cause, results, failed_rows):
+        self.cause = cause
+        self.results = results
+        self.failed_rows = failed_rows
+        first, last = failed_rows
+        if first > 1:
+            committed = (f"rows 1-{first - 1} were committed ({results['created']} created, "
+                         f"{results['updated']} updated)")
+        else:
+            committed = "no rows were committed"
+        super().__init__(f"Import stopped at rows {first}-{last}, {committed}: {cause}")
+
+
+def _row_error(row_num, username, message):
+    if username:
+        return f"Row {row_num} (User: {username}): {message}"
+    return f"Row {row_num}: {message}"
+
+
+def _clean_field(name, value):
+    """
+    Validate one CSV value against the model field (length, email and username
+    rules); returns the cleaned value or raises ValidationError
+    """
+    return CustomUser._meta.get_field(name).clean(value, None)
+
+
+def csv_rows(binary_file):
+    """
+    DictReader over an uploaded CSV, decoded as it is read so the file is never held
+    in memory whole (utf-8-sig drops a leading byte order mark)
+    """
+    return csv.DictReader(io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline=''))
+
+
+def import_user_rows(rows, dry_run=False, chunk_size=None, progress=None):
+    """
+    Create or update users from CSV rows (dicts keyed by the export's column names),
+    matching existing users by username.
+
+    Rows are consumed chunk_size at a time, so any iterable (a streaming csv_rows
+    reader included) works without being loaded whole. For each chunk the existing
+    usernames and referenced class ids are loaded in a couple of queries and every
+    row is validated in memory; the valid rows are then written with
+    bulk_create/bulk_update in one transaction per chunk. Invalid rows are skipped
+    and reported, one message per row. With dry_run nothing is written.
+
+    progress, if given, is called after each chunk with the counters so far.
+    Returns {'created', 'updated', 'errors', 'dry_run'}.
+
+    A database conflict or an undecodable file stops the import with a
+    UserImportError carrying the counts of the chunks already written. Callers
+    wanting all-or-nothing imports run this inside transaction.atomic().
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    results = {'created': 0, 'updated': 0, 'errors': [], 'dry_run': dry_run}
+    # Username -> first row imported for it, across chunks, to report duplicates
+    first_row = {}
+    batch = []
+    processed = 0
+    try:
+        # One hashing pool for the whole import, started by the first chunk that needs it
+        with PasswordHasher() as hash_passwords:
+            for processed, row in enumerate(rows, 1):
+                batch.append((processed, row))
+                if len(batch) == chunk_size:
+                    _import_batch(batch, first_row, results, dry_run, hash_passwords)
+                    batch = []
+                    if progress is not None:
+                        progress(_counters(processed, results))
+            if batch:
+                _import_batch(batch, first_row, results, dry_run, hash_passwords)
+                if progress is not None:
+                    progress(_counters(processed, results))
+    except (IntegrityError, UnicodeDecodeError, csv.Error) as exc:
+        # Rows of the current batch are the ones not yet written
+        first = batch[0][0] if batch else processed + 1
+        raise UserImportError(exc, results, (first, max(first, processed))) from exc
+    return results
+
+
+def _counters(processed, results):
+    return {'processed': processed, 'created': results['created'], 'updated': results['updated'],
+            'errors': len(results['errors'])}
+
+
+def _import_batch(batch, first_row, results, dry_run, hash_passwords):
+    """
+    Validate and write one chunk of (row number, row) pairs, adding to results;
+    hash_passwords is the import's PasswordHasher
+    """
+    errors = results['errors']
+    usernames = {(row.get('username') or '').strip() for _, row in batch} - {''}
+    existing = CustomUser.objects.in_bulk(usernames, field_name='username')
+
+    class_ids = set()
+    for _, row in batch:
+        value = (row.get('school_class') or '').strip()
+        if value.isdigit():
+            class_ids.add(int(value))
+    known_class_ids = set(SchoolClass.objects.filter(id__in=class_ids).order_by().values_list('id', flat=True))
+
+    to_create = []
+    to_update = []
+    # Home classes students leave or join; reports that place students by class are evicted for them
+    moved_class_ids = set()
+    # Whether an existing user changes class or role, and with it whose scores they or others may see
+    scope_changed = False
+    for row_num, row in batch:
+        username = (row.get('username') or '').strip()
+        if not username:
+            errors.append(_row_error(row_num, None, "Missing username."))
+            continue
+        if username in first_row:
+            errors.append(_row_error(row_num, username, f"Duplicate of row {first_row[username]}; skipped."))
+            continue
+
+        role = row.get('role')
+        if role not in VALID_ROLES:
+            errors.append(_row_error(row_num, username,
+                                     f"Invalid or missing role '{role}'. Must be one of {UserRole.values}."))
+            continue
+
+        try:
+            values = {'username': _clean_field('username', username)}
+            for name in PROFILE_FIELDS:
+                values[name] = _clean_field(name, row.get(name) or '')
+        except ValidationError as exc:
+            errors.append(_row_error(row_num, username, f"Invalid value. {'; '.join(exc.messages)}"))
+            continue
+        values['role'] = role
+
+        if role == UserRole.STUDENT:
+            class_value = (row.get('school_class') or '').strip()
+            if not class_value:
+                values['school_class_id'] = None
+            elif not class_value.isdigit():
+                errors.append(_row_error(row_num, username, f"Invalid school_class ID '{class_value}'."))
+                continue
+            elif int(class_value) not in known_class_ids:
+                errors.append(_row_error(row_num, username, f"SchoolClass with ID {class_value} not found."))
+                continue
+            else:
+                values['school_class_id'] = int(class_value)
+
+        password = row.get('password')
+        password = password if password and password.strip() else None
+        user = existing.get(username)
+        if user is None:
+            if password is None:
+                errors.append(_row_error(row_num, username,
+                                         "Password is required for new user and was not provided or was empty."))
+                continue
+            to_create.append((CustomUser(**values), password))
+            moved_class_ids.add(values.get('school_class_id'))
+        else:
+            if user.school_class_id != values.get('school_class_id', user.school_class_id):
+                moved_class_ids.update((user.school_class_id, values['school_class_id']))
+                scope_changed = True
+            scope_changed = scope_changed or user.role != role
+            for name, value in values.items():
+                setattr(user, name, value)
+            to_update.append((user, password))
+        # Only rows that will be written claim the username; a rejected row leaves it to later ones
+        first_row[username] = row_num
+
+    if not dry_run:
+        # Hash every supplied password up front, across processes, before any write
+        with_password = [(user, password) for user, password in to_create + to_update if password is not None]
+        for (user, _), hashed in zip(with_password, hash_passwords(password for _, password in with_password)):
+            user.password = hashed
+        with transaction.atomic():
+            if to_create:
+                CustomUser.objects.bulk_create([user for user, _ in to_create])
+            if to_update:
+                CustomUser.objects.bulk_update([user for user, _ in to_update],
+                                               [*PROFILE_FIELDS, 'role', 'school_class', 'password'])
+            # bulk writes skip save() and its signals
+            moved_class_ids.discard(None)
+            if moved_class_ids:
+                for source in (SCORES, OBSERVATIONS, SELF_REPORTS):
+                    invalidate_reports(source, class_ids=sorted(moved_class_ids))
+            if scope_changed:
+                bump_sync_scope_version()
+
+    results['created'] += len(to_create)
+    results['updated'] += len(to_update)
+
+
+def run_import_job(job):
+    """
+    ReportJob handler for background imports: stream the uploaded CSV from the job's
+    input file, reporting rows processed and bytes read as progress. The upload may
+    hold passwords, so it is deleted as soon as the job ends.
+
+    Chunks commit as they go, so when an import stops part way the job fails with
+    the committed counts and the failing rows kept in its progress_detail.
+    """
+    try:
+        size = job.input_file.size
+        with job.input_file.open('rb') as upload:
+            rows = csv_rows(upload)
+            if not rows.fieldnames:
+                raise ValueError('CSV file is empty or headers are missing.')
+            results = import_user_rows(
+                rows, dry_run=bool(job.params.get('dry_run')),
+                progress=lambda counters: update_job_progress(job, upload.tell() * 100 // max(size, 1), counters)
+            )
+    except UserImportError as exc:
+        # run_job saves the job, keeping these alongside the error
+        job.progress_detail = {**(job.progress_detail or {}), 'created': exc.results['created'],
+                               'updated': exc.results['updated'], 'errors': len(exc.results['errors']),
+                               'failed_rows': list(exc.failed_rows), 'partial': exc.failed_rows[0] > 1}
+        raise
+    finally:
+        job.input_file.delete(save=False)
+    return results
+
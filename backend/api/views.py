@@ -1,26 +1,47 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
 from rest_framework.decorators import api_view, action
 from rest_framework import viewsets, permissions, status, filters # Added filters
 from rest_framework.response import Response
 from .models import (CustomUser, Grade, SchoolClass, RuleChapter, RuleDimension, 
                     RuleSubItem, StudentParentRelationship, BehaviorScore,
                     ParentObservation, StudentSelfReport, Award, UserRole, ScoreType,
-                    Notification, NotificationType) # Added new models
+                    Notification, NotificationType, StudentDailyScore,
+                    BehaviorScoreChange, ReportJob, ReportJobStatus) # Added new models
 from .notification_utils import send_notification # Import notification utility
+from .report_cache import OBSERVATIONS, SCORES, SELF_REPORTS, invalidate_for_scores, invalidate_reports
+from .report_jobs import report_progress, target_view
+from .rollover import RolloverError, next_grade_mapping, rollover_students
+from .rule_tree import get_rule_tree, bump_rule_tree_version
+from .score_rollups import apply_scores, raw_measures, rollup_measures
+from .score_sync import (record_score_changes, encode_sync_cursor, decode_sync_cursor,
+                         bump_sync_scope_version, sync_scope_version)
+from .user_import import USER_IMPORT_TARGET, UserImportError, csv_rows, import_user_rows
 from .serializers import (UserSerializer, GradeSerializer, SchoolClassSerializer, 
                          RuleChapterSerializer, RuleDimensionSerializer, RuleSubItemSerializer,
                          StudentParentRelationshipSerializer, BehaviorScoreSerializer,
                          ParentObservationSerializer, StudentSelfReportSerializer,
-                         AwardSerializer, NotificationSerializer) # Added new serializers
+                         AwardSerializer, NotificationSerializer,
+                         BehaviorScoreBulkItemSerializer, BehaviorScoreIngestItemSerializer,
+                         ReportJobSerializer) # Added new serializers
+from .pagination import CreatedAtCursorPagination, AwardDateCursorPagination
 from .permissions import (IsSystemAdmin, IsMoralEducationSupervisor, IsPrincipal, IsDirector,
                          IsTeachingTeacher, IsClassTeacher, IsParent, IsStudent,
                          CanManageUsers, CanScoreStudents, CanConfigureRules,
                          CanExportReports, CanAdministerClasses) # Added all permission classes
+import copy
 import csv
+import hashlib
 import io
+import json
+import os
+import uuid
 from rest_framework.parsers import MultiPartParser # Added MultiPartParser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, Sum, Q
+from django.db.models.functions import Coalesce
 from datetime import datetime
 
 # Create your views here.
@@ -29,18 +50,35 @@ from datetime import datetime
 # def hello_world(request):
 #     return JsonResponse({"message": "Hello, world from Django!"})
 
+class Echo:
+    """
+    File-like object whose write() hands the value straight back, so csv.writer
+    can format rows one at a time for a StreamingHttpResponse.
+    """
+    def write(self, value):
+        return value
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
-    queryset = CustomUser.objects.all().order_by('id')
+    # Everything UserSerializer nests or walks, so listing runs a fixed number of queries
+    queryset = CustomUser.objects.all().order_by('id').select_related('school_class__grade').prefetch_related(
+        'school_class__class_teachers',
+        Prefetch('teaching_classes', queryset=SchoolClass.objects.select_related('grade')
+                 .prefetch_related('class_teachers')),
+        Prefetch('student_relationships', queryset=StudentParentRelationship.objects
+                 .select_related('student__school_class')),
+        Prefetch('parent_relationships', queryset=StudentParentRelationship.objects.select_related('parent')),
+    )
     serializer_class = UserSerializer
+    EXPORT_CHUNK_SIZE = 2000
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'promote_demote_students']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'promote_demote_students', 'rollover']:
             self.permission_classes = [permissions.IsAuthenticated, IsSystemAdmin]
         elif self.action in ['list', 'retrieve', 'export_users', 'import_users']:
             # Allow any authenticated user to list/retrieve, or restrict to IsSystemAdmin if needed
@@ -57,42 +95,43 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='export')
     def export_users(self, request):
-        response = HttpResponse(
+        """
+        Stream all users as CSV, in the column layout import_users accepts.
+        Reads flat rows straight from the database instead of serializing users.
+        """
+        rows = CustomUser.objects.order_by('id').values_list(
+            'id', 'username', 'email', 'first_name', 'last_name', 'role',
+            'school_class_id', 'school_class__name', 'school_class__grade__name'
+        )
+        role_labels = dict(UserRole.choices)
+        writer = csv.writer(Echo())
+        # Only background jobs report progress, so only they pay for the count
+        total = rows.count() if getattr(request, 'report_job', None) else None
+
+        def generate_rows():
+            yield writer.writerow([
+                'id', 'username', 'email', 'first_name', 'last_name',
+                'role', 'role_display',
+                'school_class', # This is the ID
+                'school_class_name', 'school_class_grade_name',
+                'password' # Kept in the header as a template for imports; never exported
+            ])
+            for done, (user_id, username, email, first_name, last_name, role,
+                       class_id, class_name, grade_name) in enumerate(rows.iterator(chunk_size=self.EXPORT_CHUNK_SIZE)):
+                if total and done % self.EXPORT_CHUNK_SIZE == 0:
+                    report_progress(request, done, total)
+                yield writer.writerow([
+                    user_id, username, email, first_name, last_name,
+                    role, role_labels.get(role, role),
+                    class_id, class_name, grade_name,
+                    ''
+                ])
+
+        return StreamingHttpResponse(
+            generate_rows(),
             content_type='text/csv',
             headers={'Content-Disposition': 'attachment; filename="users.csv"'},
         )
-        users = self.get_queryset() # Use the viewset's queryset
-        serializer = self.get_serializer(users, many=True) # Use the viewset's serializer
-        user_data = serializer.data
-
-        writer = csv.writer(response)
-        # Write header row - use serializer fields, but exclude sensitive/complex ones for CSV
-        # Or define specific fields for export
-        header_fields = [
-            'id', 'username', 'email', 'first_name', 'last_name', 
-            'role', 'role_display', 
-            'school_class', # This is the ID
-            'school_class_name', 'school_class_grade_name',
-            'password' # Added password to header for template, though it won't be exported
-        ]
-        writer.writerow(header_fields)
-
-        for user_item in user_data: # Renamed user to user_item to avoid conflict
-            school_class_details = user_item.get('school_class_details')
-            writer.writerow([
-                user_item.get('id'),
-                user_item.get('username'),
-                user_item.get('email'),
-                user_item.get('first_name'),
-                user_item.get('last_name'),
-                user_item.get('role'),
-                user_item.get('role_display'),
-                user_item.get('school_class'), 
-                school_class_details.get('name') if school_class_details else None,
-                school_class_details.get('grade_name') if school_class_details else None,
-                '' # Placeholder for password column in exported CSV
-            ])
-        return response
 
     @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
     def import_users(self, request):
@@ -100,84 +139,38 @@ class UserViewSet(viewsets.ModelViewSet):
         if not file_obj:
             return Response({'error': 'No file provided.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # ?dry_run=true validates the file and reports what would change without writing
+        dry_run = str(request.query_params.get('dry_run', request.data.get('dry_run', ''))).lower() in ('1', 'true')
+        
+        # ?background=true stores the upload and imports it in a worker; poll the returned
+        # job at /report-jobs/<id>/ for progress and fetch the counts from its result/
+        background = str(request.query_params.get('background', request.data.get('background', ''))).lower()
+        if background in ('1', 'true'):
+            job = ReportJob(target=USER_IMPORT_TARGET, params={'dry_run': dry_run}, requested_by=request.user)
+            job.input_file.save(os.path.basename(file_obj.name or 'users.csv'), file_obj, save=False)
+            job.save()
+            return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
         try:
-            decoded_file = file_obj.read().decode('utf-8-sig') # Use utf-8-sig to handle potential BOM
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
+            # Decoded incrementally from the upload rather than read into memory whole
+            reader = csv_rows(file_obj.file)
             if not reader.fieldnames:
                  return Response({'error': 'CSV file is empty or headers are missing.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        except Exception as e:
+            # All or nothing: the per-chunk transactions become savepoints of this one
+            with transaction.atomic():
+                results = import_user_rows(reader, dry_run=dry_run)
+        except UserImportError as e:
+            if isinstance(e.cause, IntegrityError):
+                message, status_code = 'Import failed and was rolled back', status.HTTP_409_CONFLICT
+            else:
+                message, status_code = 'Error processing file; nothing was imported', status.HTTP_400_BAD_REQUEST
+            first, last = e.failed_rows
+            return Response({'error': f'{message} (rows {first}-{last}): {e.cause}', 'failed_rows': [first, last]},
+                            status=status_code)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Raised reading the header row
             return Response({'error': f'Error processing file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = {'created': 0, 'updated': 0, 'errors': []}
-        valid_roles = dict(CustomUser.ROLE_CHOICES).keys()
-
-        for row_num, row in enumerate(reader, 1):
-            username = row.get('username')
-            if not username:
-                results['errors'].append(f"Row {row_num}: Missing username.")
-                continue
-
-            role_str = row.get('role')
-            if not role_str or role_str not in valid_roles:
-                results['errors'].append(f"Row {row_num} (User: {username}): Invalid or missing role '{role_str}'. Must be one of {list(valid_roles)}.")
-                continue
-            
-            user_data = {
-                'username': username,
-                'email': row.get('email', ''),
-                'first_name': row.get('first_name', ''),
-                'last_name': row.get('last_name', ''),
-                'role': role_str,
-            }
-
-            password = row.get('password')
-            if password and password.strip(): # Only include password if provided and not just whitespace
-                user_data['password'] = password
-            
-            if role_str == CustomUser.UserRole.STUDENT:
-                school_class_id_str = row.get('school_class') # Matches the export field name for class ID
-                if school_class_id_str and school_class_id_str.strip():
-                    try:
-                        class_id = int(school_class_id_str)
-                        if SchoolClass.objects.filter(id=class_id).exists():
-                            user_data['school_class'] = class_id
-                        else:
-                            results['errors'].append(f"Row {row_num} (User: {username}): SchoolClass with ID {school_class_id_str} not found.")
-                            continue
-                    except ValueError:
-                        results['errors'].append(f"Row {row_num} (User: {username}): Invalid school_class ID '{school_class_id_str}'.")
-                        continue
-                else: # school_class_id_str is empty or None for a student
-                    user_data['school_class'] = None 
-            
-            try:
-                user_instance = CustomUser.objects.filter(username=username).first()
-                
-                if user_instance: # Existing user
-                    serializer = UserSerializer(user_instance, data=user_data, partial=True)
-                    if serializer.is_valid():
-                        serializer.save()
-                        results['updated'] += 1
-                    else:
-                        error_detail = "; ".join([f"{k}: {str(v[0])}" for k, v in serializer.errors.items()])
-                        results['errors'].append(f"Row {row_num} (User: {username}): Update failed. {error_detail}")
-                else: # New user
-                    if 'password' not in user_data or not user_data['password']:
-                        results['errors'].append(f"Row {row_num} (User: {username}): Password is required for new user and was not provided or was empty.")
-                        continue
-                    
-                    serializer = UserSerializer(data=user_data)
-                    if serializer.is_valid():
-                        serializer.save()
-                        results['created'] += 1
-                    else:
-                        error_detail = "; ".join([f"{k}: {str(v[0])}" for k, v in serializer.errors.items()])
-                        results['errors'].append(f"Row {row_num} (User: {username}): Create failed. {error_detail}")
-            except Exception as e:
-                results['errors'].append(f"Row {row_num} (User: {username}): Unexpected error. {str(e)}")
-
         if not results['created'] and not results['updated'] and not results['errors']:
             return Response({'message': 'CSV file was empty or contained no data rows.'}, status=status.HTTP_200_OK)
         
@@ -220,7 +213,7 @@ class UserViewSet(viewsets.ModelViewSet):
         # Query for students, filtered by role and optionally by source grade/class
         students_query = CustomUser.objects.filter(
             id__in=student_ids, 
-            role=CustomUser.UserRole.STUDENT
+            role=UserRole.STUDENT
         )
         
         if source_class_id:
@@ -228,37 +221,66 @@ class UserViewSet(viewsets.ModelViewSet):
         elif source_grade_id:
             # If source_grade_id is provided but not source_class_id,
             # filter students by classes that belong to the source grade
-            class_ids = SchoolClass.objects.filter(grade_id=source_grade_id).values_list('id', flat=True)
-            students_query = students_query.filter(school_class_id__in=class_ids)
+            students_query = students_query.filter(school_class__grade_id=source_grade_id)
         
-        # Get the actual students
-        students = list(students_query)
+        # One UPDATE for every matching student; the previous classes are read first
+        # so their cached reports can be invalidated too
+        with transaction.atomic():
+            source_class_ids = set(students_query.order_by().values_list('school_class_id', flat=True).distinct())
+            updated_count = students_query.update(school_class=target_class)
+            if updated_count:
+                for source in (SCORES, OBSERVATIONS, SELF_REPORTS):
+                    invalidate_reports(source, class_ids=sorted((source_class_ids - {None}) | {target_class.id}))
+                # update() skips the save signals; the moved students change class teachers
+                bump_sync_scope_version()
         
-        if not students:
+        if not updated_count:
             return Response({'error': 'No matching students found with the provided criteria.'},
                            status=status.HTTP_404_NOT_FOUND)
         
-        # Update the students' class assignment
-        updated_count = 0
-        errors = []
-        
-        for student in students:
-            student.school_class = target_class
-            try:
-                student.save()
-                updated_count += 1
-            except Exception as e:
-                errors.append(f"Failed to update student {student.username}: {str(e)}")
-        
         results = {
             'success': True,
             'updated_count': updated_count,
-            'errors': errors,
+            'errors': [],
             'message': f'{updated_count} students successfully moved to class {target_class.name} in grade {target_class.grade.name}'
         }
         
         return Response(results, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def rollover(self, request):
+        """
+        Move students of whole classes to new classes at once, e.g. the year-end
+        promotion of the entire school.
+        
+        Expected format:
+        {
+            "mapping": {"12": 18, "18": 24, "30": null},  # Source class ID -> target class ID (null graduates)
+            "auto": false,  # Or true: every home class to the same-named class in the next grade,
+                            # with any "mapping" entries taking precedence
+            "graduate": true,  # With auto: take students of the last grade out of their class
+            "dry_run": false  # Only report how many students each class would move
+        }
+        
+        Every move is applied by one UPDATE in a single transaction.
+        """
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('true', '1')
+        mapping = request.data.get('mapping')
+        try:
+            if str(request.data.get('auto', '')).lower() in ('true', '1'):
+                mapping = next_grade_mapping(
+                    graduate=str(request.data.get('graduate', 'true')).lower() in ('true', '1'),
+                    overrides=mapping if isinstance(mapping, dict) else None
+                )
+            elif not isinstance(mapping, dict) or not mapping:
+                return Response({'error': 'Provide a class mapping or set auto to true.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response(rollover_students(mapping, dry_run=dry_run), status=status.HTTP_200_OK)
+        except (TypeError, ValueError) as exc:
+            # RolloverError, or class IDs that are not integers
+            message = str(exc) if isinstance(exc, RolloverError) else 'Class IDs must be integers.'
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+
 class GradeViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows grades to be viewed or edited.
@@ -344,13 +366,32 @@ class SchoolClassViewSet(viewsets.ModelViewSet):
         else:
             return SchoolClass.objects.none()
 
+class RuleTreeVersionMixin:
+    """
+    Bumps the rule tree version after every write so cached snapshots in all
+    processes are rebuilt on their next lookup. Updates run in one transaction with
+    the rollup and cube rows re-keyed by a sub-item or dimension moving.
+    """
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        bump_rule_tree_version()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+        bump_rule_tree_version()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_rule_tree_version()
+
 # ViewSet for RuleChapter
-class RuleChapterViewSet(viewsets.ModelViewSet):
+class RuleChapterViewSet(RuleTreeVersionMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows rule chapters to be viewed or edited.
     Accessible by Moral Education Supervisors and System Administrators.
     """
-    queryset = RuleChapter.objects.all().prefetch_related('ruledimension_set__rulesubitem_set')
+    queryset = RuleChapter.objects.all().prefetch_related('dimensions__sub_items')
     serializer_class = RuleChapterSerializer
     permission_classes = [permissions.IsAuthenticated, IsMoralEducationSupervisor]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -359,12 +400,12 @@ class RuleChapterViewSet(viewsets.ModelViewSet):
     ordering = ['id']  # Default ordering
 
 # ViewSet for RuleDimension
-class RuleDimensionViewSet(viewsets.ModelViewSet):
+class RuleDimensionViewSet(RuleTreeVersionMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows rule dimensions to be viewed or edited.
     Accessible by Moral Education Supervisors and System Administrators.
     """
-    queryset = RuleDimension.objects.all().prefetch_related('rulesubitem_set')
+    queryset = RuleDimension.objects.all().prefetch_related('sub_items')
     serializer_class = RuleDimensionSerializer
     permission_classes = [permissions.IsAuthenticated, IsMoralEducationSupervisor]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -385,7 +426,7 @@ class RuleDimensionViewSet(viewsets.ModelViewSet):
         return queryset
 
 # ViewSet for RuleSubItem
-class RuleSubItemViewSet(viewsets.ModelViewSet):
+class RuleSubItemViewSet(RuleTreeVersionMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows rule sub-items to be viewed or edited.
     Accessible by Moral Education Supervisors and System Administrators.
@@ -472,17 +513,36 @@ class BehaviorScoreViewSet(viewsets.ModelViewSet):
     """
     API endpoint for behavior scores - allows teachers and administrators to record and retrieve behavior scores
     """
-    queryset = BehaviorScore.objects.all().order_by('-created_at')
+    queryset = BehaviorScore.objects.all().select_related(
+        'student', 'recorded_by', 'school_class', 'rule_sub_item'
+    ).order_by('-created_at')
     serializer_class = BehaviorScoreSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['student__username', 'student__first_name', 'student__last_name', 'comment']
     ordering_fields = ['created_at', 'date_of_behavior', 'points']
 
+    # Rule hierarchy levels supported by score_summary's group_by parameter, mapped to the
+    # column grouped on (chapter and dimension are read from StudentDailyScore, sub_item
+    # from BehaviorScore); names and chapters are resolved from the cached rule tree
+    SUMMARY_GROUP_FIELDS = {
+        'chapter': 'dimension_id',
+        'dimension': 'dimension_id',
+        'sub_item': 'rule_sub_item_id',
+    }
+    # Upper bound on records accepted by a single bulk scoring request
+    BULK_SCORE_LIMIT = 500
+    # Rows fetched per server-side chunk when streaming CSV exports
+    EXPORT_CHUNK_SIZE = 2000
+    # Default and maximum number of changes returned by one delta-sync page
+    SYNC_PAGE_SIZE = 500
+    SYNC_MAX_PAGE_SIZE = 2000
+
     def get_permissions(self):
         """
         Only users with CanScoreStudents permission can access behavior scores.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_create_scores', 'ingest_scores']:
             self.permission_classes = [permissions.IsAuthenticated, CanScoreStudents]
         else:
             self.permission_classes = [permissions.IsAuthenticated]
@@ -496,83 +556,439 @@ class BehaviorScoreViewSet(viewsets.ModelViewSet):
         - Students can see their own scores
         - Parents can see scores for their children
         """
-        queryset = super().get_queryset()
+        return super().get_queryset().filter(self.get_scope_filter())
+    
+    def get_scope_filter(self):
+        """
+        Q object limiting score rows to those the current user may see.
+        Works for both BehaviorScore and StudentDailyScore, which share the
+        student and school_class fields.
+        """
         user = self.request.user
         
         if user.role == UserRole.STUDENT:
             # Students can only see their own scores
-            return queryset.filter(student=user)
+            return Q(student=user)
         
         elif user.role == UserRole.PARENT:
             # Parents can only see scores for their children
             children_ids = user.student_relationships.values_list('student_id', flat=True)
-            return queryset.filter(student_id__in=children_ids)
+            return Q(student_id__in=children_ids)
         
         elif user.role in [UserRole.TEACHING_TEACHER, UserRole.CLASS_TEACHER]:
             # Teachers can see scores for students in their classes
             if user.role == UserRole.CLASS_TEACHER:
                 # Class teachers can see scores for students in their home class
                 class_ids = user.led_classes.values_list('id', flat=True)
-                return queryset.filter(student__school_class_id__in=class_ids)
+                return Q(student__school_class_id__in=class_ids)
             else:
                 # Teaching teachers can see scores for students in their teaching classes
                 class_ids = user.teaching_classes.values_list('id', flat=True)
-                return queryset.filter(school_class_id__in=class_ids)
+                return Q(school_class_id__in=class_ids)
         
         # System admins, principals, directors, moral education supervisors can see all scores
-        return queryset
+        return Q()
+    
+    def create(self, request, *args, **kwargs):
+        """
+        Record a score. A retry carrying an idempotency_key this user already submitted
+        returns the score stored by the first attempt instead of creating a duplicate.
+        """
+        key = request.data.get('idempotency_key') if isinstance(request.data, dict) else None
+        try:
+            key = uuid.UUID(str(key)) if key else None
+        except ValueError:
+            key = None  # Left for the serializer to reject
+        if key:
+            existing = BehaviorScore.objects.filter(idempotency_key=key, recorded_by=request.user).first()
+            if existing is not None:
+                return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
+        return super().create(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         # Set the recorded_by field to the current user
         serializer.save(recorded_by=self.request.user)
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create_scores(self, request):
+        """
+        Record scores for many students in one request.
+        
+        Expected format:
+        {
+            "date_of_behavior": "2025-05-20",  # Optional: default for every record
+            "school_class": 4,                 # Optional: default class, else the student's home class
+            "scores": [
+                {"student": 1, "rule_sub_item": 2, "score_type": "positive", "points": 1, "comment": ""},
+                ...
+            ]
+        }
+        
+        All records are validated against one prefetched set of students, rule sub-items
+        and classes and written with a single bulk INSERT. If any record is invalid nothing
+        is written and the per-record errors are returned.
+        """
+        records = request.data.get('scores') if isinstance(request.data, dict) else request.data
+        if not isinstance(records, list) or not records:
+            return Response({'detail': 'A non-empty "scores" list is required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.BULK_SCORE_LIMIT:
+            return Response({'detail': f'At most {self.BULK_SCORE_LIMIT} scores can be recorded per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        defaults = request.data if isinstance(request.data, dict) else {}
+        results, valid_rows = self._validate_score_records(records, defaults, BehaviorScoreBulkItemSerializer)
+        new_scores = [
+            (index, BehaviorScore(recorded_by=request.user, **attrs))
+            for index, _, attrs in valid_rows
+        ]
+        
+        if len(new_scores) != len(records):
+            return Response({'created': 0, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            created = BehaviorScore.objects.bulk_create([score for _, score in new_scores])
+            # bulk_create skips the save signals, so roll up, log and invalidate explicitly
+            apply_scores(created)
+            record_score_changes(created)
+            invalidate_for_scores(created)
+        
+        for (index, _), score in zip(new_scores, created):
+            results[index] = {'index': index, 'status': 'created', 'id': score.id}
+        
+        return Response({'created': len(created), 'results': results}, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], url_path='ingest')
+    def ingest_scores(self, request):
+        """
+        Accept a queue of scores recorded offline and acknowledge every record.
+        
+        Expected format:
+        {
+            "scores": [
+                {"idempotency_key": "<client uuid>", "student": 1, "rule_sub_item": 2,
+                 "date_of_behavior": "2025-05-20", "score_type": "positive", "points": 1},
+                ...
+            ]
+        }
+        
+        Records are deduplicated on idempotency_key: unknown keys are created, known keys
+        are updated when their content differs and left alone when identical (a retried
+        upload), and repeats of a key within the batch defer to its last occurrence. All
+        valid records are written in one transaction. Invalid records do not block the
+        rest; each result reports created, updated, unchanged, duplicate or error so the
+        client can drop acknowledged records from its queue.
+        """
+        records = request.data.get('scores') if isinstance(request.data, dict) else request.data
+        if not isinstance(records, list) or not records:
+            return Response({'detail': 'A non-empty "scores" list is required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.BULK_SCORE_LIMIT:
+            return Response({'detail': f'At most {self.BULK_SCORE_LIMIT} scores can be ingested per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        results, valid_rows = self._validate_score_records(records, {}, BehaviorScoreIngestItemSerializer)
+        for index, record in enumerate(records):
+            if isinstance(record, dict) and 'idempotency_key' in record:
+                results[index]['idempotency_key'] = str(record['idempotency_key'])
+        
+        # The last occurrence of a key within the batch wins
+        latest = {}
+        for index, row, attrs in valid_rows:
+            key = row['idempotency_key']
+            if key in latest:
+                results[latest[key][0]]['status'] = 'duplicate'
+            latest[key] = (index, attrs)
+        
+        try:
+            with transaction.atomic():
+                existing = (
+                    BehaviorScore.objects.select_for_update()
+                    .filter(idempotency_key__in=latest.keys())
+                    .in_bulk(field_name='idempotency_key')
+                )
+                created, updated, previous = [], [], []
+                for key, (index, attrs) in latest.items():
+                    score = existing.get(key)
+                    if score is None:
+                        created.append((index, BehaviorScore(recorded_by=request.user, idempotency_key=key, **attrs)))
+                    elif score.recorded_by_id != request.user.id:
+                        results[index].update(status='error', errors={
+                            'idempotency_key': ['This key was already used by another user.']
+                        })
+                    elif all(getattr(score, field) == value for field, value in attrs.items()):
+                        results[index].update(status='unchanged', id=score.id)
+                    else:
+                        previous.append(copy.copy(score))
+                        for field, value in attrs.items():
+                            setattr(score, field, value)
+                        updated.append((index, score))
+                
+                new_scores = BehaviorScore.objects.bulk_create([score for _, score in created])
+                if updated:
+                    # Scores keep the grade they were recorded in unless they move to another class
+                    BehaviorScore.assign_grades([
+                        score for _, score in updated if score.school_class_id != score._snapshot_class_id
+                    ])
+                    BehaviorScore.objects.bulk_update(
+                        [score for _, score in updated],
+                        ['student_id', 'rule_sub_item_id', 'school_class_id', 'grade_id', 'score_type',
+                         'points', 'comment', 'date_of_behavior']
+                    )
+                # Bulk writes skip the save signals, so keep the rollup, change log and report cache current here
+                changed = new_scores + [score for _, score in updated]
+                apply_scores(previous, sign=-1)
+                apply_scores(changed)
+                record_score_changes(changed)
+                invalidate_for_scores(previous + changed)
+                # Scores moved to another student or class leave their old viewers' scope
+                if any((old.student_id, old.school_class_id) != (score.student_id, score.school_class_id)
+                       for old, (_, score) in zip(previous, updated)):
+                    bump_sync_scope_version()
+        except IntegrityError:
+            # Another upload inserted one of these keys first; a retry will see it as existing
+            return Response({'detail': 'A concurrent upload recorded some of these scores; retry the batch.'},
+                            status=status.HTTP_409_CONFLICT)
+        
+        for (index, _), score in zip(created, new_scores):
+            results[index].update(status='created', id=score.id)
+        for index, score in updated:
+            results[index].update(status='updated', id=score.id)
+        
+        counts = {state: 0 for state in ('created', 'updated', 'unchanged', 'duplicate', 'error')}
+        for result in results:
+            counts[result['status']] += 1
+        return Response({**counts, 'results': results}, status=status.HTTP_200_OK)
+    
+    def _validate_score_records(self, records, defaults, item_serializer_class):
+        """
+        Validate a batch of score records against one prefetched set of students, rule
+        sub-items and classes. Returns (results, valid_rows): results holds one entry per
+        record, with errors filled in; valid_rows holds (index, validated_data, attrs)
+        where attrs are the BehaviorScore field values for the record.
+        """
+        results = []
+        checked_rows = []
+        for index, record in enumerate(records):
+            if isinstance(record, dict):
+                record = {**{key: defaults[key] for key in ('date_of_behavior', 'school_class') if key in defaults},
+                          **record}
+            serializer = item_serializer_class(data=record)
+            if serializer.is_valid():
+                checked_rows.append((index, serializer.validated_data))
+                results.append({'index': index, 'status': 'valid'})
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+        
+        # Resolve every referenced student, rule sub-item and class with one query each
+        students = CustomUser.objects.filter(
+            id__in={row['student'] for _, row in checked_rows}, role=UserRole.STUDENT
+        ).only('id', 'school_class_id').in_bulk()
+        sub_item_ids = set(
+            RuleSubItem.objects.filter(id__in={row['rule_sub_item'] for _, row in checked_rows})
+            .order_by().values_list('id', flat=True)
+        )
+        class_ids = set(
+            SchoolClass.objects.filter(id__in={row.get('school_class') for _, row in checked_rows} - {None})
+            .order_by().values_list('id', flat=True)
+        )
+        
+        valid_rows = []
+        for index, row in checked_rows:
+            errors = {}
+            student = students.get(row['student'])
+            if student is None:
+                errors['student'] = [f"Student with ID {row['student']} not found."]
+            if row['rule_sub_item'] not in sub_item_ids:
+                errors['rule_sub_item'] = [f"Rule sub-item with ID {row['rule_sub_item']} not found."]
+            if not row.get('date_of_behavior'):
+                errors['date_of_behavior'] = ['This field is required.']
+            
+            school_class_id = row.get('school_class')
+            if school_class_id is None and student is not None:
+                school_class_id = student.school_class_id
+            if school_class_id is None:
+                if student is not None:
+                    errors['school_class'] = ['Student has no home class; school_class is required.']
+            elif school_class_id not in class_ids and (student is None or school_class_id != student.school_class_id):
+                errors['school_class'] = [f"SchoolClass with ID {school_class_id} not found."]
+            
+            if errors:
+                results[index] = {'index': index, 'status': 'error', 'errors': errors}
+                continue
+            
+            valid_rows.append((index, row, {
+                'student_id': row['student'],
+                'rule_sub_item_id': row['rule_sub_item'],
+                'school_class_id': school_class_id,
+                'score_type': row['score_type'],
+                'points': row['points'],
+                'comment': row['comment'],
+                'date_of_behavior': row['date_of_behavior'],
+            }))
+        return results, valid_rows
+    
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Delta sync for behavior scores.
+        
+        GET /behavior-scores/changes/?since=<cursor>&limit=<n>
+        Returns the scores created or edited since the cursor under 'changed' and the
+        ids of deleted scores under 'deleted', plus the cursor to pass next time and
+        whether more changes are waiting. Omitting since returns every visible score.
+        
+        When something has moved scores into or out of scopes since the cursor was
+        issued (a student changing class, new teacher or parent assignments, a score
+        edited onto another student or class), the response sets reset and starts over
+        from the beginning: the client drops its copy and applies the pages as a full
+        sync. Student, recorder, class and rule names are resolved when a page is built,
+        so renames reach scores already synced only through such a full sync.
+        
+        Responses carry a strong ETag over their content; a matching If-None-Match
+        yields 304 Not Modified.
+        """
+        since = request.query_params.get('since')
+        try:
+            scope_version, after = decode_sync_cursor(since) if since else (None, 0)
+        except ValueError:
+            return Response({'detail': 'Invalid since cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = int(request.query_params.get('limit', self.SYNC_PAGE_SIZE))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.SYNC_MAX_PAGE_SIZE))
+        
+        # Read before the changes, so a move racing this request forces one more resync
+        current_scope_version = sync_scope_version()
+        reset = bool(since) and scope_version != current_scope_version
+        if reset:
+            after = 0
+        
+        changes = list(
+            BehaviorScoreChange.objects
+            .filter(self.get_scope_filter(), id__gt=after)
+            .order_by('id')
+            .values_list('id', 'score_id', 'deleted')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        changed_ids = [score_id for _, score_id, deleted in changes if not deleted]
+        scores = (
+            BehaviorScore.objects.filter(id__in=changed_ids)
+            .select_related('student', 'recorded_by', 'school_class')
+            .order_by('id')
+        )
+        serializer = self.get_serializer(scores, many=True)
+        serializer.context['rule_tree'] = get_rule_tree()
+        
+        payload = {
+            'cursor': encode_sync_cursor(current_scope_version, changes[-1][0] if changes else after),
+            'has_more': has_more,
+            'reset': reset,
+            'changed': serializer.data,
+            'deleted': [score_id for _, score_id, deleted in changes if deleted],
+        }
+        # Hashing the content rather than the change ids lets renames of related rows change the tag
+        fingerprint = hashlib.sha256(json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True).encode()).hexdigest()
+        etag = f'"{fingerprint[:32]}"'
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(payload, headers={'ETag': etag})
+    
     @action(detail=False, methods=['get'], url_path='export')
     def export_scores(self, request):
-        """Export behavior scores to CSV"""
+        """
+        Stream behavior scores as CSV.
+        
+        Rows are read from a single joined values() query in server-side chunks and
+        written out as they are produced, so memory stays flat and the query count is
+        constant regardless of how many scores are exported.
+        
+        Optional filters: start_date, end_date, class_id (or school_class),
+        grade_id, student_id (or student)
+        """
         if not CanExportReports().has_permission(request, self):
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
-            
-        response = HttpResponse(
-            content_type='text/csv',
-            headers={'Content-Disposition': 'attachment; filename="behavior_scores.csv"'},
-        )
         
         # Get filtered queryset
         scores = self.get_queryset()
-        writer = csv.writer(response)
         
-        # Write header
-        header_fields = [
-            'Student ID', 'Student Name', 'Date of Behavior', 'Chapter', 
-            'Dimension', 'Rule', 'Score Type', 'Points', 'Comment',
-            'Recorded By', 'Class'
-        ]
-        writer.writerow(header_fields)
-        
-        # Write data rows
-        for score in scores:
-            writer.writerow([
-                score.student.id,
-                f"{score.student.first_name} {score.student.last_name}".strip(),
-                score.date_of_behavior,
-                score.rule_sub_item.dimension.chapter.name,
-                score.rule_sub_item.dimension.name,
-                score.rule_sub_item.name,
-                score.get_score_type_display(),
-                score.points,
-                score.comment,
-                f"{score.recorded_by.first_name} {score.recorded_by.last_name}".strip(),
-                score.school_class.name
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        class_id = request.query_params.get('class_id') or request.query_params.get('school_class')
+        grade_id = request.query_params.get('grade_id')
+        student_id = request.query_params.get('student_id') or request.query_params.get('student')
+        
+        if start_date:
+            scores = scores.filter(date_of_behavior__gte=start_date)
+        if end_date:
+            scores = scores.filter(date_of_behavior__lte=end_date)
+        if class_id:
+            scores = scores.filter(school_class_id=class_id)
+        if grade_id:
+            scores = scores.filter(grade_id=grade_id)
+        if student_id:
+            scores = scores.filter(student_id=student_id)
+        
+        rows = scores.values_list(
+            'student_id', 'student__first_name', 'student__last_name', 'date_of_behavior',
+            'rule_sub_item_id', 'score_type', 'points', 'comment',
+            'recorded_by__first_name', 'recorded_by__last_name', 'school_class__name'
+        ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        
+        rule_tree = get_rule_tree()
+        score_type_labels = dict(ScoreType.choices)
+        writer = csv.writer(Echo())
+        # Only background jobs report progress, so only they pay for the count
+        total = scores.count() if getattr(request, 'report_job', None) else None
+        
+        def generate_rows():
+            # Write header
+            yield writer.writerow([
+                'Student ID', 'Student Name', 'Date of Behavior', 'Chapter', 
+                'Dimension', 'Rule', 'Score Type', 'Points', 'Comment',
+                'Recorded By', 'Class'
             ])
             
-        return response
+            # Write data rows
+            for done, (student_id, student_first, student_last, date_of_behavior, sub_item_id,
+                       score_type, points, comment, recorder_first, recorder_last, class_name) in enumerate(rows):
+                if total and done % self.EXPORT_CHUNK_SIZE == 0:
+                    report_progress(request, done, total)
+                chapter, dimension, rule = rule_tree.sub_item_names(sub_item_id)
+                yield writer.writerow([
+                    student_id,
+                    f"{student_first} {student_last}".strip(),
+                    date_of_behavior,
+                    chapter,
+                    dimension,
+                    rule,
+                    score_type_labels.get(score_type, score_type),
+                    points,
+                    comment,
+                    f"{recorder_first} {recorder_last}".strip(),
+                    class_name
+                ])
+        
+        return StreamingHttpResponse(
+            generate_rows(),
+            content_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename="behavior_scores.csv"'},
+        )
     
     @action(detail=False, methods=['get'], url_path='summary')
     def score_summary(self, request):
         """
         Generate summary statistics of behavior scores
+        
+        Totals are read from the StudentDailyScore rollup, so the cost scales with
+        students x days rather than with individual score events.
+        Optional group_by=chapter|dimension|sub_item adds a drill-down breakdown
         """
-        queryset = self.get_queryset()
+        daily_scores = StudentDailyScore.objects.filter(self.get_scope_filter())
         
         # Get query parameters for filtering
         student_id = request.query_params.get('student_id')
@@ -581,48 +997,104 @@ class BehaviorScoreViewSet(viewsets.ModelViewSet):
         end_date = request.query_params.get('end_date')
         
         if student_id:
-            queryset = queryset.filter(student_id=student_id)
+            daily_scores = daily_scores.filter(student_id=student_id)
         if class_id:
-            queryset = queryset.filter(school_class_id=class_id)
+            daily_scores = daily_scores.filter(school_class_id=class_id)
         if start_date:
-            queryset = queryset.filter(date_of_behavior__gte=start_date)
+            daily_scores = daily_scores.filter(date__gte=start_date)
         if end_date:
-            queryset = queryset.filter(date_of_behavior__lte=end_date)
+            daily_scores = daily_scores.filter(date__lte=end_date)
         
-        # Calculate summary statistics
-        positive_scores = queryset.filter(score_type=ScoreType.POSITIVE)
-        negative_scores = queryset.filter(score_type=ScoreType.NEGATIVE)
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in self.SUMMARY_GROUP_FIELDS:
+            return Response(
+                {'detail': f'group_by must be one of {list(self.SUMMARY_GROUP_FIELDS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        total_positive_points = sum(score.points for score in positive_scores)
-        total_negative_points = sum(score.points for score in negative_scores)
-        net_score = total_positive_points - total_negative_points
+        # Drop the model ordering so it does not leak into the GROUP BY clauses
+        daily_scores = daily_scores.order_by()
         
-        # Group scores by dimension
+        # Calculate summary statistics in a single aggregate query
+        totals = daily_scores.aggregate(**rollup_measures())
+        
+        # Net points by dimension, keyed by dimension name
+        rule_tree = get_rule_tree()
         dimension_scores = {}
-        for score in queryset:
-            dimension = score.rule_sub_item.dimension.name
-            if dimension not in dimension_scores:
-                dimension_scores[dimension] = 0
-            
-            if score.score_type == ScoreType.POSITIVE:
-                dimension_scores[dimension] += score.points
-            else:
-                dimension_scores[dimension] -= score.points
+        for group in self._grouped_scores(daily_scores, 'dimension', rule_tree):
+            dimension_scores[group['name']] = dimension_scores.get(group['name'], 0) + group['net_points']
         
-        return Response({
-            'total_positive_points': total_positive_points,
-            'total_negative_points': total_negative_points,
-            'net_score': net_score,
-            'total_records': queryset.count(),
+        result = {
+            'total_positive_points': totals['positive_points'],
+            'total_negative_points': totals['negative_points'],
+            'net_score': totals['positive_points'] - totals['negative_points'],
+            'total_records': totals['positive_count'] + totals['negative_count'],
             'dimension_scores': dimension_scores
-        })
+        }
+        
+        # Optional drill-down level, keyed by id so same-named items do not collide
+        if group_by == 'sub_item':
+            # The rollup stops at dimensions, so sub-items are grouped from the raw scores
+            queryset = self.get_queryset().order_by()
+            if student_id:
+                queryset = queryset.filter(student_id=student_id)
+            if class_id:
+                queryset = queryset.filter(school_class_id=class_id)
+            if start_date:
+                queryset = queryset.filter(date_of_behavior__gte=start_date)
+            if end_date:
+                queryset = queryset.filter(date_of_behavior__lte=end_date)
+            result['group_by'] = group_by
+            result['groups'] = self._grouped_scores(queryset, group_by, rule_tree, measures=raw_measures())
+        elif group_by:
+            result['group_by'] = group_by
+            result['groups'] = self._grouped_scores(daily_scores, group_by, rule_tree)
+        
+        return Response(result)
+    
+    def _grouped_scores(self, queryset, level, rule_tree, measures=None):
+        """
+        Aggregate positive/negative counts and points per rule hierarchy level in one query.
+        Rows are grouped on a bare id column and labelled from the rule tree, so no rule
+        tables are joined; chapters are folded together from their dimensions.
+        """
+        id_field = self.SUMMARY_GROUP_FIELDS[level]
+        rows = queryset.values(id_field).annotate(**(measures or rollup_measures())).order_by()
+        
+        if level == 'chapter':
+            lookup = rule_tree.chapter_of_dimension
+        elif level == 'dimension':
+            lookup = rule_tree.dimensions.get
+        else:
+            lookup = rule_tree.sub_items.get
+        
+        groups = {}
+        for row in rows:
+            node = lookup(row[id_field])
+            key = node.id if node else None
+            group = groups.setdefault(key, {
+                'id': key,
+                'name': node.name if node else None,
+                'positive_count': 0,
+                'negative_count': 0,
+                'positive_points': 0,
+                'negative_points': 0,
+            })
+            for field in ('positive_count', 'negative_count', 'positive_points', 'negative_points'):
+                group[field] += row[field]
+        
+        result = sorted(groups.values(), key=lambda group: (group['name'] or '', group['id'] or 0))
+        for group in result:
+            group['net_points'] = group['positive_points'] - group['negative_points']
+        return result
 
 class ParentObservationViewSet(viewsets.ModelViewSet):
     """
     API endpoint for parent observations
     """
-    queryset = ParentObservation.objects.all().order_by('-created_at')
+    queryset = ParentObservation.objects.all().select_related('student', 'parent', 'reviewed_by').order_by('-created_at')
     serializer_class = ParentObservationSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['description', 'student__username', 'student__first_name', 'student__last_name']
     ordering_fields = ['created_at', 'date_of_behavior', 'status']
@@ -716,8 +1188,9 @@ class StudentSelfReportViewSet(viewsets.ModelViewSet):
     """
     API endpoint for student self-reports
     """
-    queryset = StudentSelfReport.objects.all().order_by('-created_at')
+    queryset = StudentSelfReport.objects.all().select_related('student', 'reviewed_by').order_by('-created_at')
     serializer_class = StudentSelfReportSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['description', 'student__username', 'student__first_name', 'student__last_name']
     ordering_fields = ['created_at', 'date_of_behavior', 'status']
@@ -815,6 +1288,7 @@ class AwardViewSet(viewsets.ModelViewSet):
     """
     queryset = Award.objects.all().order_by('-award_date', '-level')
     serializer_class = AwardSerializer
+    pagination_class = AwardDateCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description', 'student__username', 'student__first_name', 'student__last_name']
     ordering_fields = ['award_date', 'level', 'award_type']
@@ -887,6 +1361,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     API endpoint for user notifications
     """
     serializer_class = NotificationSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'message']
     ordering_fields = ['created_at', 'is_read']
@@ -910,8 +1385,92 @@ class NotificationViewSet(viewsets.ModelViewSet):
         notification.save()
         return Response({'status': 'notification marked as read'})
     
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Number of unread notifications, without paging through the inbox"""
+        return Response({'count': self.get_queryset().filter(is_read=False).count()})
+    
     @action(detail=False, methods=['post'], url_path='mark-all-read')
     def mark_all_read(self, request):
         """Mark all notifications as read"""
         self.get_queryset().update(is_read=True)
         return Response({'status': 'all notifications marked as read'})
+
+
+class ReportJobViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for running reports and CSV exports in the background.
+    
+    POST a target (see report_jobs.JOB_TARGETS) with the query params the report
+    would take; the run_report_jobs worker picks it up. Poll the job for status and
+    progress, then download the stored result from result/ as often as needed.
+    """
+    serializer_class = ReportJobSerializer
+    pagination_class = CreatedAtCursorPagination
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    
+    def get_queryset(self):
+        """
+        Users see their own jobs; system administrators see every job
+        """
+        queryset = ReportJob.objects.all()
+        if self.request.user.role != UserRole.SYSTEM_ADMINISTRATOR:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['target']
+        params = dict(sorted(serializer.validated_data.get('params', {}).items()))
+        
+        # Refuse up front what the target action would refuse when the job runs
+        viewset_class, action_name, _ = target_view(target)
+        target_viewset = viewset_class(action=action_name, request=request, format_kwarg=None, args=(), kwargs={})
+        target_viewset.check_permissions(request)
+        
+        # Submitting the same job again while it is pending returns the pending job
+        pending = ReportJob.objects.filter(
+            requested_by=request.user, target=target, params=params,
+            status__in=[ReportJobStatus.QUEUED, ReportJobStatus.RUNNING]
+        ).order_by('id').first()
+        if pending is not None:
+            return Response(self.get_serializer(pending).data, status=status.HTTP_200_OK)
+        
+        job = serializer.save(requested_by=request.user, params=params)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    def destroy(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status == ReportJobStatus.RUNNING:
+            return Response({'detail': 'A running job cannot be deleted.'}, status=status.HTTP_409_CONFLICT)
+        job.result_file.delete(save=False)
+        job.input_file.delete(save=False)
+        job.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        """
+        Download the stored result: JSON for reports, a file for exports.
+        Results never change once stored, so clients can revalidate with If-None-Match.
+        """
+        job = self.get_object()
+        if job.status != ReportJobStatus.SUCCEEDED:
+            return Response({'detail': f'The job is {job.status}; no result is available.',
+                             'status': job.status}, status=status.HTTP_409_CONFLICT)
+        
+        etag = f'"report-job-{job.id}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        if job.result_file:
+            _, _, filename = target_view(job.target)
+            response = FileResponse(job.result_file.open('rb'), as_attachment=True,
+                                    filename=filename or os.path.basename(job.result_file.name))
+        else:
+            response = Response(job.result)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=0'
+        return response
+
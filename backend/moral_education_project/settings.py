@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -80,7 +81,8 @@ WSGI_APPLICATION = 'moral_education_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Point SQLITE_PATH at a scratch file to load synthetic data (generate_school_data)
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -160,5 +162,41 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Default page size for the cursor-paginated list endpoints (see api/pagination.py);
+    # clients may request a different size with ?page_size=
+    'PAGE_SIZE': 50,
 }
+
+# Months in which school terms begin (used for term leaderboards)
+SCHOOL_TERM_START_MONTHS = [2, 9]
+
+# Process-local report result cache (see api/report_cache.py)
+REPORT_CACHE_MAX_ENTRIES = 256
+REPORT_CACHE_TTL_SECONDS = 300
+
+# Background report jobs (see api/report_jobs.py and the run_report_jobs command)
+REPORT_JOB_RESULT_DIR = BASE_DIR / 'report_job_results'
+# Finished jobs and their result files are deleted after this many days
+REPORT_JOB_RETENTION_DAYS = 7
+# A running job that has not reported progress for this long is assumed lost and requeued
+REPORT_JOB_STALE_SECONDS = 900
+REPORT_JOB_MAX_ATTEMPTS = 3
+
+# Nightly early warnings (see api/early_warning.py and the scan_early_warnings command):
+# a student's negative scores over the last WINDOW_DAYS are compared with their rolling
+# WINDOW_DAYS counts over the BASELINE_DAYS before that
+EARLY_WARNING_WINDOW_DAYS = 14
+EARLY_WARNING_BASELINE_DAYS = 84
+# Standard deviations above the baseline mean, and the fewest negative scores, to flag
+EARLY_WARNING_THRESHOLD = 3.0
+EARLY_WARNING_MIN_NEGATIVES = 4
+# A student is not warned about again within this many days
+EARLY_WARNING_COOLDOWN_DAYS = 7
+
+# Processes used to hash passwords during bulk user imports (see api/password_hashing.py);
+# None uses every CPU available to the process
+PASSWORD_HASH_WORKERS = None
+
+# PAGE_SIZE is global while pagination is enabled per view (see api/pagination.py)
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
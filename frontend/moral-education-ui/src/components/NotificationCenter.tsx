@@ -52,9 +52,9 @@ const NotificationCenter: React.FC = () => {
   const fetchNotifications = async () => {
     setIsLoading(true);
     try {
-      const data = await getNotifications();
+      const [data, count] = await Promise.all([getNotifications(), getUnreadNotificationsCount()]);
       setNotifications(data);
-      setUnreadCount(data.filter(n => !n.is_read).length);
+      setUnreadCount(count);
     } catch (error) {
       console.error('Error fetching notifications:', error);
     } finally {
@@ -122,6 +122,7 @@ export interface BehaviorScore {
   comment?: string;
   created_at: string;
   date_of_behavior: string;
+  idempotency_key?: string | null; // Client-generated key; retries with the same key are not duplicated
 }
 
 export interface ParentObservation {
@@ -179,8 +180,45 @@ export interface ScoreSummary {
   net_score: number;
   total_records: number;
   dimension_scores: Record<string, number>;
+  // Present when the summary is requested with group_by=chapter|dimension|sub_item
+  group_by?: 'chapter' | 'dimension' | 'sub_item';
+  groups?: ScoreSummaryGroup[];
 }
 
+export interface ScoreSummaryGroup {
+  id: number;
+  name: string;
+  positive_count: number;
+  negative_count: number;
+  positive_points: number;
+  negative_points: number;
+  net_points: number;
+}
+
+// Cursor-paginated list envelope used by the score, observation, self-report,
+// award and notification list endpoints. Follow `next` to fetch further pages.
+export interface PaginatedResponse<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Largest page the cursor-paginated endpoints serve (max_page_size on the server)
+const MAX_PAGE_SIZE = 500;
+
+// Fetch every page of a cursor-paginated list by following `next` until it is null.
+// The server's `next` links are absolute and carry the filters, so they are requested as-is.
+export const getAllPages = async <T>(url: string, params?: any): Promise<T[]> => {
+  const results: T[] = [];
+  let response = await apiClient.get<PaginatedResponse<T>>(url, { params: { page_size: MAX_PAGE_SIZE, ...params } });
+  results.push(...response.data.results);
+  while (response.data.next) {
+    response = await apiClient.get<PaginatedResponse<T>>(response.data.next);
+    results.push(...response.data.results);
+  }
+  return results;
+};
+
 // Service function to get users
 export const getUsers = async (): Promise<User[]> => {
   try {
@@ -271,16 +309,18 @@ export interface ImportUsersResponse {
   created: number;
   updated: number;
   errors: string[];
+  dry_run?: boolean;
   message?: string; // For cases like empty file
 }
 
-// Function to import users from a file
-export const importUsers = async (file: File): Promise<ImportUsersResponse> => {
+// Function to import users from a file; dryRun validates and counts without saving
+export const importUsers = async (file: File, dryRun = false): Promise<ImportUsersResponse> => {
   try {
     const formData = new FormData();
     formData.append('file', file);
 
     const response = await apiClient.post<ImportUsersResponse>('/users/import/', formData, {
+      params: dryRun ? { dry_run: 'true' } : undefined,
       headers: {
         'Content-Type': 'multipart/form-data',
       },
@@ -518,6 +558,41 @@ export const promoteOrDemoteStudents = async (promotionData: PromotionRequest):
   }
 };
 
+// Whole-class rollover, e.g. year-end promotion; a null target takes students out of their class
+export interface RolloverRequest {
+  mapping?: Record<number, number | null>;
+  auto?: boolean;
+  graduate?: boolean;
+  dry_run?: boolean;
+}
+
+export interface RolloverClassSummary {
+  source_class_id: number;
+  source_class_name: string;
+  source_grade_name: string;
+  target_class_id: number | null;
+  target_class_name: string | null;
+  target_grade_name: string | null;
+  students: number;
+}
+
+export interface RolloverResult {
+  dry_run: boolean;
+  moved: number;
+  classes: RolloverClassSummary[];
+}
+
+// Function to roll whole classes over to new classes (or preview it with dry_run)
+export const rolloverStudents = async (rolloverData: RolloverRequest): Promise<RolloverResult> => {
+  try {
+    const response = await apiClient.post<RolloverResult>('/users/rollover/', rolloverData);
+    return response.data;
+  } catch (error) {
+    console.error('Failed to roll over students:', error);
+    throw error;
+  }
+};
+
 // Function to get student-parent relationships
 export const getStudentParentRelationships = async (): Promise<StudentParentRelationship[]> => {
   try {
@@ -570,8 +645,7 @@ export const assignParentToStudent = async (studentId: number, parentId: number)
 // API functions for behavior scoring
 export const getBehaviorScores = async (params?: any): Promise<BehaviorScore[]> => {
   try {
-    const response = await apiClient.get('/behavior-scores/', { params });
-    return response.data;
+    return await getAllPages<BehaviorScore>('/behavior-scores/', params);
   } catch (error) {
     console.error('Error fetching behavior scores:', error);
     throw error;
@@ -598,6 +672,99 @@ export const createBehaviorScore = async (score: Partial<BehaviorScore>): Promis
   }
 };
 
+export interface BulkBehaviorScoreRequest {
+  date_of_behavior?: string;
+  school_class?: number;
+  scores: Array<Pick<BehaviorScore, 'student' | 'rule_sub_item'> &
+    Partial<Pick<BehaviorScore, 'score_type' | 'points' | 'comment' | 'school_class' | 'date_of_behavior'>>>;
+}
+
+export interface BulkBehaviorScoreResult {
+  index: number;
+  status: 'created' | 'valid' | 'error';
+  id?: number;
+  errors?: Record<string, string[]>;
+}
+
+export interface BulkBehaviorScoreResponse {
+  created: number;
+  results: BulkBehaviorScoreResult[];
+}
+
+export const bulkCreateBehaviorScores = async (payload: BulkBehaviorScoreRequest): Promise<BulkBehaviorScoreResponse> => {
+  try {
+    const response = await apiClient.post('/behavior-scores/bulk/', payload);
+    return response.data;
+  } catch (error) {
+    console.error('Error bulk creating behavior scores:', error);
+    throw error;
+  }
+};
+
+export interface OfflineScoreRecord extends Pick<BehaviorScore, 'student' | 'rule_sub_item' | 'date_of_behavior'>,
+  Partial<Pick<BehaviorScore, 'score_type' | 'points' | 'comment' | 'school_class'>> {
+  idempotency_key: string; // Generated on the device, e.g. crypto.randomUUID()
+}
+
+export interface OfflineScoreAck {
+  index: number;
+  idempotency_key?: string;
+  status: 'created' | 'updated' | 'unchanged' | 'duplicate' | 'error';
+  id?: number;
+  errors?: Record<string, string[]>;
+}
+
+export interface OfflineScoreIngestResponse {
+  created: number;
+  updated: number;
+  unchanged: number;
+  duplicate: number;
+  error: number;
+  results: OfflineScoreAck[];
+}
+
+// Upload scores queued while offline; records acknowledged with any status but 'error' can be dropped
+export const ingestOfflineScores = async (scores: OfflineScoreRecord[]): Promise<OfflineScoreIngestResponse> => {
+  try {
+    const response = await apiClient.post('/behavior-scores/ingest/', { scores });
+    return response.data;
+  } catch (error) {
+    console.error('Error ingesting offline behavior scores:', error);
+    throw error;
+  }
+};
+
+export interface BehaviorScoreChanges {
+  cursor: string;
+  has_more: boolean;
+  // Scores moved out of scope since the cursor: drop the local copy and apply this as a full sync
+  reset: boolean;
+  changed: BehaviorScore[];
+  deleted: number[];
+}
+
+// Delta sync: pass the cursor from the previous call (and its ETag) to fetch only what changed.
+// Resolves to null when the server answers 304 Not Modified.
+export const getBehaviorScoreChanges = async (
+  since?: string,
+  etag?: string
+): Promise<{ data: BehaviorScoreChanges; etag?: string } | null> => {
+  try {
+    const response = await apiClient.get<BehaviorScoreChanges>('/behavior-scores/changes/', {
+      params: since ? { since } : undefined,
+      headers: etag ? { 'If-None-Match': etag } : undefined,
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+    });
+    if (response.status === 304) {
+      return null;
+    }
+    return { data: response.data, etag: response.headers['etag'] };
+  } catch (error) {
+    console.error('Error fetching behavior score changes:', error);
+    throw error;
+  }
+};
+
 export const updateBehaviorScore = async (id: number, score: Partial<BehaviorScore>): Promise<BehaviorScore> => {
   try {
     const response = await apiClient.patch(`/behavior-scores/${id}/`, score);
@@ -643,8 +810,7 @@ export const exportBehaviorScores = async (params?: any): Promise<Blob> => {
 // API functions for parent observations
 export const getParentObservations = async (params?: any): Promise<ParentObservation[]> => {
   try {
-    const response = await apiClient.get('/parent-observations/', { params });
-    return response.data;
+    return await getAllPages<ParentObservation>('/parent-observations/', params);
   } catch (error) {
     console.error('Error fetching parent observations:', error);
     throw error;
@@ -687,8 +853,7 @@ export const reviewParentObservation = async (
 // API functions for student self-reports
 export const getStudentSelfReports = async (params?: any): Promise<StudentSelfReport[]> => {
   try {
-    const response = await apiClient.get('/student-self-reports/', { params });
-    return response.data;
+    return await getAllPages<StudentSelfReport>('/student-self-reports/', params);
   } catch (error) {
     console.error('Error fetching student self-reports:', error);
     throw error;
@@ -731,8 +896,7 @@ export const reviewStudentSelfReport = async (
 // API functions for awards
 export const getAwards = async (params?: any): Promise<Award[]> => {
   try {
-    const response = await apiClient.get('/awards/', { params });
-    return response.data;
+    return await getAllPages<Award>('/awards/', params);
   } catch (error) {
     console.error('Error fetching awards:', error);
     throw error;
@@ -1,4 +1,4 @@
-import apiClient from './apiService';
+import apiClient, { getAllPages } from './apiService';
 
 // Notification Interfaces
 export interface Notification {
@@ -18,8 +18,7 @@ export interface Notification {
 // Notification API Functions
 export const getNotifications = async (params?: any): Promise<Notification[]> => {
   try {
-    const response = await apiClient.get('/notifications/', { params });
-    return response.data;
+    return await getAllPages<Notification>('/notifications/', params);
   } catch (error) {
     console.error('Error fetching notifications:', error);
     throw error;
@@ -28,10 +27,8 @@ export const getNotifications = async (params?: any): Promise<Notification[]> =>
 
 export const getUnreadNotificationsCount = async (): Promise<number> => {
   try {
-    const response = await apiClient.get('/notifications/', { 
-      params: { is_read: false, limit: 100 } 
-    });
-    return response.data.length;
+    const response = await apiClient.get<{ count: number }>('/notifications/unread-count/');
+    return response.data.count;
   } catch (error) {
     console.error('Error fetching unread notifications count:', error);
     throw error;
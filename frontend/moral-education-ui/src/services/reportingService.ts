@@ -5,11 +5,24 @@ export interface TimeSeriesPoint {
   points: number;
 }
 
+// Series are gap-filled: every bucket in the requested range is present
 export interface BehaviorTimeSeries {
   positive_series: TimeSeriesPoint[];
   negative_series: TimeSeriesPoint[];
 }
 
+// Same data as parallel arrays (layout=columnar), indexed like `dates`
+export interface BehaviorTimeSeriesColumns {
+  interval: 'day' | 'week' | 'month';
+  start_date: string;
+  end_date: string;
+  dates: string[];
+  positive_count: number[];
+  negative_count: number[];
+  positive_points: number[];
+  negative_points: number[];
+}
+
 export interface AwardTypeDistribution {
   award_type: string;
   count: number;
@@ -91,6 +104,91 @@ export interface DimensionAnalysis {
   total_records: number;
 }
 
+// One level of the rule hierarchy with its subtotals; sub-items have no children
+export interface RuleHierarchyNode {
+  level: 'all' | 'chapter' | 'dimension' | 'sub_item';
+  id: number | null;
+  name: string | null;
+  positive_count: number;
+  negative_count: number;
+  positive_points: number;
+  negative_points: number;
+  net_points: number;
+  total_records: number;
+  children?: RuleHierarchyNode[];
+}
+
+export interface LeaderboardEntry {
+  rank: number;
+  student_id: number;
+  student_name: string;
+  net_points: number;
+  score_count: number;
+}
+
+export interface Leaderboard {
+  scope: 'class' | 'grade';
+  scope_id: number;
+  period: 'week' | 'month' | 'term';
+  period_start: string;
+  period_end: string;
+  participants: number;
+  top: LeaderboardEntry[];
+  student?: {
+    student_id: number;
+    rank: number | null;
+    net_points: number | null;
+    score_count: number;
+  };
+}
+
+export type CubeDimension = 'grade' | 'class' | 'chapter' | 'dimension' | 'day' | 'week' | 'month';
+export type CubeMeasure = 'positive_count' | 'negative_count' | 'positive_points' | 'negative_points'
+  | 'net_points' | 'total_count';
+
+export interface ScoreCubeResult {
+  dimensions: CubeDimension[];
+  measures: CubeMeasure[];
+  // Grouping ids and names (grade_id/grade_name, school_class_id/class_name, ...),
+  // the time bucket keyed by its dimension name, and the requested measures
+  rows: Array<Record<string, number | string | null>>;
+}
+
+export interface ScoreDistribution {
+  scope: 'class' | 'grade';
+  scope_id: number;
+  start_date: string;
+  end_date: string;
+  count: number;
+  mean: number | null;
+  std: number | null;
+  min: number | null;
+  max: number | null;
+  percentiles: Record<string, number>;  // p10, p25, p50, p75, p90
+  histogram: { edges: number[]; counts: number[] };
+  classes: Array<{
+    school_class_id: number;
+    class_name: string | null;
+    students: number;
+    mean: number;
+    mean_z_score: number;
+  }>;
+  // One entry per student, index-aligned across the arrays
+  students: {
+    student_id: number[];
+    school_class_id: number[];
+    net_points: number[];
+    z_score: number[];
+    percentile_rank: number[];
+  };
+  student?: {
+    student_id: number;
+    net_points: number | null;
+    z_score: number | null;
+    percentile_rank: number | null;
+  };
+}
+
 // Reporting API Functions
 export const getBehaviorTimeSeries = async (params?: any): Promise<BehaviorTimeSeries> => {
   try {
@@ -102,6 +200,18 @@ export const getBehaviorTimeSeries = async (params?: any): Promise<BehaviorTimeS
   }
 };
 
+export const getBehaviorTimeSeriesColumns = async (params?: any): Promise<BehaviorTimeSeriesColumns> => {
+  try {
+    const response = await apiClient.get('/reports/behavior-time-series/', {
+      params: { ...params, layout: 'columnar' }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching behavior time series:', error);
+    throw error;
+  }
+};
+
 export const getAwardAnalytics = async (params?: any): Promise<AwardAnalytics> => {
   try {
     const response = await apiClient.get('/reports/award-analytics/', { params });
@@ -131,3 +241,153 @@ export const getDimensionAnalysis = async (params?: any): Promise<DimensionAnaly
     throw error;
   }
 };
+
+// Chapter > dimension > sub-item totals in one response, for drill-down charts
+export const getDimensionHierarchy = async (params?: any): Promise<RuleHierarchyNode> => {
+  try {
+    const response = await apiClient.get('/reports/dimension-analysis/', {
+      params: { ...params, layout: 'tree' }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching dimension hierarchy:', error);
+    throw error;
+  }
+};
+
+export const getLeaderboard = async (params: {
+  scope?: 'class' | 'grade';
+  scope_id: number;
+  period?: 'week' | 'month' | 'term';
+  date?: string;
+  limit?: number;
+  student_id?: number;
+}): Promise<Leaderboard> => {
+  try {
+    const response = await apiClient.get('/reports/leaderboard/', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching leaderboard:', error);
+    throw error;
+  }
+};
+
+export const getScoreCube = async (params: {
+  dimensions?: CubeDimension[];
+  measures?: CubeMeasure[];
+  grade_id?: number;
+  class_id?: number;
+  chapter_id?: number;
+  dimension_id?: number;
+  start_date?: string;
+  end_date?: string;
+}): Promise<ScoreCubeResult> => {
+  try {
+    const { dimensions, measures, ...filters } = params;
+    const response = await apiClient.get('/reports/cube/', {
+      params: {
+        ...filters,
+        dimensions: dimensions?.join(','),
+        measures: measures?.join(',')
+      }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching score cube:', error);
+    throw error;
+  }
+};
+
+export const getScoreDistribution = async (params: {
+  scope?: 'class' | 'grade';
+  scope_id: number;
+  start_date?: string;
+  end_date?: string;
+  bins?: number;
+  student_id?: number;
+}): Promise<ScoreDistribution> => {
+  try {
+    const response = await apiClient.get('/reports/distribution/', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching score distribution:', error);
+    throw error;
+  }
+};
+
+
+export type ReportJobTarget = 'behavior-time-series' | 'award-analytics' | 'user-engagement'
+  | 'dimension-analysis' | 'leaderboard' | 'cube' | 'distribution' | 'behavior-scores-export'
+  | 'users-export' | 'users-import';
+
+export interface ReportJob {
+  id: number;
+  target: ReportJobTarget;
+  params: Record<string, string | number | Array<string | number>>;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  // Running counters, e.g. processed/created/updated/errors rows for users-import.
+  // A failed import also records failed_rows ([first, last]) and whether earlier rows were committed (partial).
+  progress_detail: Record<string, number | boolean | number[]>;
+  attempts: number;
+  error: string;
+  has_result: boolean;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+// Queue a report or export to run in the background; resubmitting a pending job returns it
+export const submitReportJob = async (
+  target: ReportJobTarget,
+  params: ReportJob['params'] = {}
+): Promise<ReportJob> => {
+  try {
+    const response = await apiClient.post('/report-jobs/', { target, params });
+    return response.data;
+  } catch (error) {
+    console.error('Error submitting report job:', error);
+    throw error;
+  }
+};
+
+// Upload a user CSV to be imported by the job worker; poll the returned job for progress
+// and read the created/updated/errors counts from its result
+export const submitUserImportJob = async (file: File, dryRun = false): Promise<ReportJob> => {
+  try {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await apiClient.post('/users/import/', formData, {
+      params: { background: 'true', ...(dryRun ? { dry_run: 'true' } : {}) },
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error submitting user import job:', error);
+    throw error;
+  }
+};
+
+export const getReportJob = async (id: number): Promise<ReportJob> => {
+  try {
+    const response = await apiClient.get(`/report-jobs/${id}/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching report job:', error);
+    throw error;
+  }
+};
+
+// JSON for report targets, a Blob for export targets
+export const getReportJobResult = async (job: ReportJob): Promise<any> => {
+  try {
+    const isExport = job.target.endsWith('-export');
+    const response = await apiClient.get(`/report-jobs/${job.id}/result/`, {
+      responseType: isExport ? 'blob' : 'json'
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching report job result:', error);
+    throw error;
+  }
+};